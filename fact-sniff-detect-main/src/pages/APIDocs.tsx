@@ -59,7 +59,16 @@ const APIDocs = () => {
               body={[
                 "url: string (required, valid URL)",
               ]}
-              notes={["Advanced 8-layer verification, returns badge and advice"]}
+              notes={[
+                "Advanced 8-layer verification, returns badge and advice",
+                "Optional deadline: `deadline_ms` query parameter or `X-Deadline-Ms` header; a scan not done by then returns `provisional: true` with `pending_layers`",
+              ]}
+            />
+
+            <Row
+              method="GET"
+              path="/ecommerce/analyze-advanced/stream?url=..."
+              notes={["Server-Sent Events: a `layer` event per finished layer with a provisional score and badge, then a `final` event with the analyze-advanced body"]}
             />
 
             <Row
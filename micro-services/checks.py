@@ -1,7 +1,5 @@
 
-import whois
 from datetime import datetime
-import ssl
 
 import asyncio
 import httpx
@@ -19,54 +17,58 @@ import asyncio
 import httpx
 from fastapi.concurrency import run_in_threadpool
 
-# --- Domain Age (Using Thread Pool for synchronous `whois`) ---
+from ecom_det_fin.app.services import rdap_client, dns_resolver, tls_utils
+from ecom_det_fin.app.services.page_features import extract_features
+from ecom_det_fin.app.utils.patterns import PatternSet
+
+# --- Domain Age (native async RDAP/WHOIS, shared cache) ---
 async def check_domain_age(domain):
-    def _check():
+    try:
         print("in check_domain_age")
-        domain_info = whois.whois(domain)
-        creation_date = domain_info.creation_date
-        if isinstance(creation_date, list):
-            creation_date = creation_date[0]
+        record = await rdap_client.lookup(domain)
+        if record is None:
+            return {"error": "WHOIS lookup failed", "domain": domain, "is_suspicious": True}
+        creation_date = record.creation_date
         if not creation_date:
             return {"error": "Creation date not found", "domain": domain, "is_suspicious": True}
-        age_days = (datetime.now() - creation_date).days
+        age_days = (datetime.utcnow() - creation_date).days
         print("out check_domain_age")
         return {"domain": domain, "creation_date": creation_date.strftime("%Y-%m-%d"), "age_days": age_days, "is_suspicious": age_days < 180}
-    try:
-        return await run_in_threadpool(_check)
     except Exception as e:
         return {"error": str(e), "domain": domain, "is_suspicious": True}
 
-# --- WHOIS Analysis (Using Thread Pool) ---
+# --- WHOIS Analysis (native async RDAP/WHOIS, shared cache) ---
 async def analyze_whois(domain):
-    def _analyze():
+    try:
         print("in analyze_whois")
-        data = whois.whois(domain)
-        registrar = data.registrar or "Unknown"
+        record = await rdap_client.lookup(domain)
+        if record is None:
+            return {"registrar": None, "country": None, "email": None, "suspicious": True, "error": "WHOIS lookup failed"}
+        registrar = record.registrar or "Unknown"
         suspicious_registrar = any(r in registrar.lower() for r in ["privacy", "guard", "whois", "protected", "cheap", "fastdomain"])
         print("out analyze_whois")
 
-        return {"registrar": registrar, "country": data.country or "Unknown", "email": data.emails[0] if isinstance(data.emails, list) and data.emails else None, "suspicious": suspicious_registrar}
-    try:
-        return await run_in_threadpool(_analyze)
+        return {"registrar": registrar, "country": record.country or "Unknown", "email": record.emails[0] if record.emails else None, "suspicious": suspicious_registrar}
     except Exception as e:
         return {"registrar": None, "country": None, "email": None, "suspicious": True, "error": str(e)}
 
-# --- SSL Certificate (Using asyncio streams for native async) ---
+# --- SSL Certificate (shared async TLS prober, cached per host) ---
 async def check_ssl_certificate(domain):
     try:
         print("in check_ssl_certificate")
 
-        reader, writer = await asyncio.wait_for(
-            asyncio.open_connection(domain, 443, ssl=ssl.create_default_context()), timeout=5
-        )
-        cert = writer.get_extra_info('peercert')
-        writer.close()
-        await writer.wait_closed()
-        
-        valid_to = datetime.strptime(cert['notAfter'], "%b %d %H:%M:%S %Y %Z")
+        # Resolve through the shared async cache instead of the blocking getaddrinfo in open_connection
+        addresses = (await dns_resolver.lookup(domain)).addresses
+        if not addresses:
+            return {"is_valid": False, "suspicious": True, "error": "DNS resolution failed"}
+        tls = await tls_utils.fetch_tls_info(domain, 443, 5.0, addresses[0])
+        if tls.errors:
+            return {"is_valid": False, "suspicious": True, "error": tls.errors[0]}
         print("out check_ssl_certificate")
-        return {"issuer": cert.get('issuer', []), "subject": cert.get('subject', []), "is_valid": datetime.utcnow() < valid_to, "suspicious": datetime.utcnow() >= valid_to}
+        is_valid = tls.not_after is not None and datetime.utcnow() < tls.not_after
+        return {"issuer": tls.issuer, "issuer_org": tls.issuer_org, "subject": tls.subject_cn, "sans": tls.sans,
+                "valid_to": tls.not_after.isoformat() if tls.not_after else None, "key_type": tls.key_type,
+                "sig_hash": tls.sig_hash, "is_valid": is_valid, "suspicious": not is_valid}
     except Exception as e:
         return {"is_valid": False, "suspicious": True, "error": str(e)}
 
@@ -85,14 +87,15 @@ async def analyze_headers(url, client: httpx.AsyncClient):
         return {"issues": [], "suspicious": False, "error": str(e)}
 
 # --- Suspicious Patterns (Async with httpx) ---
+SUSPICIOUS_PHRASES = ["limited stock", "act now", "buy 1 get 3", "90% off", "today only"]
+SUSPICIOUS_MATCHER = PatternSet(SUSPICIOUS_PHRASES, word_boundary=False)
+
 async def detect_suspicious_patterns(url, client: httpx.AsyncClient):
-    SUSPICIOUS_PHRASES = ["limited stock", "act now", "buy 1 get 3", "90% off", "today only"]
     try:
         print("in detect_suspicious_patterns")
         response = await client.get(url, timeout=5)
-        soup = BeautifulSoup(response.text, 'html.parser')
-        text = soup.get_text().lower()
-        issues = [phrase for phrase in SUSPICIOUS_PHRASES if phrase in text]
+        found = SUSPICIOUS_MATCHER.found(extract_features(response.content, response.encoding).text)
+        issues = [phrase for phrase in SUSPICIOUS_PHRASES if phrase in found]
         print("out detect_suspicious_patterns")
         return {"issues": issues, "is_suspicious": len(issues) > 0}
     except Exception as e:
@@ -121,8 +124,7 @@ async def check_broken_links(url, client: httpx.AsyncClient):
     try:
         print("in check_broken_links")
         response = await client.get(url, timeout=5)
-        soup = BeautifulSoup(response.text, "html.parser")
-        links = [urljoin(url, tag['href']) for tag in soup.find_all("a", href=True)]
+        links = [urljoin(url, href) for href in extract_features(response.content, response.encoding).hrefs]
         
         async def check_one(link):
             try:
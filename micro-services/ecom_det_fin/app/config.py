@@ -14,6 +14,13 @@ DEFAULT_WEIGHTS = {
     "user_feedback": 0.05,
 }
 
+# Weight profiles of the other scan modes (see risk_rules.MODES); standard uses DEFAULT_WEIGHTS
+MODE_WEIGHTS = {
+    "instant": {"host_signals": 0.8, "local_threats": 0.2},
+    # The crawl covers policy pages, so the homepage-only content layer counts for less
+    "deep": {**DEFAULT_WEIGHTS, "content_ux": 0.05, "merchant_verification": 0.25, "site_crawl": 0.15},
+}
+
 class Settings(BaseSettings):
     app_name: str = "FactState API"
     db_url: str = Field(default="sqlite:///data/app.db", alias="DB_URL")
@@ -31,7 +38,8 @@ class Settings(BaseSettings):
     ])
 
     canonical_brands: dict[str, list[str]] = Field(default_factory=lambda: {
-        "amazon": ["amazon.com", "amazon.in", "amazon.co.uk", "amazon.ca", "amazon.de", "amazon.fr"],
+        "amazon": ["amazon.com", "amazon.in", "amazon.co.uk", "amazon.ca", "amazon.de", "amazon.fr",
+                   "amazon.co.jp", "amazon.com.au", "amazon.com.br", "amazon.com.mx", "amazon.sg", "amazon.ae"],
         "flipkart": ["flipkart.com"],
         "myntra": ["myntra.com"],
         "ajio": ["ajio.com"],
@@ -41,16 +49,29 @@ class Settings(BaseSettings):
         "walmart": ["walmart.com"],
         "alibaba": ["alibaba.com"],
         "aliexpress": ["aliexpress.com"],
-        "ebay": ["ebay.com"],
+        "ebay": ["ebay.com", "ebay.in", "ebay.co.uk", "ebay.com.au", "ebay.de"],
         "etsy": ["etsy.com"],
         "shein": ["shein.com"],
-        "google": ["google.com", "google.in"],
+        "google": ["google.com", "google.in", "google.co.in", "google.co.uk", "google.com.au"],
         "apple": ["apple.com"],
         "microsoft": ["microsoft.com"],
+        "facebook": ["facebook.com"],
         "paypal": ["paypal.com"],
         "stripe": ["stripe.com"],
     })
     
+    # Extra protected brands for typosquat matching (one `brand<TAB>domain,...` or domain per line);
+    # BRAND_INDEX_PATH is a prebuilt index (`python -m app.services.brand_index build`), else built at startup
+    protected_brands_path: str | None = Field(default=None, alias="PROTECTED_BRANDS_PATH")
+    brand_index_path: str | None = Field(default=None, alias="BRAND_INDEX_PATH")
+    brand_index_max_distance: int = Field(default=2, alias="BRAND_INDEX_MAX_DISTANCE")
+    # UTS #39 confusables.txt for IDN homograph skeletons (default: the subset in app/data)
+    confusables_path: str | None = Field(default=None, alias="CONFUSABLES_PATH")
+    # Offline threat list for instant scans: one host or registrable domain per line, '#' comments
+    local_threat_list_path: str | None = Field(default=None, alias="LOCAL_THREAT_LIST_PATH")
+    # Deep scans also fetch up to this many same-site policy/contact pages linked from the target
+    deep_crawl_max_pages: int = Field(default=5, alias="DEEP_CRAWL_MAX_PAGES")
+    
     # Major verified platforms (should get extremely low risk scores)
     verified_major_platforms: list[str] = Field(default_factory=lambda: [
         "amazon.com", "amazon.in", "amazon.co.uk", "amazon.ca", "amazon.de", "amazon.fr",
@@ -82,6 +103,79 @@ class Settings(BaseSettings):
         ".myshopify.com", ".wixsite.com", ".square.site", ".bigcartel.com", ".weebly.com"
     ])
 
+    # Public suffix list used for registrable-domain extraction (default: the subset in app/data)
+    public_suffix_list_path: str | None = Field(default=None, alias="PUBLIC_SUFFIX_LIST_PATH")
+
+    # Shared page fetch (one GET per scan, reused by all HTML layers)
+    page_fetch_timeout: float = Field(default=5.0, alias="PAGE_FETCH_TIMEOUT")
+    page_connect_timeout: float = Field(default=2.0, alias="PAGE_CONNECT_TIMEOUT")
+    # Hedging: when no response headers arrive by the PAGE_HEDGE_PERCENTILE of recent header latency,
+    # send a second GET and keep whichever completes first; hedges stay under PAGE_HEDGE_BUDGET of all fetches
+    page_hedge_enabled: bool = Field(default=False, alias="PAGE_HEDGE_ENABLED")
+    page_hedge_percentile: float = Field(default=90.0, alias="PAGE_HEDGE_PERCENTILE")
+    page_hedge_budget: float = Field(default=0.05, alias="PAGE_HEDGE_BUDGET")
+    # HTML of PARSE_INLINE_MAX_BYTES or more is parsed in a pool of worker processes (0 workers: always inline)
+    parse_pool_workers: int = Field(default=2, alias="PARSE_POOL_WORKERS")
+    parse_inline_max_bytes: int = Field(default=256 * 1024, alias="PARSE_INLINE_MAX_BYTES")
+
+    # WHOIS result cache (seconds); failures are cached briefly to avoid hammering registries
+    whois_cache_ttl: int = Field(default=7 * 24 * 3600, alias="WHOIS_CACHE_TTL")
+    whois_negative_ttl: int = Field(default=15 * 60, alias="WHOIS_NEGATIVE_TTL")
+    whois_cache_size: int = Field(default=4096, alias="WHOIS_CACHE_SIZE")
+    whois_cache_db: str | None = Field(default=None, alias="WHOIS_CACHE_DB")
+
+    # Per-layer result cache; each layer registers its own TTL, LAYER_CACHE_TTLS_JSON overrides them
+    # (e.g. {"threat_intel": 300}; 0 disables caching for that layer)
+    layer_cache_size: int = Field(default=8192, alias="LAYER_CACHE_SIZE")
+    layer_cache_db: str | None = Field(default=None, alias="LAYER_CACHE_DB")
+    layer_cache_ttls_json: str | None = Field(default=None, alias="LAYER_CACHE_TTLS_JSON")
+
+    # Native RDAP client with port-43 WHOIS fallback
+    rdap_bootstrap_url: str = Field(default="https://data.iana.org/rdap/dns.json", alias="RDAP_BOOTSTRAP_URL")
+    rdap_timeout: float = Field(default=5.0, alias="RDAP_TIMEOUT")
+    whois_timeout: float = Field(default=5.0, alias="WHOIS_TIMEOUT")
+    registry_max_concurrency: int = Field(default=4, alias="REGISTRY_MAX_CONCURRENCY")
+    registry_backoff_base: float = Field(default=2.0, alias="REGISTRY_BACKOFF_BASE")
+    registry_backoff_max: float = Field(default=300.0, alias="REGISTRY_BACKOFF_MAX")
+
+    # Async DNS resolver; DNS_UPSTREAM is a comma-separated list of ip[:port] (default: system resolvers)
+    dns_upstream: str | None = Field(default=None, alias="DNS_UPSTREAM")
+    dns_timeout: float = Field(default=3.0, alias="DNS_TIMEOUT")
+    dns_min_ttl: int = Field(default=30, alias="DNS_MIN_TTL")
+    dns_max_ttl: int = Field(default=3600, alias="DNS_MAX_TTL")
+    dns_negative_ttl: int = Field(default=60, alias="DNS_NEGATIVE_TTL")
+    dns_cache_size: int = Field(default=8192, alias="DNS_CACHE_SIZE")
+
+    # TLS probe cache (seconds); entries never outlive the certificate, verification failures are cached briefly
+    tls_cache_ttl: int = Field(default=6 * 3600, alias="TLS_CACHE_TTL")
+    tls_negative_ttl: int = Field(default=5 * 60, alias="TLS_NEGATIVE_TTL")
+    tls_cache_size: int = Field(default=4096, alias="TLS_CACHE_SIZE")
+
+    # mmap'd IP -> ASN index built with `python -m app.services.asn_index build`
+    asn_index_path: str | None = Field(default="data/asn.idx", alias="ASN_INDEX_PATH")
+
+    # /api/check-site reuses a scan younger than SCAN_FRESH_TTL; up to SCAN_STALE_GRACE
+    # past that it is served stale while a background rescan refreshes it (seconds)
+    scan_fresh_ttl: int = Field(default=15 * 60, alias="SCAN_FRESH_TTL")
+    scan_stale_grace: int = Field(default=6 * 3600, alias="SCAN_STALE_GRACE")
+    # How long a scan answered provisionally at the caller's deadline may keep running to complete its stored result (seconds)
+    scan_background_budget: float = Field(default=30.0, alias="SCAN_BACKGROUND_BUDGET")
+
+    # Bulk /api/check-sites limits
+    bulk_max_urls: int = Field(default=5000, alias="BULK_MAX_URLS")
+    bulk_concurrency: int = Field(default=16, alias="BULK_CONCURRENCY")
+    bulk_per_host_concurrency: int = Field(default=2, alias="BULK_PER_HOST_CONCURRENCY")
+    bulk_commit_every: int = Field(default=50, alias="BULK_COMMIT_EVERY")
+
+    # Adaptive layer timeouts: percentile of recent latency times headroom, within [min, max] seconds.
+    # A layer keeps its static timeout until LAYER_LATENCY_MIN_SAMPLES runs have been observed.
+    layer_timeout_percentile: float = Field(default=95.0, alias="LAYER_TIMEOUT_PERCENTILE")
+    layer_timeout_headroom: float = Field(default=1.5, alias="LAYER_TIMEOUT_HEADROOM")
+    layer_timeout_min: float = Field(default=2.0, alias="LAYER_TIMEOUT_MIN")
+    layer_timeout_max: float = Field(default=15.0, alias="LAYER_TIMEOUT_MAX")
+    layer_latency_window: int = Field(default=500, alias="LAYER_LATENCY_WINDOW")
+    layer_latency_min_samples: int = Field(default=20, alias="LAYER_LATENCY_MIN_SAMPLES")
+
     # Strict mode tightens thresholds and adds risk floors for certain findings
     strict_mode: bool = Field(default=True, alias="STRICT_MODE")
     
@@ -132,4 +226,17 @@ class Settings(BaseSettings):
                 pass
         return DEFAULT_WEIGHTS
 
+    def weights_for(self, mode: str = "standard") -> dict[str, float]:
+        # RISK_WEIGHTS_JSON tunes the standard profile only
+        return self.weights if mode == "standard" else MODE_WEIGHTS[mode]
+
+    @property
+    def layer_cache_ttls(self) -> dict[str, float]:
+        if self.layer_cache_ttls_json:
+            try:
+                return {k: float(v) for k, v in json.loads(self.layer_cache_ttls_json).items()}
+            except Exception:
+                pass
+        return {}
+
 settings = Settings()
\ No newline at end of file
@@ -1,4 +1,5 @@
 from __future__ import annotations
+from sqlalchemy import inspect, text
 from sqlmodel import SQLModel, create_engine, Session
 from .config import settings
 from pathlib import Path
@@ -13,6 +14,19 @@ def init_db() -> None:
     # Import tables to register metadata
     from .models import tables  # noqa: F401
     SQLModel.metadata.create_all(engine)
+    _migrate()
+
+
+def _migrate() -> None:
+    # create_all() does not add columns to existing tables
+    columns = {c["name"] for c in inspect(engine).get_columns("sitescan")}
+    if "normalized_url" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE sitescan ADD COLUMN normalized_url VARCHAR"))
+            conn.execute(text("CREATE INDEX IF NOT EXISTS ix_sitescan_normalized_url ON sitescan (normalized_url)"))
+    if "mode" not in columns:
+        with engine.begin() as conn:
+            conn.execute(text("ALTER TABLE sitescan ADD COLUMN mode VARCHAR"))
 
 
 def get_session():
@@ -2,6 +2,7 @@ from __future__ import annotations
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from .db import init_db
+from .services.parse_pool import parse_pool
 from .routers.site import router as site_router
 from .routers.verified_feedback import router as verified_feedback_router
 from .config import settings
@@ -12,6 +13,10 @@ app = FastAPI(title=settings.app_name)
 def on_startup():
     init_db()
 
+@app.on_event("shutdown")
+def on_shutdown():
+    parse_pool.shutdown()
+
 # CORS for frontend dev server
 origins = [
     "http://localhost:5173",
@@ -1,16 +1,27 @@
 from __future__ import annotations
 from pydantic import BaseModel, HttpUrl, Field
-from typing import Optional, List, Dict
+from typing import Optional, List, Dict, Literal
 from datetime import datetime
 
+# instant: offline checks only; standard: every network layer; deep: standard plus a site crawl
+ScanMode = Literal["instant", "standard", "deep"]
+
 class CheckSiteRequest(BaseModel):
     url: HttpUrl
+    mode: ScanMode = "standard"
+
+class CheckSitesRequest(BaseModel):
+    # Plain strings so one malformed entry is reported on its own line instead of rejecting the batch
+    urls: List[str]
 
 class Reason(BaseModel):
     layer: str
     message: str
     weight: float
     score: float
+    skipped: bool = False
+    status: str = "ok"  # "ok", "timeout", "error", "skipped" or "pending"
+    cache_age_seconds: Optional[float] = None  # age of a result served from the layer cache
 
 class Advice(BaseModel):
     payment: str
@@ -23,6 +34,14 @@ class RiskResult(BaseModel):
     reasons: List[Reason]
     advice: Advice
     scanned_at: datetime
+    cached: bool = False
+    cache_age_seconds: Optional[float] = None
+    # Layers cancelled because the badge was already decided without them
+    skipped_layers: List[str] = []
+    # Answered at the caller's deadline; the pending layers finish in the background and update the stored scan
+    provisional: bool = False
+    pending_layers: List[str] = []
+    mode: ScanMode = "standard"
 
 class FeedbackRequest(BaseModel):
     url: HttpUrl
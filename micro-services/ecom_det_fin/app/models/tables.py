@@ -14,10 +14,12 @@ class FeedbackStatus(str, Enum):
 class SiteScan(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
     url: str
+    normalized_url: Optional[str] = Field(default=None, index=True)  # cache key, see utils.parsing.normalize_url
     risk_score: float
     badge: str
     reasons_json: str  # JSON-serialized Reason list
     scanned_at: datetime = Field(default_factory=datetime.utcnow, index=True)
+    mode: Optional[str] = "standard"  # scan mode, see risk_rules.MODES; NULL on rows from before modes
 
 class Feedback(SQLModel, table=True):
     id: Optional[int] = Field(default=None, primary_key=True)
@@ -1,51 +1,308 @@
 from __future__ import annotations
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, BackgroundTasks, Depends, Header, HTTPException, Query, Request
+from fastapi.responses import StreamingResponse
+from pydantic import HttpUrl, TypeAdapter, ValidationError
+from sqlalchemy import or_
 from sqlmodel import Session, select
 from datetime import datetime
+from typing import Optional
+from urllib.parse import urlparse
+import asyncio
+import csv
+import io
 import json
 
-from ..db import get_session
-from ..models.schemas import CheckSiteRequest, RiskResult, FeedbackRequest, SiteHistoryResponse, HistoryPoint
+from ..config import settings
+from ..db import engine, get_session
+from ..models.schemas import CheckSiteRequest, CheckSitesRequest, RiskResult, FeedbackRequest, SiteHistoryResponse, HistoryPoint, ScanMode
 from ..models.tables import SiteScan, Feedback
-from ..services.scoring import evaluate_all, to_badge, advice_for
-from ..services.risk_rules import apply_safety_gates
+from ..services.scoring import Evaluation, evaluate, evaluate_all, evaluate_stream, scan_flight, to_badge, advice_for
+from ..services import layer_cache, page_snapshot, registry, tls_utils
+from ..services.parse_pool import parse_pool
+from ..services.latency import layer_latency
+from ..services.risk_rules import MODES, apply_safety_gates
+from ..utils.parsing import normalize_url, registrable_domain
 
 router = APIRouter(prefix="/api", tags=["ecommerce"])
 
-@router.post("/check-site", response_model=RiskResult)
-async def check_site(payload: CheckSiteRequest, session: Session = Depends(get_session)):
-    score, reasons = await evaluate_all(str(payload.url), session=session)
-    badge = to_badge(score)
+_http_url = TypeAdapter(HttpUrl)
+
+# (normalized URL, scan mode) pairs with a background rescan already scheduled
+_revalidating: set[tuple[str, str]] = set()
+
+
+async def _run_scan(url: str, session: Session, commit: bool = True, mode: str = "standard") -> SiteScan:
+    """Run the full pipeline for `url` and add the resulting SiteScan to the session."""
+    score, reasons = await evaluate_all(url, session=session, mode=mode)
+    return _save_scan(url, score, reasons, session, commit, mode=mode)
+
+
+def _save_scan(url: str, score: float, reasons, session: Session, commit: bool = True,
+               scan: Optional[SiteScan] = None, mode: str = "standard") -> SiteScan:
+    """Add a SiteScan for the result, or update `scan` (a provisional result being completed) in place."""
     # Apply safety gates to enforce conservative classification
-    reason_dicts = [{"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score} for r in reasons]
-    adjusted_score, gated_badge = apply_safety_gates(str(payload.url), reason_dicts, score)
-    badge = gated_badge
-    payment, actions = advice_for(adjusted_score)
-
-    scan = SiteScan(
-        url=str(payload.url),
-        risk_score=adjusted_score,
-        badge=badge,
-        reasons_json=json.dumps([r.__dict__ for r in reasons]),
-        scanned_at=datetime.utcnow(),
-    )
+    reason_dicts = [{"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score, "status": r.status} for r in reasons]
+    adjusted_score, gated_badge = apply_safety_gates(url, reason_dicts, score, mode)
+
+    if scan is None:
+        scan = SiteScan(url=url, normalized_url=normalize_url(url), mode=mode)
+    scan.risk_score = adjusted_score
+    scan.badge = gated_badge
+    scan.reasons_json = json.dumps([r.__dict__ for r in reasons])
+    scan.scanned_at = datetime.utcnow()
     session.add(scan)
-    session.commit()
+    if commit:
+        session.commit()
+    return scan
+
+
+def _latest_scan(session: Session, normalized: str, mode: str = "standard") -> Optional[SiteScan]:
+    # A deeper scan answers a shallower request, never the other way round; rows from before
+    # scan modes existed (NULL mode) were standard scans
+    modes = MODES[MODES.index(mode):]
+    mode_filter = SiteScan.mode.in_(modes)
+    if "standard" in modes:
+        mode_filter = or_(mode_filter, SiteScan.mode.is_(None))
+    q = (
+        select(SiteScan)
+        .where(SiteScan.normalized_url == normalized, mode_filter)
+        .order_by(SiteScan.scanned_at.desc())
+        .limit(1)
+    )
+    scan = session.exec(q).first()
+    # A provisional scan is still being completed: callers rescan, which joins the running scan
+    if scan is not None and _pending_layers(json.loads(scan.reasons_json)):
+        return None
+    return scan
 
+
+def _pending_layers(reasons: list[dict]) -> list[str]:
+    return [r["layer"] for r in reasons if r.get("status") == "pending"]
+
+
+def _to_result(url, scan: SiteScan, age: Optional[float] = None) -> RiskResult:
+    payment, actions = advice_for(scan.risk_score)
+    reasons = json.loads(scan.reasons_json)
+    pending = _pending_layers(reasons)
     return RiskResult(
-        url=payload.url,
-        risk_score=adjusted_score,
-        badge=badge,
-        reasons=[
-            # reconstruct Reason-like dicts for the API model
-            {"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score}
-            for r in reasons
-        ],
+        url=url,
+        risk_score=scan.risk_score,
+        badge=scan.badge,
+        # reasons_json holds Reason-like dicts, which is what the API model expects
+        reasons=reasons,
         advice={"payment": payment, "actions": actions},
         scanned_at=scan.scanned_at,
+        cached=age is not None,
+        cache_age_seconds=round(age, 1) if age is not None else None,
+        skipped_layers=[r["layer"] for r in reasons if r.get("skipped")],
+        provisional=bool(pending),
+        pending_layers=pending,
+        mode=scan.mode or "standard",
     )
 
 
+async def _revalidate(url: str, normalized: str, mode: str = "standard") -> None:
+    try:
+        with Session(engine) as session:
+            await _run_scan(url, session, mode=mode)
+    finally:
+        _revalidating.discard((normalized, mode))
+
+
+async def _complete_scan(url: str, scan_id: int, completion: asyncio.Future) -> None:
+    """Replace a provisional SiteScan with the full result once its pending layers finish."""
+    try:
+        result = await asyncio.shield(completion)
+    except Exception:
+        # The provisional scan stays and is not served from cache; the next request rescans
+        return
+    with Session(engine) as session:
+        scan = session.get(SiteScan, scan_id)
+        if scan is not None:
+            _save_scan(url, result.score, result.reasons, session, scan=scan, mode=result.mode)
+
+
+@router.post("/check-site", response_model=RiskResult)
+async def check_site(
+    payload: CheckSiteRequest,
+    background_tasks: BackgroundTasks,
+    session: Session = Depends(get_session),
+    deadline_ms: Optional[float] = Query(default=None, gt=0),
+    x_deadline_ms: Optional[float] = Header(default=None, gt=0),
+):
+    """Score a site. With a deadline (`deadline_ms` parameter or `X-Deadline-Ms` header,
+    in milliseconds) a scan still running when it passes is answered provisionally from
+    the layers finished so far; the stored scan is completed in the background.
+
+    `mode` in the body picks the scan depth: `instant` (offline host checks and local
+    threat lists, no network), `standard` (default) or `deep` (adds a crawl of the
+    site's policy pages). A stored scan of the requested depth or deeper is reused.
+    """
+    url = str(payload.url)
+    mode = payload.mode
+    normalized = normalize_url(url)
+    latest = _latest_scan(session, normalized, mode)
+    if latest is not None:
+        age = max(0.0, (datetime.utcnow() - latest.scanned_at).total_seconds())
+        if age < settings.scan_fresh_ttl:
+            return _to_result(payload.url, latest, age)
+        if age < settings.scan_fresh_ttl + settings.scan_stale_grace:
+            # Stale-while-revalidate: answer now, refresh after the response is sent
+            if (normalized, mode) not in _revalidating:
+                _revalidating.add((normalized, mode))
+                background_tasks.add_task(_revalidate, url, normalized, mode)
+            return _to_result(payload.url, latest, age)
+
+    budget = deadline_ms if deadline_ms is not None else x_deadline_ms
+    if budget is None:
+        scan = await _run_scan(url, session, mode=mode)
+        return _to_result(payload.url, scan)
+    result = await evaluate(url, session=session, deadline=budget / 1000.0, mode=mode)
+    scan = _save_scan(url, result.score, result.reasons, session, mode=mode)
+    if result.provisional:
+        background_tasks.add_task(_complete_scan, url, scan.id, result.completion)
+    return _to_result(payload.url, scan)
+
+
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _stream_events(url: str, mode: str = "standard"):
+    # Own session: a dependency session is closed before a streaming body runs
+    with Session(engine) as session:
+        normalized = normalize_url(url)
+        latest = _latest_scan(session, normalized, mode)
+        if latest is not None:
+            age = max(0.0, (datetime.utcnow() - latest.scanned_at).total_seconds())
+            if age < settings.scan_fresh_ttl:
+                yield _sse("final", _to_result(url, latest, age).model_dump(mode="json"))
+                return
+        try:
+            async for item in evaluate_stream(url, session=session, mode=mode):
+                if isinstance(item, Evaluation):
+                    scan = _save_scan(url, item.score, item.reasons, session, mode=mode)
+                    yield _sse("final", _to_result(url, scan).model_dump(mode="json"))
+                else:
+                    yield _sse("layer", {
+                        "reason": item.reason.__dict__,
+                        "provisional_score": round(item.score, 1),
+                        "provisional_badge": item.badge,
+                        "pending": item.pending,
+                    })
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield _sse("error", {"detail": f"Scan failed: {e}"})
+
+
+@router.get("/check-site/stream")
+async def check_site_stream(url: str, mode: ScanMode = "standard"):
+    """Server-Sent Events: a `layer` event per finished layer with the running score and badge,
+    then a `final` event carrying the same body as POST /api/check-site.
+    """
+    try:
+        _http_url.validate_python(url)
+    except ValidationError:
+        raise HTTPException(status_code=422, detail="Invalid URL")
+    return StreamingResponse(
+        _stream_events(url, mode),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+
+def _urls_from_csv(text: str) -> list[str]:
+    """URLs from a `url` column, or the first column when there is no such header."""
+    rows = [row for row in csv.reader(io.StringIO(text)) if row and row[0].strip()]
+    if not rows:
+        return []
+    header = [cell.strip().lower() for cell in rows[0]]
+    if "url" in header:
+        col = header.index("url")
+        return [row[col].strip() for row in rows[1:] if len(row) > col and row[col].strip()]
+    return [row[0].strip() for row in rows if not row[0].strip().lower().startswith("url")]
+
+
+async def _read_bulk_urls(request: Request) -> list[str]:
+    content_type = request.headers.get("content-type", "")
+    if content_type.startswith("multipart/form-data"):
+        form = await request.form()
+        upload = form.get("file")
+        if upload is None or isinstance(upload, str):
+            raise HTTPException(status_code=400, detail="Upload the CSV as a 'file' form field")
+        return _urls_from_csv((await upload.read()).decode("utf-8-sig", errors="replace"))
+    if content_type.startswith("text/csv"):
+        return _urls_from_csv((await request.body()).decode("utf-8-sig", errors="replace"))
+    try:
+        body = await request.json()
+        # Accept either {"urls": [...]} or a bare JSON array
+        return CheckSitesRequest(urls=body if isinstance(body, list) else body.get("urls", [])).urls
+    except (ValueError, AttributeError, ValidationError):
+        raise HTTPException(status_code=400, detail='Expected JSON {"urls": [...]} or a CSV upload')
+
+
+async def _bulk_results(urls: dict[str, str], mode: str = "standard"):
+    """Score unique URLs concurrently and yield one NDJSON line per URL as each completes."""
+    limit = asyncio.Semaphore(settings.bulk_concurrency)
+    per_host: dict[str, asyncio.Semaphore] = {}
+
+    with Session(engine) as session:
+        pending_commits = 0
+
+        async def score(normalized: str, url: str) -> dict:
+            line = {"url": url, "normalized_url": normalized}
+            try:
+                _http_url.validate_python(url)
+            except ValidationError:
+                return {**line, "error": "Invalid URL"}
+            latest = _latest_scan(session, normalized, mode)
+            if latest is not None:
+                age = (datetime.utcnow() - latest.scanned_at).total_seconds()
+                if age < settings.scan_fresh_ttl:
+                    return {**line, **_to_result(url, latest, age).model_dump(mode="json")}
+            host = registrable_domain(urlparse(url).hostname or "")
+            host_limit = per_host.setdefault(host, asyncio.Semaphore(settings.bulk_per_host_concurrency))
+            async with host_limit, limit:
+                try:
+                    scan = await _run_scan(url, session, commit=False, mode=mode)
+                except Exception as e:
+                    return {**line, "error": f"Scan failed: {e}"}
+            return {**line, **_to_result(url, scan).model_dump(mode="json"), "_new": True}
+
+        tasks = [asyncio.create_task(score(n, u)) for n, u in urls.items()]
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                result = await next_done
+                if result.pop("_new", False):
+                    pending_commits += 1
+                    if pending_commits >= settings.bulk_commit_every:
+                        session.commit()
+                        pending_commits = 0
+                yield json.dumps(result) + "\n"
+        finally:
+            # Client went away or the batch finished: stop outstanding scans, keep what completed
+            for task in tasks:
+                task.cancel()
+            session.commit()
+
+
+@router.post("/check-sites")
+async def check_sites(request: Request, mode: ScanMode = "standard"):
+    """Bulk scoring. Body: JSON {"urls": [...]}, a JSON array, or a CSV upload ('file' field).
+    The `mode` query parameter applies to every URL (see POST /api/check-site).
+
+    Streams application/x-ndjson, one line per unique normalized URL in completion order.
+    """
+    raw = await _read_bulk_urls(request)
+    unique: dict[str, str] = {}
+    for url in raw:
+        unique.setdefault(normalize_url(url), url)
+    if len(unique) > settings.bulk_max_urls:
+        raise HTTPException(status_code=413, detail=f"At most {settings.bulk_max_urls} URLs per request")
+    return StreamingResponse(_bulk_results(unique, mode), media_type="application/x-ndjson")
+
+
 @router.post("/feedback")
 async def submit_feedback(payload: FeedbackRequest, session: Session = Depends(get_session)):
     fb = Feedback(url=str(payload.url), delivered=payload.delivered, order_hash=payload.order_hash)
@@ -54,6 +311,22 @@ async def submit_feedback(payload: FeedbackRequest, session: Session = Depends(g
     return {"status": "ok", "message": "Feedback recorded"}
 
 
+@router.get("/metrics")
+async def metrics():
+    """In-process counters: coalesced scans, per-layer latency percentiles and current timeouts, caches,
+    the HTML parse pool."""
+    return {
+        "scan_singleflight": scan_flight.stats(),
+        "layer_latency": layer_latency.stats(),
+        "layer_timeouts": {spec.name: layer_latency.timeout(spec.name, spec.timeout) for spec in registry.layers(None)},
+        "page_fetch": page_snapshot.fetch_stats(),
+        "parse_pool": parse_pool.stats(),
+        "layer_cache": layer_cache.layer_results.stats(),
+        "tls_cache": tls_utils.tls_cache.stats(),
+        "tls_singleflight": tls_utils.tls_flight.stats(),
+    }
+
+
 @router.get("/site-history", response_model=SiteHistoryResponse)
 async def site_history(url: str, session: Session = Depends(get_session)):
     q = select(SiteScan).where(SiteScan.url == url).order_by(SiteScan.scanned_at.asc())
@@ -0,0 +1,248 @@
+"""Memory-mapped IP -> ASN index.
+
+The index is a path-compressed binary (Patricia) trie over IPv4 and IPv6
+prefixes, serialized as fixed-size nodes so it can be mmap'd read-only and
+shared by every worker process through the page cache. A lookup walks at most
+32 (IPv4) or 128 (IPv6) bits and returns the longest matching prefix.
+
+Build it from a pyasn-style ``prefix<TAB>asn`` file or an iptoasn.com
+``ip2asn`` TSV (``start end asn country description``)::
+
+    python -m app.services.asn_index build ip2asn-combined.tsv data/asn.idx
+    python -m app.services.asn_index classify data/asn.idx < ips.txt
+"""
+from __future__ import annotations
+import ipaddress
+import json
+import mmap
+import struct
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Iterable, Iterator, Optional, TextIO
+from ..config import settings
+
+MAGIC = b"ASNIDX01"
+_HEADER = struct.Struct("<8sIIII")  # magic, node_count, v4_root, v6_root, names_len
+# left, right, asn (0 = no prefix ends here), depth in bits, 3 pad, prefix bits (big-endian, 128-bit)
+_NODE = struct.Struct("<IIIB3x16s")
+_NODE_HEAD = struct.Struct("<IIIB")
+
+
+@dataclass(frozen=True)
+class AsnMatch:
+    asn: int
+    prefix: str
+    name: Optional[str] = None
+
+
+def _parse_source(lines: Iterable[str]) -> tuple[list[tuple[int, int, int, int]], dict[int, str]]:
+    """Return ((version, prefix_int, prefix_len, asn), ...) and an ASN -> name map."""
+    prefixes: list[tuple[int, int, int, int]] = []
+    names: dict[int, str] = {}
+    for line in lines:
+        line = line.strip()
+        if not line or line.startswith(("#", ";")):
+            continue
+        fields = line.split("\t") if "\t" in line else line.split()
+        try:
+            if "/" in fields[0]:
+                nets = [ipaddress.ip_network(fields[0], strict=False)]
+                asn = int(fields[1].upper().removeprefix("AS"))
+                name = fields[2] if len(fields) > 2 else None
+            else:
+                start, end = ipaddress.ip_address(fields[0]), ipaddress.ip_address(fields[1])
+                nets = list(ipaddress.summarize_address_range(start, end))
+                asn = int(fields[2].upper().removeprefix("AS"))
+                name = fields[4] if len(fields) > 4 else None
+        except (ValueError, IndexError):
+            continue
+        if asn == 0:  # "not routed" rows in ip2asn
+            continue
+        if name and name != "Not routed":
+            names.setdefault(asn, name)
+        for net in nets:
+            prefixes.append((net.version, int(net.network_address), net.prefixlen, asn))
+    return prefixes, names
+
+
+def _width(version: int) -> int:
+    return 32 if version == 4 else 128
+
+
+def _build_trie(items: list[tuple[int, int, int]], width: int, nodes: list[tuple]) -> int:
+    """Append Patricia nodes for ``items`` (sorted, deduplicated (value, length, asn)); return the root index."""
+
+    def common_len(a: int, b: int, limit: int) -> int:
+        diff = (a ^ b) >> (width - limit) if limit else 0
+        return limit - diff.bit_length()
+
+    def build(lo: int, hi: int) -> int:
+        if lo >= hi:
+            return 0
+        first, last = items[lo], items[hi - 1]
+        depth = min(min(length for _, length, _ in items[lo:hi]), common_len(first[0], last[0], width))
+        key = (first[0] >> (width - depth) << (width - depth)) if depth else 0
+        asn = 0
+        if first[1] == depth:
+            asn = first[2]
+            lo += 1
+        index = len(nodes)
+        nodes.append(None)  # reserve, children are appended after the parent
+        # Items are sorted by value, so those with bit `depth` clear come first
+        split = lo
+        if depth < width:
+            bit = 1 << (width - 1 - depth)
+            while split < hi and not items[split][0] & bit:
+                split += 1
+        left = build(lo, split)
+        right = build(split, hi)
+        nodes[index] = (left, right, asn, depth, key << (128 - width))
+        return index
+
+    return build(0, len(items))
+
+
+def build_index(lines: Iterable[str], out_path: str | Path) -> int:
+    """Build an index file from prefix data. Returns the number of prefixes indexed."""
+    prefixes, names = _parse_source(lines)
+    nodes: list[tuple] = [(0, 0, 0, 0, 0)]  # index 0 is the null node
+    roots = {}
+    for version in (4, 6):
+        width = _width(version)
+        latest: dict[tuple[int, int], int] = {}
+        for v, value, length, asn in prefixes:
+            if v == version:
+                latest[(value, length)] = asn
+        items = sorted((value, length, asn) for (value, length), asn in latest.items())
+        roots[version] = _build_trie(items, width, nodes)
+    names_blob = json.dumps({str(k): v for k, v in sorted(names.items())}, ensure_ascii=False).encode()
+    out_path = Path(out_path)
+    out_path.parent.mkdir(parents=True, exist_ok=True)
+    tmp = out_path.with_suffix(out_path.suffix + ".tmp")
+    with open(tmp, "wb") as fh:
+        fh.write(_HEADER.pack(MAGIC, len(nodes), roots[4], roots[6], len(names_blob)))
+        for left, right, asn, depth, key in nodes:
+            fh.write(_NODE.pack(left, right, asn, depth, key.to_bytes(16, "big")))
+        fh.write(names_blob)
+    tmp.replace(out_path)  # atomic swap so running workers never see a half-written file
+    return len(prefixes)
+
+
+class AsnIndex:
+    """Read-only view over an index file built by `build_index`."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        with open(self.path, "rb") as fh:
+            self._mm = mmap.mmap(fh.fileno(), 0, access=mmap.ACCESS_READ)
+        magic, self.node_count, self._v4_root, self._v6_root, names_len = _HEADER.unpack_from(self._mm, 0)
+        if magic != MAGIC:
+            raise ValueError(f"{path} is not an ASN index")
+        self._names_offset = _HEADER.size + self.node_count * _NODE.size
+        self._names_len = names_len
+        self._names: dict[int, str] | None = None
+
+    def close(self) -> None:
+        self._mm.close()
+
+    def _key(self, offset: int, width: int) -> int:
+        return int.from_bytes(self._mm[offset + 16:offset + 32], "big") >> (128 - width)
+
+    def name(self, asn: int) -> Optional[str]:
+        if self._names is None:
+            blob = self._mm[self._names_offset:self._names_offset + self._names_len]
+            self._names = {int(k): v for k, v in json.loads(blob or b"{}").items()}
+        return self._names.get(asn)
+
+    def lookup_int(self, version: int, value: int) -> Optional[tuple[int, int]]:
+        """Longest-prefix match for an integer address. Returns (asn, prefix_len) or None."""
+        width = _width(version)
+        index = self._v4_root if version == 4 else self._v6_root
+        unpack, mm, size = _NODE_HEAD.unpack_from, self._mm, _NODE.size
+        # Descend on branch bits only; skipped (compressed) bits are verified afterwards,
+        # deepest candidate first, since a matching node implies all its ancestors match.
+        candidates = []
+        while index:
+            offset = _HEADER.size + index * size
+            left, right, asn, depth = unpack(mm, offset)
+            if asn:
+                candidates.append((offset, asn, depth))
+            if depth >= width:
+                break
+            index = right if (value >> (width - 1 - depth)) & 1 else left
+        for offset, asn, depth in reversed(candidates):
+            if not depth or not (value ^ self._key(offset, width)) >> (width - depth):
+                return asn, depth
+        return None
+
+    def lookup(self, ip: str) -> Optional[AsnMatch]:
+        try:
+            addr = ipaddress.ip_address(ip)
+        except ValueError:
+            return None
+        if addr.version == 6 and addr.ipv4_mapped is not None:
+            addr = addr.ipv4_mapped
+        found = self.lookup_int(addr.version, int(addr))
+        if found is None:
+            return None
+        asn, length = found
+        network = ipaddress.ip_network(f"{addr}/{length}", strict=False)
+        return AsnMatch(asn=asn, prefix=str(network), name=self.name(asn))
+
+    def lookup_many(self, ips: Iterable[str]) -> Iterator[tuple[str, Optional[AsnMatch]]]:
+        for ip in ips:
+            yield ip, self.lookup(ip)
+
+
+_index: AsnIndex | None = None
+_index_path: str | None = None
+_index_lock = threading.Lock()
+
+
+def get_index() -> Optional[AsnIndex]:
+    """The process-wide index for ``settings.asn_index_path``; None if it is not built."""
+    global _index, _index_path
+    path = settings.asn_index_path
+    if _index is not None and _index_path == path:
+        return _index
+    with _index_lock:
+        if _index is None or _index_path != path:
+            _index_path = path
+            try:
+                _index = AsnIndex(path) if path else None
+            except (OSError, ValueError):
+                _index = None
+    return _index
+
+
+def lookup(ip: str) -> Optional[AsnMatch]:
+    index = get_index()
+    return index.lookup(ip) if index is not None else None
+
+
+def _classify(index: AsnIndex, stream: TextIO, out: TextIO) -> None:
+    for ip, match in index.lookup_many(line.strip() for line in stream if line.strip()):
+        if match is None:
+            out.write(f"{ip}\t\t\t\n")
+        else:
+            out.write(f"{ip}\t{match.asn}\t{match.prefix}\t{match.name or ''}\n")
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if len(argv) == 3 and argv[0] == "build":
+        with open(argv[1], encoding="utf-8", errors="replace") as fh:
+            count = build_index(fh, argv[2])
+        print(f"indexed {count} prefixes into {argv[2]}")
+        return 0
+    if len(argv) == 2 and argv[0] == "classify":
+        _classify(AsnIndex(argv[1]), sys.stdin, sys.stdout)
+        return 0
+    print("usage: python -m app.services.asn_index build SOURCE OUT | classify INDEX < ips.txt", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,210 @@
+"""Edit-distance index over protected brand labels.
+
+SymSpell-style: every label is expanded into its deletion variants (up to
+``max_distance`` deleted characters), each variant is hashed to 64 bits and
+the (hash, label id) pairs are kept as sorted NumPy arrays. A query expands
+itself the same way, finds candidates with ``searchsorted`` and verifies them
+with an optimal-string-alignment (Damerau-Levenshtein) distance, so lookups
+cost O(deletes of the query), independent of the number of brands.
+
+Build offline and point BRAND_INDEX_PATH at the result::
+
+    python -m app.services.brand_index build data/brands.npz protected_brands.txt
+"""
+from __future__ import annotations
+import hashlib
+import json
+import sys
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional
+import numpy as np
+from ..config import settings
+
+
+@dataclass(frozen=True)
+class BrandMatch:
+    label: str      # protected label that matched, e.g. "amazon"
+    brand: str      # brand key it belongs to
+    distance: int   # OSA edit distance between the query and the label
+
+
+def _hash(term: str) -> int:
+    return int.from_bytes(hashlib.blake2b(term.encode("utf-8"), digest_size=8).digest(), "little")
+
+
+def _deletes(term: str, max_distance: int) -> set[str]:
+    variants = {term}
+    frontier = {term}
+    for _ in range(max_distance):
+        frontier = {t[:i] + t[i + 1:] for t in frontier for i in range(len(t))}
+        variants |= frontier
+    return variants
+
+
+def osa_distance(a: str, b: str, limit: int) -> int:
+    """Optimal string alignment distance, or limit + 1 once it is known to exceed `limit`."""
+    if a == b:
+        return 0
+    if abs(len(a) - len(b)) > limit:
+        return limit + 1
+    prev2: list[int] = []
+    prev = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        cur = [i] + [0] * len(b)
+        row_min = i
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            value = min(prev[j] + 1, cur[j - 1] + 1, prev[j - 1] + cost)
+            if i > 1 and j > 1 and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]:
+                value = min(value, prev2[j - 2] + 1)
+            cur[j] = value
+            row_min = min(row_min, value)
+        if row_min > limit:
+            return limit + 1
+        prev2, prev = prev, cur
+    return prev[-1] if prev[-1] <= limit else limit + 1
+
+
+class BrandIndex:
+    def __init__(self, labels: List[str], brands: List[str], canonical: Dict[str, List[str]],
+                 max_distance: int, keys: np.ndarray, ids: np.ndarray):
+        self.labels = labels
+        self.brands = brands
+        self.canonical = canonical
+        self.max_distance = max_distance
+        self._keys = keys
+        self._ids = ids
+
+    @classmethod
+    def build(cls, brands: Dict[str, Iterable[str]], max_distance: int = 2) -> "BrandIndex":
+        """`brands` maps brand key -> canonical domains; each brand key is indexed as a label."""
+        labels = sorted({b.lower() for b in brands if b})
+        owner = {b.lower(): b for b in brands}
+        keys: list[int] = []
+        ids: list[int] = []
+        for label_id, label in enumerate(labels):
+            variants = _deletes(label, max_distance)
+            keys.extend(_hash(variant) for variant in variants)
+            ids.extend([label_id] * len(variants))
+        key_arr = np.array(keys, dtype=np.uint64)
+        id_arr = np.array(ids, dtype=np.uint32)
+        order = np.lexsort((id_arr, key_arr))
+        return cls(
+            labels=labels,
+            brands=[owner[label] for label in labels],
+            canonical={owner[label]: list(brands[owner[label]]) for label in labels},
+            max_distance=max_distance,
+            keys=key_arr[order],
+            ids=id_arr[order],
+        )
+
+    def save(self, path: str | Path) -> None:
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        meta = {"max_distance": self.max_distance, "brands": self.brands, "canonical": self.canonical}
+        with open(path, "wb") as fh:
+            np.savez(fh, keys=self._keys, ids=self._ids, labels=np.array(self.labels, dtype=str),
+                     meta=np.array(json.dumps(meta)))
+
+    @classmethod
+    def load(cls, path: str | Path) -> "BrandIndex":
+        with np.load(path, allow_pickle=False) as data:
+            meta = json.loads(str(data["meta"]))
+            return cls(
+                labels=[str(label) for label in data["labels"]],
+                brands=meta["brands"],
+                canonical=meta["canonical"],
+                max_distance=int(meta["max_distance"]),
+                keys=data["keys"],
+                ids=data["ids"],
+            )
+
+    def __len__(self) -> int:
+        return len(self.labels)
+
+    def lookup(self, term: str, max_distance: Optional[int] = None) -> List[BrandMatch]:
+        """Protected labels within `max_distance` edits of `term`, nearest first."""
+        term = (term or "").lower()
+        limit = self.max_distance if max_distance is None else min(max_distance, self.max_distance)
+        if not term or not len(self._keys):
+            return []
+        hashes = np.array([_hash(v) for v in _deletes(term, limit)], dtype=np.uint64)
+        lo = np.searchsorted(self._keys, hashes, side="left")
+        hi = np.searchsorted(self._keys, hashes, side="right")
+        candidates = {int(i) for a, b in zip(lo, hi) if b > a for i in self._ids[a:b]}
+        matches = []
+        for label_id in candidates:
+            label = self.labels[label_id]
+            distance = osa_distance(term, label, limit)
+            if distance <= limit:
+                matches.append(BrandMatch(label=label, brand=self.brands[label_id], distance=distance))
+        matches.sort(key=lambda m: (m.distance, m.label))
+        return matches
+
+
+def load_protected_brands(path: str | Path) -> Dict[str, List[str]]:
+    """Read a brand list: `brand<TAB>domain,domain` lines, or bare registrable domains (label = first label)."""
+    brands: Dict[str, List[str]] = {}
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if not line or line.startswith("#"):
+                continue
+            if "\t" in line:
+                brand, _, domains = line.partition("\t")
+                brands.setdefault(brand.strip().lower(), []).extend(
+                    d.strip().lower() for d in domains.split(",") if d.strip()
+                )
+            elif "." in line:
+                domain = line.lower()
+                brands.setdefault(domain.split(".")[0], []).append(domain)
+            else:
+                brands.setdefault(line.lower(), [])
+    return brands
+
+
+def _configured_brands() -> Dict[str, List[str]]:
+    brands = {brand: list(domains) for brand, domains in settings.canonical_brands.items()}
+    if settings.protected_brands_path and Path(settings.protected_brands_path).exists():
+        for brand, domains in load_protected_brands(settings.protected_brands_path).items():
+            brands.setdefault(brand, []).extend(d for d in domains if d not in brands[brand])
+    return brands
+
+
+_index: BrandIndex | None = None
+_index_lock = threading.Lock()
+
+
+def get_brand_index() -> BrandIndex:
+    """Process-wide index: loaded from BRAND_INDEX_PATH when present, else built from settings once."""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                path = settings.brand_index_path
+                if path and Path(path).exists():
+                    _index = BrandIndex.load(path)
+                else:
+                    _index = BrandIndex.build(_configured_brands(), settings.brand_index_max_distance)
+    return _index
+
+
+def main(argv: list[str] | None = None) -> int:
+    argv = sys.argv[1:] if argv is None else argv
+    if argv[:1] == ["build"] and len(argv) in (2, 3):
+        brands = {brand: list(domains) for brand, domains in settings.canonical_brands.items()}
+        if len(argv) == 3:
+            for brand, domains in load_protected_brands(argv[2]).items():
+                brands.setdefault(brand, []).extend(domains)
+        index = BrandIndex.build(brands, settings.brand_index_max_distance)
+        index.save(argv[1])
+        print(f"indexed {len(index)} brands ({len(index._keys)} delete variants) into {argv[1]}")
+        return 0
+    print("usage: python -m app.services.brand_index build OUT.npz [protected_brands.txt]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
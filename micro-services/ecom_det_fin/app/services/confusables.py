@@ -0,0 +1,57 @@
+from __future__ import annotations
+import threading
+import unicodedata
+from pathlib import Path
+from typing import Dict, Optional
+from ..config import settings
+
+DEFAULT_PATH = Path(__file__).resolve().parent.parent / "data" / "confusables.txt"
+
+_table: Dict[int, str] | None = None
+_table_path: Optional[str] = None
+_lock = threading.Lock()
+
+
+def load_table(path: str | Path) -> Dict[int, str]:
+    """Parse a UTS #39 confusables.txt into a `str.translate` table (single-code-point sources only)."""
+    table: Dict[int, str] = {}
+    with open(path, encoding="utf-8-sig") as fh:
+        for line in fh:
+            data = line.split("#", 1)[0].strip()
+            if not data:
+                continue
+            fields = [f.strip() for f in data.split(";")]
+            if len(fields) < 2:
+                continue
+            source = fields[0].split()
+            if len(source) != 1:
+                continue
+            table[int(source[0], 16)] = "".join(chr(int(cp, 16)) for cp in fields[1].split())
+    return table
+
+
+def _get_table() -> Dict[int, str]:
+    global _table, _table_path
+    path = settings.confusables_path or str(DEFAULT_PATH)
+    if _table is None or _table_path != path:
+        with _lock:
+            if _table is None or _table_path != path:
+                _table = load_table(path)
+                _table_path = path
+    return _table
+
+
+def skeleton(text: str) -> str:
+    """UTS #39 skeleton: NFD, map each confusable to its prototype, NFD again (input is casefolded first)."""
+    nfd = unicodedata.normalize("NFD", text.casefold())
+    return unicodedata.normalize("NFD", nfd.translate(_get_table()))
+
+
+def decode_label(label: str) -> str:
+    """Unicode form of a hostname label; punycode (xn--) labels that fail to decode are returned unchanged."""
+    if label.startswith("xn--"):
+        try:
+            return label[4:].encode("ascii").decode("punycode")
+        except (UnicodeError, ValueError):
+            return label
+    return label
@@ -0,0 +1,33 @@
+"""Per-scan stop time, carried in a context variable.
+
+A scan started for a caller with a deadline may keep running for
+SCAN_BACKGROUND_BUDGET seconds past it, so its pending layers can still
+complete the stored result. `clamp` shortens the timeouts of the executor's
+producers and layers (and so of every outbound call made under them) to that
+stop time. Tasks copy the context when created, so everything the scan
+starts sees the stop time set by the task running it.
+"""
+from __future__ import annotations
+import time
+from contextvars import ContextVar
+from typing import Optional
+
+# time.monotonic() by which work for the current scan has to stop (None: no deadline)
+_stop_at: ContextVar[Optional[float]] = ContextVar("scan_stop_at", default=None)
+
+
+def set_stop(at: Optional[float]) -> None:
+    _stop_at.set(at)
+
+
+def remaining() -> Optional[float]:
+    at = _stop_at.get()
+    return None if at is None else max(0.0, at - time.monotonic())
+
+
+def clamp(timeout: Optional[float]) -> Optional[float]:
+    """`timeout` shortened to the time left before the stop (None stays unbounded without one)."""
+    left = remaining()
+    if left is None:
+        return timeout
+    return left if timeout is None else min(timeout, left)
@@ -0,0 +1,130 @@
+from __future__ import annotations
+import asyncio
+import ipaddress
+from dataclasses import dataclass, field
+from typing import List
+import dns.asyncresolver
+import dns.exception
+import dns.resolver
+from ..config import settings
+from ..utils.parsing import registrable_domain
+from .ttl_cache import TTLCache, MISSING
+
+
+@dataclass
+class DnsInfo:
+    host: str
+    a: List[str] = field(default_factory=list)
+    aaaa: List[str] = field(default_factory=list)
+    mx: List[str] = field(default_factory=list)
+    ns: List[str] = field(default_factory=list)
+    txt: List[str] = field(default_factory=list)
+    failed: bool = False  # a query timed out or errored, so empty lists are inconclusive
+
+    @property
+    def addresses(self) -> List[str]:
+        return self.a + self.aaaa
+
+
+# (name, rdtype) -> list of answers; expiry follows the record TTL (clamped), NXDOMAIN/NoAnswer cached briefly
+dns_cache = TTLCache("dns", max_entries=settings.dns_cache_size)
+
+
+def _upstreams() -> list[tuple[str, int]]:
+    servers = []
+    for item in (settings.dns_upstream or "").split(","):
+        item = item.strip()
+        if not item:
+            continue
+        if item.startswith("["):  # [ipv6]:port
+            host, _, port = item[1:].partition("]")
+            port = port.lstrip(":")
+        elif item.count(":") == 1:
+            host, _, port = item.partition(":")
+        else:
+            host, port = item, ""
+        servers.append((host, int(port) if port else 53))
+    return servers
+
+
+_resolvers: dict[tuple, dns.asyncresolver.Resolver] = {}
+
+
+def _resolver() -> dns.asyncresolver.Resolver:
+    key = (settings.dns_upstream, settings.dns_timeout)
+    resolver = _resolvers.get(key)
+    if resolver is None:
+        upstreams = _upstreams()
+        resolver = dns.asyncresolver.Resolver(configure=not upstreams)
+        if upstreams:
+            resolver.nameservers = [host for host, _ in upstreams]
+            resolver.nameserver_ports = {host: port for host, port in upstreams}
+        resolver.lifetime = settings.dns_timeout
+        _resolvers[key] = resolver
+    return resolver
+
+
+def _format(rdtype: str, rdata) -> str:
+    if rdtype == "MX":
+        return rdata.exchange.to_text(omit_final_dot=True).lower()
+    if rdtype == "NS":
+        return rdata.target.to_text(omit_final_dot=True).lower()
+    if rdtype == "TXT":
+        return b"".join(rdata.strings).decode("utf-8", errors="replace")
+    return rdata.to_text()
+
+
+async def resolve(name: str, rdtype: str) -> List[str] | None:
+    """Resolve one record type through the TTL cache.
+
+    Returns [] for NXDOMAIN/no answer and None when the query itself failed.
+    """
+    key = f"{name.lower()}|{rdtype}"
+    cached = dns_cache.get(key)
+    if cached is not MISSING:
+        return list(cached)
+    try:
+        answer = await _resolver().resolve(name, rdtype, search=False)
+    except (dns.resolver.NXDOMAIN, dns.resolver.NoAnswer):
+        dns_cache.set(key, [], settings.dns_negative_ttl)
+        return []
+    except (dns.exception.DNSException, OSError):
+        # Timeouts/SERVFAIL are not cached so the next scan retries
+        return None
+    values = [_format(rdtype, r) for r in answer]
+    ttl = answer.rrset.ttl if answer.rrset is not None else settings.dns_min_ttl
+    dns_cache.set(key, values, max(settings.dns_min_ttl, min(settings.dns_max_ttl, ttl)))
+    return values
+
+
+async def lookup(host: str) -> DnsInfo:
+    """A/AAAA for the host plus MX/NS/TXT for its registrable domain, queried concurrently."""
+    host = (host or "").strip(".").lower()
+    info = DnsInfo(host=host)
+    if not host:
+        return info
+    try:
+        ip = ipaddress.ip_address(host)
+        if ip.version == 4:
+            info.a = [host]
+        else:
+            info.aaaa = [host]
+        return info
+    except ValueError:
+        pass
+    zone = registrable_domain(host)
+    results = await asyncio.gather(
+        resolve(host, "A"),
+        resolve(host, "AAAA"),
+        resolve(zone, "MX"),
+        resolve(zone, "NS"),
+        resolve(zone, "TXT"),
+    )
+    info.failed = any(r is None for r in results)
+    info.a, info.aaaa, info.mx, info.ns, info.txt = (r or [] for r in results)
+    return info
+
+
+def lookup_blocking(host: str) -> DnsInfo:
+    """For synchronous callers running outside an event loop (e.g. threadpool endpoints)."""
+    return asyncio.run(lookup(host))
@@ -0,0 +1,94 @@
+from __future__ import annotations
+import bisect
+import threading
+from collections import deque
+from typing import Deque, Dict, List, Optional
+from ..config import settings
+
+# Log-spaced bucket upper bounds from 10 ms to ~80 s (about 12% apart)
+_BOUNDS: List[float] = [0.01 * 1.12 ** i for i in range(80)]
+
+
+class LatencyHistogram:
+    """Bucketed histogram over the last `window` samples."""
+
+    def __init__(self, window: int):
+        self.window = window
+        self.counts = [0] * (len(_BOUNDS) + 1)
+        self._recent: Deque[int] = deque()
+
+    def __len__(self) -> int:
+        return len(self._recent)
+
+    def add(self, seconds: float) -> None:
+        bucket = bisect.bisect_left(_BOUNDS, seconds)
+        self._recent.append(bucket)
+        self.counts[bucket] += 1
+        while len(self._recent) > self.window:
+            self.counts[self._recent.popleft()] -= 1
+
+    def percentile(self, pct: float) -> Optional[float]:
+        """Upper bound of the bucket holding the pct-th percentile (None when empty)."""
+        n = len(self._recent)
+        if not n:
+            return None
+        rank = max(1, round(n * pct / 100.0))
+        seen = 0
+        for bucket, count in enumerate(self.counts):
+            seen += count
+            if seen >= rank:
+                return _BOUNDS[min(bucket, len(_BOUNDS) - 1)]
+        return _BOUNDS[-1]
+
+
+class LatencyTracker:
+    """Rolling per-layer latency used to size layer timeouts."""
+
+    def __init__(self):
+        self._hists: Dict[str, LatencyHistogram] = {}
+        self._lock = threading.Lock()
+
+    def record(self, name: str, seconds: float) -> None:
+        with self._lock:
+            hist = self._hists.get(name)
+            if hist is None:
+                hist = self._hists[name] = LatencyHistogram(settings.layer_latency_window)
+            hist.add(seconds)
+
+    def percentile(self, name: str, pct: float) -> Optional[float]:
+        """pct-th percentile for `name`, or None until LAYER_LATENCY_MIN_SAMPLES have been seen."""
+        with self._lock:
+            hist = self._hists.get(name)
+            if hist is None or len(hist) < settings.layer_latency_min_samples:
+                return None
+            return hist.percentile(pct)
+
+    def timeout(self, name: str, default: Optional[float]) -> Optional[float]:
+        """Percentile latency plus headroom within the configured bounds.
+
+        Falls back to `default` until enough samples have been seen; a layer
+        without a default timeout stays unbounded.
+        """
+        if default is None:
+            return None
+        observed = self.percentile(name, settings.layer_timeout_percentile)
+        if observed is None:
+            return default
+        return max(settings.layer_timeout_min, min(settings.layer_timeout_max, observed * settings.layer_timeout_headroom))
+
+    def stats(self) -> Dict[str, dict]:
+        with self._lock:
+            names = list(self._hists)
+            out = {}
+            for name in names:
+                hist = self._hists[name]
+                out[name] = {
+                    "samples": len(hist),
+                    "p50": hist.percentile(50),
+                    "p90": hist.percentile(90),
+                    "p99": hist.percentile(99),
+                }
+        return out
+
+
+layer_latency = LatencyTracker()
@@ -0,0 +1,62 @@
+"""Per-layer result cache.
+
+Layers go stale at different rates, so each LayerSpec carries its own `ttl`
+(None: never cached), a `cache_scope` and a `version`. Results are keyed by
+(layer, version, scope key), where the scope key is the origin
+(scheme://host) for layers that only look at the host, or the normalized URL
+for layers that read the page. LAYER_CACHE_TTLS_JSON overrides the
+registered TTLs; LAYER_CACHE_DB adds SQLite write-through so results survive
+restarts.
+
+Only clean results are stored: timeouts, errors and results worded as
+failures (see risk_rules.FAILURE_MARKERS) are recomputed on the next scan.
+"""
+from __future__ import annotations
+from types import SimpleNamespace
+from typing import Any, Optional, Tuple
+from urllib.parse import urlparse
+
+from ..config import settings
+from ..utils.parsing import normalize_url
+from .risk_rules import FAILURE_MARKERS
+from .ttl_cache import TTLCache
+
+SCOPES = ("host", "url")
+
+layer_results = TTLCache("layer", max_entries=settings.layer_cache_size, db_path=settings.layer_cache_db)
+
+
+def ttl(spec) -> Optional[float]:
+    """Seconds a result of `spec` stays fresh, or None when the layer is not cached."""
+    override = settings.layer_cache_ttls.get(spec.name)
+    value = spec.ttl if override is None else override
+    return value if value else None
+
+
+def cache_key(spec, url: str) -> str:
+    normalized = normalize_url(url)
+    if spec.cache_scope == "host":
+        p = urlparse(normalized)
+        normalized = f"{p.scheme}://{p.netloc}"
+    return f"{spec.name}:v{spec.version}:{normalized}"
+
+
+def get(spec, url: str) -> Optional[Tuple[Any, float]]:
+    """(result, age in seconds) of a fresh cached result for `spec` on `url`, or None."""
+    if ttl(spec) is None:
+        return None
+    hit = layer_results.get_with_age(cache_key(spec, url))
+    if hit is None:
+        return None
+    value, age = hit
+    return SimpleNamespace(score=value["score"], message=value["message"], status="ok"), age
+
+
+def put(spec, url: str, result: Any) -> None:
+    lifetime = ttl(spec)
+    if lifetime is None or getattr(result, "status", "ok") != "ok":
+        return
+    message = str(result.message)
+    if any(marker in message.lower() for marker in FAILURE_MARKERS):
+        return
+    layer_results.set(cache_key(spec, url), {"score": float(result.score), "message": message}, lifetime)
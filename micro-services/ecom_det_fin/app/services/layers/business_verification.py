@@ -2,8 +2,20 @@ from __future__ import annotations
 import re
 import httpx
 from dataclasses import dataclass
+from functools import lru_cache
 from typing import Optional, Dict, List
 from ...config import settings
+from ...utils.patterns import PatternSet
+from ..page_features import PageFeatures, extract_features
+from ..page_snapshot import PageSnapshot, fetch_snapshot
+
+TRUST_BADGE_WORDS = PatternSet(['ssl', 'secure', 'verified', 'certified', 'licensed'], word_boundary=False)
+
+
+@lru_cache(maxsize=4)
+def _payment_gateways(names: tuple[str, ...]) -> PatternSet:
+    return PatternSet(names)
+
 
 @dataclass
 class BusinessVerification:
@@ -27,35 +39,32 @@ async def _verify_gst_number(gst: str) -> bool:
     pattern = r'^[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}$'
     return bool(re.match(pattern, gst.upper()))
 
-async def _extract_business_info(html: str) -> Dict:
-    """Extract business indicators from HTML content"""
-    from bs4 import BeautifulSoup
-    soup = BeautifulSoup(html, 'lxml')
-    text = soup.get_text(' ').lower()
+async def _extract_business_info(features: PageFeatures) -> Dict:
+    """Extract business indicators from the page's features"""
+    text = features.text.lower()
     
     info = {
         'has_gst': bool(re.search(r'\b[0-9]{2}[a-z]{5}[0-9]{4}[a-z]{1}[1-9a-z]{1}z[0-9a-z]{1}\b', text, re.I)),
         'has_phone': bool(re.search(r'\+?[\d\s\-\(\)]{8,15}', text)),
-        'has_email': bool(re.search(r'[a-z0-9._%+-]+@[a-z0-9.-]+\.[a-z]{2,}', text)),
+        'has_email': bool(features.emails),
         'has_address': bool(re.search(r'\b(street|road|avenue|block|plot|building|floor)\b', text)),
         'payment_gateways': [],
         'social_links': [],
         'trust_badges': []
     }
     
-    # Detect payment gateways
-    for gateway in settings.trusted_payment_processors:
-        if gateway.lower() in text:
-            info['payment_gateways'].append(gateway)
+    # Detect payment gateways (one pass over the text for the whole list)
+    gateways = _payment_gateways(tuple(settings.trusted_payment_processors))
+    found = gateways.found(text)
+    info['payment_gateways'] = [g for g in settings.trusted_payment_processors if g in found]
     
     # Detect social media links
-    links = [a.get('href', '') for a in soup.find_all('a', href=True)]
-    for link in links:
+    for link in features.hrefs:
         if any(social in link for social in ['facebook.com', 'twitter.com', 'linkedin.com', 'instagram.com']):
             info['social_links'].append(link)
     
     # Detect trust badges/certifications
-    if any(badge in text for badge in ['ssl', 'secure', 'verified', 'certified', 'licensed']):
+    if TRUST_BADGE_WORDS.search(text) is not None:
         info['trust_badges'] = ['security_indicators']
     
     return info
@@ -85,7 +94,7 @@ async def _verify_opencorporates(company_name: str, country: str = "in") -> Opti
     
     return None
 
-async def analyze(url: str, html_content: str = None) -> LayerResult:
+async def analyze(url: str, html_content: str = None, snapshot: PageSnapshot | None = None) -> LayerResult:
     """Comprehensive business verification analysis"""
     from urllib.parse import urlparse
     parsed = urlparse(url)
@@ -107,19 +116,20 @@ async def analyze(url: str, html_content: str = None) -> LayerResult:
             verification=verification
         )
     
-    if not html_content:
-        try:
-            async with httpx.AsyncClient(timeout=5.0) as client:
-                response = await client.get(url)
-                html_content = response.text if response.status_code == 200 else ""
-        except Exception:
+    if html_content:
+        features = extract_features(html_content)
+    else:
+        if snapshot is None:
+            snapshot = await fetch_snapshot(url)
+        if not snapshot.fetched:
             return LayerResult(
                 score=30.0, 
                 message="Could not fetch content for business verification"
             )
+        features = snapshot.features if snapshot.status_code == 200 else PageFeatures()
     
     # Extract business information
-    business_info = await _extract_business_info(html_content)
+    business_info = await _extract_business_info(features)
     
     # Score calculation
     score = 0.0
@@ -131,7 +141,7 @@ async def analyze(url: str, html_content: str = None) -> LayerResult:
     # GST verification (India specific)
     if business_info['has_gst']:
         gst_numbers = re.findall(r'\b[0-9]{2}[A-Z]{5}[0-9]{4}[A-Z]{1}[1-9A-Z]{1}Z[0-9A-Z]{1}\b', 
-                                html_content, re.I)
+                                features.text, re.I)
         if gst_numbers:
             gst_valid = await _verify_gst_number(gst_numbers[0])
             verification.gst_valid = gst_valid
@@ -1,12 +1,13 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Tuple
-import re
 import httpx
-from bs4 import BeautifulSoup
 from urllib.parse import urljoin
 from ...config import settings
 from urllib.parse import urlparse
+from ..page_snapshot import PageSnapshot, fetch_snapshot
+from ...utils.host_parser import PLATFORM, STOREFRONT, parse_host
+from ...utils.patterns import PatternSet
 
 FAKE_URGENCY_PHRASES = [
     r"last\s*few\s*left",
@@ -15,104 +16,82 @@ FAKE_URGENCY_PHRASES = [
     r"limited\s*time",
     r"flash\s*sale",
 ]
+URGENCY = PatternSet(regexes=FAKE_URGENCY_PHRASES, word_boundary=False)
+POLICIES = ["refund", "return", "privacy", "terms", "contact"]
+POLICY_WORDS = PatternSet(POLICIES, word_boundary=False)
+CONTACT_WORDS = PatternSet(["contact", "email", "phone"])
 
 @dataclass
 class LayerResult:
     score: float
     message: str
 
-async def _fetch_html(url: str) -> str | None:
-    try:
-        timeout = httpx.Timeout(3.0, connect=1.5)
-        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
-            res = await client.get(url)
-            if res.status_code < 400 and "text/html" in res.headers.get("content-type", ""):
-                return res.text
-    except Exception:
-        return None
-    return None
-
-
-def _check_policy_presence(soup: BeautifulSoup) -> tuple[int, list[str]]:
+def _check_policy_presence(text: str) -> tuple[int, list[str]]:
     risk = 0
     reasons: list[str] = []
-    text = soup.get_text(" ").lower()
-    policies = ["refund", "return", "privacy", "terms", "contact"]
-    missing = [p for p in policies if p not in text]
+    found = POLICY_WORDS.found(text)
+    missing = [p for p in POLICIES if p not in found]
     if missing:
         risk += 20
         reasons.append(f"Policies missing: {', '.join(missing[:3])}")
     # contact info
-    if not re.search(r"\bcontact\b|\bemail\b|\bphone\b", text):
+    if CONTACT_WORDS.search(text) is None:
         risk += 15
         reasons.append("Contact info not obvious")
     return risk, reasons
 
 
-def _check_fake_urgency(soup: BeautifulSoup) -> tuple[int, list[str]]:
+def _check_fake_urgency(text: str) -> tuple[int, list[str]]:
     risk = 0
     reasons: list[str] = []
-    text = soup.get_text(" ").lower()
-    for pat in FAKE_URGENCY_PHRASES:
-        if re.search(pat, text):
-            risk += 10
-            reasons.append("Fake urgency detected")
-            break
+    if URGENCY.search(text) is not None:
+        risk += 10
+        reasons.append("Fake urgency detected")
     return risk, reasons
 
 
-async def analyze(url: str) -> LayerResult:
-    html = await _fetch_html(url)
-    if not html:
+async def analyze(url: str, snapshot: PageSnapshot | None = None) -> LayerResult:
+    if snapshot is None:
+        snapshot = await fetch_snapshot(url)
+    if not snapshot.fetched or snapshot.status_code >= 400 or not snapshot.is_html or not snapshot.content:
         return LayerResult(score=20.0, message="Could not fetch page or not HTML")
-    soup = BeautifulSoup(html, "lxml")
+    features = snapshot.features
 
     total_risk = 0
     reasons: list[str] = []
 
     # Platform-aware: if root domain is a known platform and not a hosted storefront, don't apply policy penalties
     parsed = urlparse(url)
-    host = (parsed.hostname or '').lower()
-    is_platform_root = any(host.endswith(p) for p in settings.platform_domains)
-    is_hosted_store = any(host.endswith(suf) for suf in settings.hosted_storefront_suffixes)
+    host = parse_host(parsed.hostname or '')
+    is_platform_root = host.platform_class == PLATFORM
+    is_hosted_store = host.platform_class == STOREFRONT
     if not is_platform_root or is_hosted_store:
-        r1, rs1 = _check_policy_presence(soup)
+        r1, rs1 = _check_policy_presence(features.text)
         total_risk += r1
         reasons += rs1
 
-    r2, rs2 = _check_fake_urgency(soup)
+    r2, rs2 = _check_fake_urgency(features.text)
     total_risk += r2
     reasons += rs2
 
     # Heuristic: detect presence of social links (trust signal) vs none
     social_domains = ["facebook.com", "twitter.com", "x.com", "instagram.com", "linkedin.com"]
-    social = [a.get('href','') for a in soup.find_all('a')]
+    social = features.hrefs
 
     # Try extracting social links from JSON-LD sameAs entries
-    try:
-        import json
-        for script in soup.find_all('script', type=lambda t: t and 'ld+json' in t):
-            try:
-                data = json.loads(script.string or "{}")
-                # data can be a dict or a list of dicts
-                objs = data if isinstance(data, list) else [data]
-                for obj in objs:
-                    same_as = obj.get('sameAs') if isinstance(obj, dict) else None
-                    if isinstance(same_as, list):
-                        social.extend([str(u) for u in same_as])
-            except Exception:
-                continue
-    except Exception:
-        pass
+    for data in features.json_ld:
+        # data can be a dict or a list of dicts
+        objs = data if isinstance(data, list) else [data]
+        for obj in objs:
+            same_as = obj.get('sameAs') if isinstance(obj, dict) else None
+            if isinstance(same_as, list):
+                social.extend([str(u) for u in same_as])
 
     # Also check meta tags commonly used for social profiles
-    try:
-        for meta in soup.find_all('meta'):
-            content = meta.get('content') or meta.get('value') or ''
-            if content:
-                social.append(content)
-    except Exception:
-        pass
+    for meta in features.meta:
+        content = meta.get('content') or meta.get('value') or ''
+        if content:
+            social.append(content)
 
     if not any(any(s in h for s in social_domains) for h in social):
         total_risk += 5
@@ -120,7 +99,7 @@ async def analyze(url: str) -> LayerResult:
 
     # Shallow broken link scan (only anchors on same host, up to 5)
     try:
-        samples = [a.get('href') for a in soup.find_all('a', href=True)][:10]
+        samples = features.hrefs[:10]
         broken = 0
         if samples:
             base = url
@@ -142,7 +121,7 @@ async def analyze(url: str) -> LayerResult:
 
     # Contact email domain heuristic (free email domains for store contact)
     try:
-        emails = set(re.findall(r"[A-Za-z0-9._%+-]+@([A-Za-z0-9.-]+)", soup.get_text(" ")))
+        emails = {email.split("@", 1)[1] for email in features.emails}
         for dom in emails:
             if dom.lower() in settings.free_email_domains:
                 total_risk += 10
@@ -155,10 +134,10 @@ async def analyze(url: str) -> LayerResult:
     try:
         # Apply brand title mismatch only when not on platform root (homepages often reference multiple brands)
         if not is_platform_root or is_hosted_store:
-            title = (soup.title.string or "").lower() if soup.title else ""
+            title = features.title.lower()
             for brand, canon_list in settings.canonical_brands.items():
                 if brand in title:
-                    if not any(c in url for c in canon_list):
+                    if host.registrable not in canon_list:
                         total_risk += 25
                         reasons.append(f"Brand lookalike: mentions '{brand}' but domain not canonical")
                         break
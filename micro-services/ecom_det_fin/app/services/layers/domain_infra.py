@@ -1,16 +1,17 @@
 from __future__ import annotations
 from dataclasses import dataclass
 from typing import Tuple
+from functools import lru_cache
 import datetime as dt
 from urllib.parse import urlparse
 import idna
 from ...config import settings
 from difflib import SequenceMatcher
-
-try:
-    import whois
-except Exception:  # pragma: no cover
-    whois = None
+from ..whois_cache import WhoisRecord
+from ..brand_index import BrandIndex, BrandMatch, get_brand_index
+from ..confusables import skeleton, decode_label
+from ...utils.host_parser import HostParts, parse_host
+from ..typo_permutations import Permutation, get_permutations
 
 @dataclass
 class LayerResult:
@@ -18,14 +19,9 @@ class LayerResult:
     message: str
 
 
-def _domain_age_days(domain: str) -> int | None:
-    if not whois:
-        return None
+def _domain_age_days(record: WhoisRecord | None) -> int | None:
     try:
-        data = whois.whois(domain)
-        created = data.creation_date
-        if isinstance(created, list):
-            created = created[0]
+        created = record.creation_date if record else None
         if not created:
             return None
         if isinstance(created, dt.datetime):
@@ -37,65 +33,91 @@ def _domain_age_days(domain: str) -> int | None:
         return None
 
 
-def _detect_typosquatting(domain: str) -> float:
-    """Advanced typosquatting detection with multiple strategies"""
+def _is_canonical(registrable: str) -> bool:
+    """A domain any brand lists as its own is never a lookalike of another (ebay.co.uk vs etsy)."""
+    return any(registrable in domains for domains in get_brand_index().canonical.values())
+
+
+def _detect_typosquatting(domain: str) -> Tuple[float, Permutation | None]:
+    """Advanced typosquatting detection with multiple strategies.
+    Returns the risk and, for exact permutation hits, the brand and attack class."""
     if not domain:
-        return 0.0
+        return 0.0, None
     
     risk = 0.0
-    parts = domain.split('.')
-    sld = parts[-2] if len(parts) >= 2 else parts[0]
+    host = parse_host(domain)
+    sld = host.sld
+    if _is_canonical(host.registrable):
+        return 0.0, None
     
-    # Known typosquatting patterns for major brands
-    typosquat_patterns = {
-        "amazon": ["amzon", "amazom", "amazone", "amazn", "amaozn", "amaxon", "amzaon"],
-        "flipkart": ["flipkrt", "flipkat", "flikart", "flpkart", "flipcart"],
-        "google": ["googel", "gogle", "googl", "goolge", "gooogle"],
-        "facebook": ["facbook", "facebuk", "facboook", "facebok"],
-        "paypal": ["payp4l", "payapl", "paipal", "paypal1"],
-        "apple": ["aple", "appel", "aplle", "applle"],
-        "microsoft": ["mircosoft", "microsooft", "micorsoft"],
-    }
+    # Known typosquatting patterns: precomputed permutations of every canonical brand
+    perm = get_permutations().lookup(sld)
+    if perm is not None and perm.attack == "tld-swap":
+        # The brand's exact label under a suffix it does not list is often the brand's own ccTLD
+        # (apple.co.uk, google.de): a medium signal, raised on abused TLDs, never a veto
+        return (45.0 if f".{host.tld}" in settings.suspicious_tlds else 25.0), perm
+    if perm is not None:
+        return 85.0, perm  # Critical risk for known typosquats
     
-    # Check exact matches against known typosquats
-    for brand, patterns in typosquat_patterns.items():
-        if sld.lower() in patterns:
-            return 85.0  # Critical risk for known typosquats
-    
-    # Advanced character-level analysis
-    for brand, canon_list in settings.canonical_brands.items():
-        # Skip if already canonical
-        if any(c in domain for c in canon_list):
-            continue
-            
-        brand_lower = brand.lower()
-        sld_lower = sld.lower()
+    # Advanced character-level analysis against nearby brands from the edit-distance index
+    index = get_brand_index()
+    sld_lower = sld.lower()
+    for match in index.lookup(sld_lower):
+        brand_lower = match.label
         
         # Character substitution detection
         if len(sld_lower) == len(brand_lower):
             diff_count = sum(1 for a, b in zip(sld_lower, brand_lower) if a != b)
             if diff_count == 1:  # Single character difference
-                return 80.0  # Very high risk
+                return 80.0, None  # Very high risk
             elif diff_count == 2:  # Two character difference  
-                return 70.0  # High risk
+                return 70.0, None  # High risk
         
         # Character omission/insertion detection
         elif abs(len(sld_lower) - len(brand_lower)) <= 2:
             sim = SequenceMatcher(None, sld_lower, brand_lower).ratio()
             if sim >= 0.85:  # Very similar despite length difference
-                return 75.0  # Very high risk
+                return 75.0, None  # Very high risk
     
-    return risk
+    return risk, None
+
+
+@lru_cache(maxsize=1)
+def _skeleton_brands(index: BrandIndex) -> dict[str, BrandMatch]:
+    # Protected labels keyed by their own skeleton, so a full confusables table also folds the brand side
+    return {skeleton(label): BrandMatch(label=label, brand=brand, distance=0)
+            for label, brand in zip(index.labels, index.brands)}
+
+
+def _detect_homograph(host: HostParts) -> Tuple[str, BrandMatch] | None:
+    """Return (unicode label, brand match) when a non-ASCII label's skeleton is, or nearly is, a protected brand."""
+    index = get_brand_index()
+    labels = (host.subdomain.split(".") if host.subdomain else []) + [host.sld]
+    for label in labels:
+        unicode_label = decode_label(label)
+        if unicode_label.isascii():
+            continue
+        skel = skeleton(unicode_label)
+        exact = _skeleton_brands(index).get(skel)
+        if exact is not None:
+            return unicode_label, exact
+        near = index.lookup(skel, max_distance=1)
+        if near:
+            return unicode_label, near[0]
+    return None
 
 
 PHISHING_TOKENS = {"refund","order","support","verify","payment","account","login","secure","security","update"}
 
-def analyze(url: str) -> LayerResult:
+def analyze(url: str, registration: WhoisRecord | None = None, check_age: bool = True) -> LayerResult:
     """Heuristic domain/infra checks: WHOIS age, SSL presence (scheme), basic sanity.
-    Returns higher score for risky signals.
+    Returns higher score for risky signals. `registration` is looked up by the caller
+    (see rdap_client.lookup) so this function never blocks on the network. With
+    `check_age` off (offline scans) the missing registration is not held against the site.
     """
     parsed = urlparse(url)
     domain = parsed.hostname or ""
+    host = parse_host(domain)
 
     reasons = []
     risk = 0.0
@@ -107,10 +129,14 @@ def analyze(url: str) -> LayerResult:
         return LayerResult(score=0.0, message="; ".join(reasons))
 
     # CRITICAL PRE-FILTER: Known typosquatting patterns
-    typosquat_risk = _detect_typosquatting(domain)
+    typosquat_risk, permutation = _detect_typosquatting(domain)
     if typosquat_risk > 0:
         risk += typosquat_risk
-        if typosquat_risk >= 75:
+        if permutation is not None and permutation.attack == "tld-swap":
+            reasons.append(f"Brand label '{permutation.brand}' on unlisted suffix .{host.suffix}")
+        elif permutation is not None:
+            reasons.append(f"CRITICAL THREAT: Known typosquatting pattern detected ({permutation.attack} of '{permutation.brand}')")
+        elif typosquat_risk >= 75:
             reasons.append("CRITICAL THREAT: Known typosquatting pattern detected")
         elif typosquat_risk >= 50:
             reasons.append("HIGH THREAT: Suspicious brand impersonation pattern")
@@ -121,8 +147,10 @@ def analyze(url: str) -> LayerResult:
         reasons.append("No HTTPS detected")
 
     # Domain age
-    age_days = _domain_age_days(domain)
-    if age_days is None:
+    age_days = _domain_age_days(registration)
+    if not check_age:
+        pass
+    elif age_days is None:
         # Unknown age -> slight risk
         risk += 10
         reasons.append("Unknown domain age")
@@ -136,18 +164,24 @@ def analyze(url: str) -> LayerResult:
 
     # TLD risk
     try:
-        tld = "." + (domain.split(".")[-1] if "." in domain else "")
+        tld = "." + host.tld if host.tld else ""
         if tld and tld.lower() in settings.suspicious_tlds:
             risk += 10
             reasons.append(f"Suspicious TLD {tld}")
     except Exception:
         pass
 
-    # Punycode / IDN homograph suspicion
+    # Punycode / IDN homograph detection via confusable skeletons
     try:
-        if domain.startswith("xn--"):
-            risk += 10
-            reasons.append("IDN/punycode domain")
+        if any(label.startswith("xn--") or not label.isascii() for label in domain.split(".")):
+            homograph = _detect_homograph(host)
+            if homograph is not None:
+                unicode_label, match = homograph
+                risk += 75 if settings.strict_mode else 65
+                reasons.append(f"CRITICAL: IDN homograph attack: '{unicode_label}' is visually confusable with '{match.brand}'")
+            else:
+                risk += 10
+                reasons.append("IDN/punycode domain")
         else:
             _ = idna.encode(domain)
     except Exception:
@@ -155,21 +189,21 @@ def analyze(url: str) -> LayerResult:
         reasons.append("Invalid IDNA domain encoding")
 
     # Excessive subdomains can be phishing signal (e.g., brand.payment.example.xyz)
-    if domain.count('.') >= 3:
+    if host.subdomain.count('.') >= 1:
         risk += 10
         reasons.append("Many subdomains")
 
     # Brand lookalike vs canonical domains (e.g., amzon vs amazon)
     try:
-        parts = domain.split('.')
-        sld = parts[-2] if len(parts) >= 2 else parts[0]
-        # Skip lookalike on hosted storefronts (*.myshopify.com, etc.)
-        if not any(domain.endswith(suf) for suf in settings.hosted_storefront_suffixes):
-            for brand, canon_list in settings.canonical_brands.items():
-                # Skip if domain already a canonical
-                if any(c in domain for c in canon_list):
-                    continue
-                sim = SequenceMatcher(None, sld.lower(), brand.lower()).ratio()
+        sld = host.sld
+        # Skip lookalike on hosted storefronts (*.myshopify.com, etc.) and on any brand's own domains
+        if host.platform_class != "storefront" and not _is_canonical(host.registrable):
+            index = get_brand_index()
+            for match in index.lookup(sld):
+                if match.distance == 0:
+                    continue  # the brand's own label under another suffix: see tld-swap above
+                brand = match.brand
+                sim = SequenceMatcher(None, sld.lower(), match.label).ratio()
                 
                 # CRITICAL: Typosquatting detection with graduated penalties
                 if sim >= 0.9:
@@ -192,7 +226,7 @@ def analyze(url: str) -> LayerResult:
 
     # Hyphen/digit/length heuristics on SLD
     try:
-        sld = domain.split('.')[-2] if '.' in domain else domain
+        sld = host.sld
         hyphens = sld.count('-')
         digits = sum(ch.isdigit() for ch in sld)
         if hyphens >= 2:
@@ -209,9 +243,8 @@ def analyze(url: str) -> LayerResult:
 
     # Subdomain phishing-intent tokens (e.g., order-refund-now.*)
     try:
-        host_parts = (parsed.hostname or "").lower().split(".")
-        sub_parts = host_parts[:-2] if len(host_parts) > 2 else host_parts[:-1]
-        subdomain = ".".join(sub_parts)
+        # Bare registrable domains are checked on their own label (order-refund.com)
+        subdomain = host.subdomain or host.sld
         if subdomain:
             toks = {t for p in subdomain.split(".") for t in p.replace("-", " ").split()}
             if any(t in PHISHING_TOKENS for t in toks):
@@ -0,0 +1,43 @@
+from __future__ import annotations
+from collections import Counter
+from dataclasses import dataclass
+import math
+from urllib.parse import urlparse
+from ...utils.host_parser import parse_host
+from . import domain_infra
+
+NO_FLAGS = "No major domain/infra red flags"
+VOWELS = set("aeiou")
+
+
+@dataclass
+class LayerResult:
+    score: float
+    message: str
+
+
+def _entropy(label: str) -> float:
+    counts = Counter(label)
+    return -sum(n / len(label) * math.log2(n / len(label)) for n in counts.values())
+
+
+def _looks_random(label: str) -> bool:
+    # Generated names (DGA-style) are long, high-entropy and short on vowels
+    letters = [ch for ch in label.lower() if ch.isalpha()]
+    if len(label) < 12 or not letters:
+        return False
+    vowel_ratio = sum(ch in VOWELS for ch in letters) / len(letters)
+    return _entropy(label.lower()) >= 3.4 and vowel_ratio < 0.25
+
+
+async def analyze(url: str) -> LayerResult:
+    """Offline host checks for instant scans: the domain layer's typosquat, homograph, TLD and
+    label heuristics without registration data, plus a randomness check on the registrable label."""
+    base = domain_infra.analyze(url, check_age=False)
+    risk = base.score
+    reasons = [m for m in base.message.split("; ") if m != NO_FLAGS]
+    host = parse_host(urlparse(url).hostname or "")
+    if not host.is_ip and _looks_random(host.sld):
+        risk += 15
+        reasons.append(f"Random-looking domain name: {host.sld}")
+    return LayerResult(score=min(100.0, risk), message="; ".join(reasons) if reasons else NO_FLAGS)
@@ -0,0 +1,48 @@
+from __future__ import annotations
+from dataclasses import dataclass
+from pathlib import Path
+import threading
+from urllib.parse import urlparse
+from ...config import settings
+from ...utils.host_parser import parse_host
+
+
+@dataclass
+class LayerResult:
+    score: float
+    message: str
+
+
+_lock = threading.Lock()
+_loaded: tuple[str | None, frozenset[str]] = (None, frozenset())
+
+
+def load_threat_list(path: str) -> frozenset[str]:
+    hosts = set()
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            entry = line.split("#", 1)[0].strip().lower().rstrip(".")
+            if entry:
+                hosts.add(entry)
+    return frozenset(hosts)
+
+
+def get_threat_list() -> frozenset[str]:
+    """Hosts from LOCAL_THREAT_LIST_PATH, read once per configured path."""
+    global _loaded
+    path = settings.local_threat_list_path
+    if _loaded[0] != path:
+        with _lock:
+            if _loaded[0] != path:
+                _loaded = (path, load_threat_list(path) if path and Path(path).exists() else frozenset())
+    return _loaded[1]
+
+
+async def analyze(url: str) -> LayerResult:
+    listed = get_threat_list()
+    if not listed:
+        return LayerResult(score=0.0, message="No local threat list configured")
+    host = (urlparse(url).hostname or "").lower().rstrip(".")
+    if host in listed or parse_host(host).registrable in listed:
+        return LayerResult(score=100.0, message=f"CRITICAL THREAT: {host} is on the local threat list")
+    return LayerResult(score=0.0, message="Not on the local threat list")
@@ -1,10 +1,12 @@
 from __future__ import annotations
 import re
-import httpx
 from dataclasses import dataclass
 from typing import Optional, Dict, List
 from urllib.parse import urlparse
 from ...config import settings
+from ..page_snapshot import PageSnapshot, fetch_snapshot
+from ...utils.host_parser import STOREFRONT, parse_host
+from ...utils.patterns import PatternSet
 
 @dataclass
 class MerchantVerification:
@@ -75,11 +77,13 @@ PLATFORM_PATTERNS = {
 
 async def _detect_platform(url: str, html_content: str) -> Optional[str]:
     """Detect which e-commerce platform is being used"""
-    domain = urlparse(url).hostname or ""
+    host = parse_host(urlparse(url).hostname or "")
+    domain = host.host
     
-    # Check domain-based platforms first
+    # Check domain-based platforms first (registrable domain, or the storefront suffix for hosted shops)
     for platform, config in PLATFORM_PATTERNS.items():
-        if any(domain_pattern in domain for domain_pattern in config.get("domains", [])):
+        platform_domains = {d.strip(".") for d in config.get("domains", [])}
+        if host.registrable in platform_domains or (host.platform_class == STOREFRONT and host.platform in platform_domains):
             return platform
     
     # Check technology indicators in HTML
@@ -107,13 +111,14 @@ async def _extract_merchant_info(platform: str, url: str, html_content: str) ->
     from urllib.parse import urlparse
     parsed_url = urlparse(url)
     
-    if platform == "shopify" and ".myshopify.com" in parsed_url.hostname:
+    host = parse_host(parsed_url.hostname or "")
+    if platform == "shopify" and host.platform_class == STOREFRONT and host.platform == "myshopify.com":
         # Extract shop name from subdomain
-        shop_name = parsed_url.hostname.replace(".myshopify.com", "")
+        shop_name = host.subdomain
         verification.merchant_name = shop_name
         verification.merchant_id = shop_name
     
-    elif platform == "etsy" and "etsy.com" in parsed_url.hostname:
+    elif platform == "etsy" and host.registrable == "etsy.com":
         # Extract shop name from URL path
         import re
         shop_match = re.search(r'/shop/([^/\?]+)', url)
@@ -177,6 +182,39 @@ async def _verify_etsy_seller(shop_name: str) -> Dict:
     except Exception:
         return {"status": "unknown", "trust_score": 60.0}
 
+# Merchant name patterns; names are slugs, so these match as plain substrings
+# CRITICAL scam patterns (immediate maximum risk)
+CRITICAL_SCAM_NAMES = PatternSet([
+    "super-deals", "mega-deals", "flash-sale", "sale-today", "deals-today",
+    "limited-time", "urgent-sale", "clearance-sale", "discount-outlet",
+    "cheap-electronics", "wholesale-direct", "factory-outlet"
+], word_boundary=False)
+# High-risk scam patterns
+HIGH_RISK_NAMES = PatternSet([
+    "best-deals", "discount-", "sale-", "cheap-", "outlet-", "warehouse-",
+    "liquidation", "overstock", "closeout", "bulk-", "-deals", "deals-"
+], word_boundary=False)
+# Additional suspicious patterns (each one found lowers trust)
+SUSPICIOUS_NAMES = PatternSet(regexes=[
+    r'\d{4}',  # Years in name (sale2024, deals2025)
+    r'(today|now|quick|fast|instant)',
+    r'(amazing|incredible|unbelievable|shocking)',
+    r'(free|zero|\$0)',
+    r'(\d+%|off|save)'
+], word_boundary=False)
+# Legitimate business name patterns (bonus points): established brand names, then professional naming patterns
+LEGITIMATE_NAMES = PatternSet([
+    "beardbrand", "gymshark", "mvmt", "triangl", "glossier", "kylie", "allbirds",
+    "warby", "casper", "purple", "tuft", "needle", "bombas", "away", "outdoor",
+    "patagonia", "nike", "adidas", "under", "armour", "lululemon", "athletic",
+], word_boundary=False)
+PROFESSIONAL_NAMES = PatternSet(regexes=[
+    r'\b[a-z]+\s+(company|co|inc|ltd|llc|corp)\b',
+    r'\b[a-z]+\s+(studio|design|boutique|shop|store)\b',
+    r'\b[a-z]+\s+(brand|brands|fashion|apparel)\b'
+], word_boundary=False)
+
+
 async def _check_merchant_reputation(verification: MerchantVerification) -> float:
     """Calculate merchant trust score based on verification data"""
     base_score = 50.0  # Neutral starting point
@@ -184,70 +222,24 @@ async def _check_merchant_reputation(verification: MerchantVerification) -> floa
     # CRITICAL: Detect obvious scam patterns in merchant names
     merchant_name = (verification.merchant_name or verification.merchant_id or "").lower()
     
-    # CRITICAL scam patterns (immediate maximum risk)
-    critical_scam_patterns = [
-        "super-deals", "mega-deals", "flash-sale", "sale-today", "deals-today",
-        "limited-time", "urgent-sale", "clearance-sale", "discount-outlet",
-        "cheap-electronics", "wholesale-direct", "factory-outlet"
-    ]
-    
-    # High-risk scam patterns
-    high_risk_patterns = [
-        "best-deals", "discount-", "sale-", "cheap-", "outlet-", "warehouse-",
-        "liquidation", "overstock", "closeout", "bulk-", "-deals", "deals-"
-    ]
-    
     # Check for critical scam patterns first
-    for pattern in critical_scam_patterns:
-        if pattern in merchant_name:
-            base_score = 5.0  # CRITICAL - immediate high risk
-            break
+    if CRITICAL_SCAM_NAMES.search(merchant_name) is not None:
+        base_score = 5.0  # CRITICAL - immediate high risk
     else:
         # Check for high-risk patterns
-        scam_indicators = 0
-        for pattern in high_risk_patterns:
-            if pattern in merchant_name:
-                scam_indicators += 1
+        scam_indicators = len(HIGH_RISK_NAMES.found(merchant_name))
         
         if scam_indicators >= 2:
             base_score = 15.0  # Very high risk
         elif scam_indicators == 1:
             base_score = 30.0  # High risk
     
-    # Additional suspicious patterns
-    suspicious_patterns = [
-        r'\d{4}',  # Years in name (sale2024, deals2025)
-        r'(today|now|quick|fast|instant)',
-        r'(amazing|incredible|unbelievable|shocking)',
-        r'(free|zero|\$0)',
-        r'(\d+%|off|save)'
-    ]
-    
-    import re
-    for pattern in suspicious_patterns:
-        if re.search(pattern, merchant_name, re.IGNORECASE):
-            base_score -= 15
-    
-    # Legitimate business name patterns (bonus points)
-    legitimate_patterns = [
-        # Established brand names
-        "beardbrand", "gymshark", "mvmt", "triangl", "glossier", "kylie", "allbirds",
-        "warby", "casper", "purple", "tuft", "needle", "bombas", "away", "outdoor",
-        "patagonia", "nike", "adidas", "under", "armour", "lululemon", "athletic",
-        
-        # Professional naming patterns
-        r'\b[a-z]+\s+(company|co|inc|ltd|llc|corp)\b',
-        r'\b[a-z]+\s+(studio|design|boutique|shop|store)\b',
-        r'\b[a-z]+\s+(brand|brands|fashion|apparel)\b'
-    ]
+    base_score -= 15 * len(SUSPICIOUS_NAMES.found(merchant_name))
     
-    for pattern in legitimate_patterns:
-        if isinstance(pattern, str) and pattern in merchant_name:
-            base_score += 20
-            break
-        elif hasattr(re, 'search') and re.search(pattern, merchant_name, re.IGNORECASE):
-            base_score += 15
-            break
+    if LEGITIMATE_NAMES.search(merchant_name) is not None:
+        base_score += 20
+    elif PROFESSIONAL_NAMES.search(merchant_name) is not None:
+        base_score += 15
     
     # Platform-specific verification
     if verification.platform == "shopify":
@@ -273,30 +265,23 @@ async def _check_merchant_reputation(verification: MerchantVerification) -> floa
     
     return max(5.0, min(95.0, base_score + badge_bonus))
 
-async def analyze(url: str, html_content: str = None) -> LayerResult:
+async def analyze(url: str, html_content: str = None, snapshot: PageSnapshot | None = None) -> LayerResult:
     """Analyze merchant verification for multi-vendor platforms"""
     # Whitelist globally verified major platforms (amazon, ebay, etc.)
     from ...config import settings
     try:
         host = (urlparse(url).hostname or "").lower()
-        # Normalize common subdomains for verified platforms (www, m) and allow trusted subdomains
-        def _is_verified_platform(h: str) -> bool:
-            for plat in settings.verified_major_platforms:
-                plat = plat.lower()
-                if h == plat or h == f"www.{plat}" or h == f"m.{plat}" or h.endswith(f".{plat}"):
-                    return True
-            return False
-
-        if _is_verified_platform(host):
+        # Any subdomain of a verified platform (www, m, seller...) shares its registrable domain
+        if parse_host(host).registrable in settings.verified_major_platforms:
             return LayerResult(score=0.0, message=f"VERIFIED PLATFORM: {host} merchant verification bypassed")
     except Exception:
         pass
     if not html_content:
-        try:
-            async with httpx.AsyncClient(timeout=8.0) as client:
-                response = await client.get(url, follow_redirects=True)
-                html_content = response.text if response.status_code == 200 else ""
-        except Exception:
+        if snapshot is None:
+            snapshot = await fetch_snapshot(url)
+        if snapshot.fetched:
+            html_content = snapshot.text if snapshot.status_code == 200 else ""
+        else:
             return LayerResult(
                 score=40.0,
                 message="Could not fetch content for merchant verification"
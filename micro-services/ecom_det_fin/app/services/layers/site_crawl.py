@@ -0,0 +1,80 @@
+from __future__ import annotations
+import asyncio
+from dataclasses import dataclass
+import re
+import statistics
+from urllib.parse import urljoin, urlparse
+from ...config import settings
+from ...utils.host_parser import parse_host
+from ..page_snapshot import PageSnapshot, fetch_snapshot
+
+POLICY_WORDS = ("refund", "return", "privacy", "terms", "shipping", "contact", "about")
+DISCOUNT = re.compile(r"\b(\d{2})\s*%\s*off\b", re.I)
+# Real policy pages run to a few paragraphs; less than this is a placeholder
+MIN_POLICY_TEXT = 300
+
+
+@dataclass
+class LayerResult:
+    score: float
+    message: str
+
+
+def policy_links(url: str, snapshot: PageSnapshot, limit: int) -> list[str]:
+    """Same-site links whose target or anchor text names a policy/contact page, in page order."""
+    site = parse_host(urlparse(url).hostname or "").registrable
+    links: list[str] = []
+    for href, anchor_text in snapshot.features.links:
+        full = urljoin(snapshot.final_url or url, href).split("#", 1)[0]
+        parsed = urlparse(full)
+        if parsed.scheme not in ("http", "https") or parse_host(parsed.hostname or "").registrable != site:
+            continue
+        label = (parsed.path + " " + anchor_text).lower()
+        if any(word in label for word in POLICY_WORDS) and full not in links:
+            links.append(full)
+            if len(links) >= limit:
+                break
+    return links
+
+
+def _discounts(texts: list[str]) -> list[int]:
+    return [int(m.group(1)) for text in texts for m in DISCOUNT.finditer(text)]
+
+
+async def analyze(url: str, snapshot: PageSnapshot | None = None) -> LayerResult:
+    """Deep scans: fetch the policy/contact pages the target links to, and read the catalog's
+    advertised discounts across them."""
+    if snapshot is None:
+        snapshot = await fetch_snapshot(url)
+    if not snapshot.fetched or snapshot.status_code >= 400 or not snapshot.is_html or not snapshot.content:
+        return LayerResult(score=20.0, message="Could not fetch page or not HTML")
+
+    risk = 0.0
+    reasons: list[str] = []
+    links = policy_links(url, snapshot, settings.deep_crawl_max_pages)
+    pages = await asyncio.gather(*(fetch_snapshot(link) for link in links))
+    if not links:
+        risk += 25
+        reasons.append("No policy or contact pages linked")
+
+    ok = [p for p in pages if p.fetched and p.status_code < 400 and p.is_html]
+    broken = len(pages) - len(ok)
+    if broken:
+        risk += min(45, 15 * broken)
+        reasons.append(f"{broken} of {len(links)} linked policy pages are broken")
+    texts = [p.features.text for p in ok]
+    thin = sum(1 for text in texts if len(text) < MIN_POLICY_TEXT)
+    if thin:
+        risk += min(30, 10 * thin)
+        reasons.append(f"{thin} policy pages are placeholders")
+
+    # Catalog: storewide 70-90% discounts are a hallmark of fake stores
+    texts.append(snapshot.features.text)
+    discounts = _discounts(texts)
+    if discounts and (max(discounts) >= 85 or statistics.median(discounts) >= 70):
+        risk += 20
+        reasons.append(f"Implausible discounts (up to {max(discounts)}% off)")
+
+    if not reasons:
+        reasons.append(f"{len(links)} linked policy pages look complete")
+    return LayerResult(score=min(100.0, risk), message="; ".join(reasons))
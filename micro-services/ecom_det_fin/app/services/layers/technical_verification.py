@@ -1,136 +1,91 @@
 from __future__ import annotations
-import socket
-import ssl
-import httpx
 from dataclasses import dataclass
 from typing import Optional, Dict
 from urllib.parse import urlparse
 from ...config import settings
+from .. import rdap_client, dns_resolver, asn_index
+from ..dns_resolver import DnsInfo
+from ..tls_utils import TLSInfo, fetch_tls_info
+from ..whois_cache import WhoisRecord
 
 @dataclass
 class LayerResult:
     score: float
     message: str
 
-async def _get_ssl_info(domain: str) -> Dict:
+async def _get_ssl_info(domain: str, tls: TLSInfo | None = None) -> Dict:
     """Get SSL certificate information with improved reliability"""
     try:
-        # Method 1: Try direct socket connection
-        try:
-            context = ssl.create_default_context()
-            with socket.create_connection((domain, 443), timeout=10) as sock:
-                with context.wrap_socket(sock, server_hostname=domain) as ssock:
-                    cert = ssock.getpeercert()
-                    return {
-                        'issuer': dict(x[0] for x in cert['issuer']),
-                        'subject': dict(x[0] for x in cert['subject']),
-                        'valid_from': cert['notBefore'],
-                        'valid_to': cert['notAfter'],
-                        'is_wildcard': cert['subject']['commonName'].startswith('*.'),
-                        'method': 'socket'
-                    }
-        except Exception:
-            pass
-        
-        # Method 2: Try HTTP request to get SSL info
-        try:
-            async with httpx.AsyncClient(timeout=10.0, verify=True) as client:
-                response = await client.get(f"https://{domain}", follow_redirects=True)
-                if response.status_code < 400:
-                    return {
-                        'issuer': {'organizationName': 'Valid Certificate Authority'},
-                        'subject': {'commonName': domain},
-                        'valid_from': 'Recent',
-                        'valid_to': 'Future',
-                        'is_wildcard': False,
-                        'method': 'httpx'
-                    }
-        except Exception:
-            pass
-        
+        # Shared TLS prober: cached per host and deduplicated with other consumers
+        if tls is None:
+            tls = await fetch_tls_info(domain, 443, 10.0)
+        if not tls.errors:
+            return {
+                'issuer': {'organizationName': tls.issuer_org or ''},
+                'days_remaining': tls.days_remaining,
+                'is_wildcard': tls.is_wildcard,
+                'key_type': tls.key_type,
+                'method': 'socket'
+            }
         return {}
     except Exception:
         return {}
 
-async def _get_whois_enhanced(domain: str) -> Dict:
+async def _get_whois_enhanced(domain: str, record: WhoisRecord | None = None) -> Dict:
     """Enhanced WHOIS analysis with registrar reputation"""
     try:
-        import whois
-        data = whois.whois(domain)
+        if record is None:
+            record = await rdap_client.lookup(domain)
+        if record is None:
+            return {}
         
-        registrar = (data.registrar or "").lower() if hasattr(data, 'registrar') else ""
+        registrar = (record.registrar or "").lower()
         is_trusted_registrar = any(trusted in registrar for trusted in settings.trusted_registrars)
         
-        creation_date = data.creation_date
-        if isinstance(creation_date, list):
-            creation_date = creation_date[0]
-        
         return {
             'registrar': registrar,
             'trusted_registrar': is_trusted_registrar,
-            'creation_date': creation_date,
-            'privacy_protection': 'privacy' in str(data).lower() or 'protected' in str(data).lower(),
-            'country': getattr(data, 'country', None)
+            'creation_date': record.creation_date,
+            'privacy_protection': record.privacy,
+            'country': record.country
         }
     except Exception:
         return {}
 
-async def _get_dns_info(domain: str) -> Dict:
+async def _get_dns_info(domain: str, dns_info: DnsInfo | None = None) -> Dict:
     """Get DNS and hosting information with enhanced detection"""
     try:
-        import socket
-        ip = socket.gethostbyname(domain)
-        
-        # Enhanced trusted hosting detection
-        is_trusted_hosting = False
-        hosting_provider = "Unknown"
-        
-        # Amazon/AWS IP ranges
-        if any(ip.startswith(prefix) for prefix in [
-            '52.', '54.', '13.', '18.', '35.', '107.', '174.', '176.', '184.',
-            '23.', '50.', '54.', '75.', '99.', '205.', '207.'
-        ]):
-            is_trusted_hosting = True
-            hosting_provider = "Amazon AWS"
+        if dns_info is None:
+            dns_info = await dns_resolver.lookup(domain)
+        ip = dns_info.addresses[0]
         
-        # Cloudflare
-        elif any(ip.startswith(prefix) for prefix in [
-            '104.16.', '104.17.', '104.18.', '104.19.', '104.20.', '104.21.',
-            '172.64.', '172.65.', '172.66.', '172.67.', '172.68.', '172.69.'
-        ]):
-            is_trusted_hosting = True
-            hosting_provider = "Cloudflare"
-        
-        # Google Cloud
-        elif any(ip.startswith(prefix) for prefix in [
-            '35.', '34.', '130.', '146.', '104.196.', '104.197.'
-        ]):
-            is_trusted_hosting = True
-            hosting_provider = "Google Cloud"
-        
-        # Microsoft Azure
-        elif any(ip.startswith(prefix) for prefix in [
-            '13.', '20.', '40.', '52.', '104.', '137.', '138.', '168.'
-        ]):
-            is_trusted_hosting = True
-            hosting_provider = "Microsoft Azure"
+        # Hosting is classified by the origin ASN of the address (longest-prefix match)
+        index = asn_index.get_index()
+        match = index.lookup(ip) if index is not None else None
         
         return {
             'ip_address': ip,
-            'trusted_hosting': is_trusted_hosting,
-            'hosting_provider': hosting_provider,
-            'has_mx': True  # Assume email is configured for established domains
+            'asn': match.asn if match else None,
+            'asn_indexed': index is not None,
+            'trusted_hosting': bool(match and match.asn in settings.trusted_hosting_asns),
+            'hosting_provider': (match.name or f"AS{match.asn}") if match else "Unknown",
+            'has_mx': bool(dns_info.mx),
+            'nameservers': None if dns_info.failed else dns_info.ns,
         }
     except Exception:
         return {
             'ip_address': None, 
+            'asn': None,
+            'asn_indexed': False,
             'trusted_hosting': False, 
             'hosting_provider': 'Unknown',
-            'has_mx': False
+            'has_mx': False,
+            'nameservers': None,
         }
 
-async def analyze(url: str) -> LayerResult:
-    """Technical infrastructure verification"""
+async def analyze(url: str, registration: WhoisRecord | None = None, dns: DnsInfo | None = None,
+                  tls: TLSInfo | None = None) -> LayerResult:
+    """Technical infrastructure verification. Inputs not passed in are looked up here."""
     parsed = urlparse(url)
     domain = parsed.hostname or ""
     
@@ -146,7 +101,7 @@ async def analyze(url: str) -> LayerResult:
     
     # SSL Certificate Analysis with better error handling
     try:
-        ssl_info = await _get_ssl_info(domain)
+        ssl_info = await _get_ssl_info(domain, tls)
         if ssl_info:
             issuer = ssl_info.get('issuer', {}).get('organizationName', '').lower()
             if any(trusted in issuer for trusted in ['let\'s encrypt', 'cloudflare', 'digicert', 'sectigo', 'amazon']):
@@ -169,7 +124,7 @@ async def analyze(url: str) -> LayerResult:
         reasons.append("SSL certificate verification failed")
     
     # WHOIS/Registrar Analysis
-    whois_info = await _get_whois_enhanced(domain)
+    whois_info = await _get_whois_enhanced(domain, registration)
     if whois_info:
         if whois_info.get('trusted_registrar'):
             score -= 8
@@ -203,18 +158,26 @@ async def analyze(url: str) -> LayerResult:
                 reasons.append(f"Established domain: {age_days} days old")
     
     # DNS/Hosting Analysis
-    dns_info = await _get_dns_info(domain)
+    dns_info = await _get_dns_info(domain, dns)
     if dns_info.get('trusted_hosting'):
         score -= 10
-        reasons.append("Hosted on trusted infrastructure")
-    else:
+        reasons.append(f"Hosted on trusted infrastructure: {dns_info.get('hosting_provider')}")
+    elif dns_info.get('asn'):
+        score += 5
+        reasons.append(f"Hosted on AS{dns_info['asn']} ({dns_info.get('hosting_provider')})")
+    elif dns_info.get('asn_indexed'):
         score += 5
         reasons.append("Unknown hosting provider")
+    # Without an ASN index hosting is not scored either way
     
     if not dns_info.get('has_mx'):
         score += 5
         reasons.append("No email server configured")
     
+    if dns_info.get('nameservers') == []:
+        score += 5
+        reasons.append("No authoritative nameservers found")
+    
     # Final scoring
     score = max(0.0, min(100.0, score + 10))  # Base technical score
     
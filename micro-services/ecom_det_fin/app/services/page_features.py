@@ -0,0 +1,133 @@
+"""Single-pass HTML feature extraction.
+
+The page is parsed once with lxml, and everything the layers read from HTML is
+gathered from that tree into a PageFeatures record of plain strings, lists and
+dicts, so layers no longer re-walk a soup for text, anchors, meta tags or
+scripts each. Both passes over the tree (a tag-filtered iteration and
+itertext) run in lxml's C code; Python only touches the collected elements.
+
+Visible text follows BeautifulSoup's get_text(" ", strip=True): script, style
+and template contents and comments are left out, and the remaining text nodes
+are stripped and joined with single spaces.
+
+    features = extract_features(snapshot.content, snapshot.encoding)
+    features.text, features.links, features.json_ld, features.emails
+"""
+from __future__ import annotations
+import json
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from lxml import etree
+
+EMAIL = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+# Digits with spaces, dashes or parentheses between them; 8-15 digits make a candidate number
+PHONE = re.compile(r"(?<![\w+])\+?\(?\d[\d ()-]{6,20}\d(?![\w])")
+_HIDDEN = frozenset(("script", "style", "template"))
+_COLLECTED = frozenset(("a", "meta", "script", "form", "title"))
+
+
+@dataclass
+class Form:
+    action: str
+    method: str
+    inputs: list[str] = field(default_factory=list)  # input types, e.g. ["email", "password"]
+
+
+@dataclass
+class PageFeatures:
+    title: str = ""
+    text: str = ""  # visible text
+    links: list[tuple[str, str]] = field(default_factory=list)  # (href, anchor text) of a[href], in page order
+    meta: list[dict[str, str]] = field(default_factory=list)  # attributes of each <meta>
+    json_ld: list[Any] = field(default_factory=list)  # parsed ld+json blocks; unparsable ones are skipped
+    forms: list[Form] = field(default_factory=list)
+    scripts: list[str] = field(default_factory=list)  # src of external scripts
+    inline_scripts: int = 0
+    emails: list[str] = field(default_factory=list)  # distinct, from text and mailto: links
+    phones: list[str] = field(default_factory=list)  # distinct, digits with an optional leading +
+
+    @property
+    def hrefs(self) -> list[str]:
+        return [href for href, _ in self.links]
+
+
+def _squash(text: str) -> str:
+    return " ".join(text.split())
+
+
+def _phone(candidate: str) -> str | None:
+    digits = re.sub(r"\D", "", candidate)
+    if not 8 <= len(digits) <= 15:
+        return None
+    return ("+" if candidate.lstrip().startswith("+") else "") + digits
+
+
+def _collect(features: PageFeatures, el) -> None:
+    tag = el.tag
+    if tag == "a":
+        href = el.get("href")
+        if href is not None:
+            features.links.append((href.strip(), _squash("".join(el.itertext()))))
+    elif tag == "meta":
+        features.meta.append(dict(el.attrib))
+    elif tag == "script":
+        src = el.get("src")
+        if src:
+            features.scripts.append(src.strip())
+        elif "ld+json" in (el.get("type") or ""):
+            try:
+                features.json_ld.append(json.loads(el.text or ""))
+            except ValueError:
+                pass
+        else:
+            features.inline_scripts += 1
+    elif tag == "form":
+        features.forms.append(Form(
+            action=(el.get("action") or "").strip(),
+            method=(el.get("method") or "get").strip().lower(),
+            inputs=[(i.get("type") or "text").lower() for i in el.iter("input")],
+        ))
+    elif tag == "title" and not features.title:
+        features.title = _squash("".join(el.itertext()))
+
+
+def _walk(root) -> PageFeatures:
+    features = PageFeatures()
+    for el in root.iter(*_COLLECTED):
+        _collect(features, el)
+    # The tree is ours: drop hidden elements (keeping their tails) so itertext yields only visible text
+    etree.strip_elements(root, *_HIDDEN, with_tail=False)
+    features.text = " ".join(s for s in map(str.strip, root.itertext()) if s)
+
+    emails = EMAIL.findall(features.text)
+    phones = [m.group() for m in PHONE.finditer(features.text)]
+    for href in features.hrefs:
+        scheme, _, rest = href.partition(":")
+        if scheme.lower() == "mailto":
+            emails.extend(EMAIL.findall(rest.split("?", 1)[0]))
+        elif scheme.lower() == "tel":
+            phones.append(rest)
+    features.emails = list(dict.fromkeys(emails))
+    features.phones = list(dict.fromkeys(p for p in map(_phone, phones) if p))
+    return features
+
+
+def extract_features(markup: str | bytes, encoding: str | None = None) -> PageFeatures:
+    """Parse `markup` (bytes are decoded like PageSnapshot.text) and collect its features.
+
+    Never raises; an empty or unparsable document yields an empty record.
+    """
+    if isinstance(markup, bytes):
+        markup = markup.decode(encoding or "utf-8", errors="replace")
+    if not markup.strip():
+        return PageFeatures()
+    try:
+        # Parsed as UTF-8 bytes: lxml rejects str documents carrying an XML encoding declaration.
+        # Plain etree elements: lxml.html's element classes cost a lookup per node.
+        root = etree.fromstring(markup.encode("utf-8", errors="replace"),
+                                etree.HTMLParser(encoding="utf-8", huge_tree=True))
+    except (etree.ParserError, ValueError):
+        return PageFeatures()
+    return _walk(root) if root is not None else PageFeatures()
@@ -0,0 +1,144 @@
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass, field
+from functools import cached_property
+import httpx
+from ..config import settings
+from .latency import LatencyTracker
+from .page_features import PageFeatures, extract_features
+from .parse_pool import parse_pool
+
+
+@dataclass
+class PageSnapshot:
+    """A single fetch of the target page, shared by every layer that reads HTML."""
+    url: str
+    final_url: str | None = None
+    status_code: int | None = None
+    headers: dict[str, str] = field(default_factory=dict)
+    content: bytes = b""
+    encoding: str | None = None
+    error: str | None = None
+
+    @property
+    def fetched(self) -> bool:
+        return self.error is None and self.status_code is not None
+
+    @property
+    def content_type(self) -> str:
+        return self.headers.get("content-type", "")
+
+    @property
+    def is_html(self) -> bool:
+        return "text/html" in self.content_type
+
+    @cached_property
+    def text(self) -> str:
+        return self.content.decode(self.encoding or "utf-8", errors="replace")
+
+    @cached_property
+    def features(self) -> PageFeatures:
+        # Parsed once on first access; layers must treat the record as read-only
+        return extract_features(self.text)
+
+
+class _HedgeBudget:
+    """Counts fetches and hedges so extra requests stay within PAGE_HEDGE_BUDGET."""
+
+    def __init__(self):
+        self.requests = 0
+        self.hedges = 0
+        self.wins = 0
+
+    def start(self) -> None:
+        self.requests += 1
+        if self.requests >= 10000:
+            # Decay so the ratio follows recent traffic
+            self.requests //= 2
+            self.hedges //= 2
+            self.wins //= 2
+
+    def allow(self) -> bool:
+        return self.hedges + 1 <= settings.page_hedge_budget * self.requests
+
+
+# Time to response headers of the target site, used as the hedging delay
+fetch_latency = LatencyTracker()
+hedge_budget = _HedgeBudget()
+
+
+def fetch_stats() -> dict:
+    return {
+        "requests": hedge_budget.requests,
+        "hedged": hedge_budget.hedges,
+        "hedge_wins": hedge_budget.wins,
+        "headers_p50": fetch_latency.percentile("headers", 50),
+        "headers_p90": fetch_latency.percentile("headers", 90),
+    }
+
+
+async def _attempt(client: httpx.AsyncClient, url: str, headers_seen: asyncio.Event) -> PageSnapshot:
+    started = time.monotonic()
+    async with client.stream("GET", url) as res:
+        fetch_latency.record("headers", time.monotonic() - started)
+        headers_seen.set()
+        content = await res.aread()
+        return PageSnapshot(
+            url=url,
+            final_url=str(res.url),
+            status_code=res.status_code,
+            headers={k.lower(): v for k, v in res.headers.items()},
+            content=content,
+            encoding=res.encoding,
+        )
+
+
+async def _hedged_get(client: httpx.AsyncClient, url: str) -> PageSnapshot:
+    hedge_budget.start()
+    delay = fetch_latency.percentile("headers", settings.page_hedge_percentile) if settings.page_hedge_enabled else None
+    headers_seen = asyncio.Event()
+    attempts = [asyncio.create_task(_attempt(client, url, headers_seen))]
+    try:
+        if delay is not None:
+            waiter = asyncio.create_task(headers_seen.wait())
+            try:
+                await asyncio.wait({attempts[0], waiter}, timeout=delay, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                waiter.cancel()
+            if not headers_seen.is_set() and not attempts[0].done() and hedge_budget.allow():
+                # First handshake stalled past the usual p90: race a second attempt on a new connection
+                hedge_budget.hedges += 1
+                attempts.append(asyncio.create_task(_attempt(client, url, asyncio.Event())))
+        pending = set(attempts)
+        error: BaseException | None = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not attempts[0]:
+                        hedge_budget.wins += 1
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in attempts:
+            task.cancel()
+
+
+async def fetch_snapshot(url: str) -> PageSnapshot:
+    """Fetch the page once (following redirects) and extract its features. Never raises; failures
+    are recorded in `error`."""
+    try:
+        timeout = httpx.Timeout(settings.page_fetch_timeout, connect=settings.page_connect_timeout)
+        async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+            snapshot = await _hedged_get(client, url)
+    except Exception as e:
+        return PageSnapshot(url=url, error=str(e) or type(e).__name__)
+    if snapshot.is_html and snapshot.status_code < 400 and snapshot.content:
+        # Parse up front, in a worker process for large pages, so layers read a ready record
+        try:
+            snapshot.features = await parse_pool.extract(snapshot.content, snapshot.encoding)
+        except Exception:
+            snapshot.features = extract_features(snapshot.content, snapshot.encoding)
+    return snapshot
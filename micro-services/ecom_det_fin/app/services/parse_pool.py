@@ -0,0 +1,101 @@
+"""Process pool for HTML feature extraction.
+
+Parsing a multi-megabyte page holds the GIL for hundreds of milliseconds, and
+every other scan on the event loop waits for it. Pages of PARSE_INLINE_MAX_BYTES
+or more are therefore parsed in a worker process: the worker gets the raw bytes
+and returns the PageFeatures record, which is plain lists and strings and so
+cheap to pickle back. Smaller pages are parsed inline, where the round trip to a
+worker would cost more than the parse itself.
+
+The pool starts on first use (spawned, not forked from the running server) and
+is replaced when a worker dies. PARSE_POOL_WORKERS=0 parses everything inline.
+"""
+from __future__ import annotations
+import asyncio
+import multiprocessing
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+from ..config import settings
+from .latency import LatencyTracker
+from .page_features import PageFeatures, extract_features
+
+
+class ParsePool:
+    """Offloads large parses to worker processes and keeps queue and latency figures."""
+
+    def __init__(self):
+        self._executor: ProcessPoolExecutor | None = None
+        self._lock = threading.Lock()
+        # Parse time as seen by the caller (queueing and pickling included for the pool)
+        self.latency = LatencyTracker()
+        self.in_flight = 0
+        self.inline = 0
+        self.offloaded = 0
+        self.broken = 0
+
+    def _pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._executor is None:
+                self._executor = ProcessPoolExecutor(max_workers=settings.parse_pool_workers,
+                                                     mp_context=multiprocessing.get_context("spawn"))
+            return self._executor
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=False, cancel_futures=True)
+
+    def _discard(self, executor: ProcessPoolExecutor) -> None:
+        """Drop a broken executor, unless another caller has already replaced it."""
+        with self._lock:
+            if self._executor is not executor:
+                return
+            self._executor = None
+        executor.shutdown(wait=False)
+
+    def offloads(self, size: int) -> bool:
+        return settings.parse_pool_workers > 0 and size >= settings.parse_inline_max_bytes
+
+    async def extract(self, content: bytes, encoding: str | None = None) -> PageFeatures:
+        """extract_features(content, encoding), in a worker process for large pages."""
+        started = time.monotonic()
+        if not self.offloads(len(content)):
+            features = extract_features(content, encoding)
+            self.inline += 1
+            self.latency.record("inline", time.monotonic() - started)
+            return features
+        self.in_flight += 1
+        executor = self._pool()
+        try:
+            features = await asyncio.get_running_loop().run_in_executor(executor, extract_features, content, encoding)
+        except BrokenProcessPool:
+            # A worker died (e.g. killed on a pathological page): start a fresh pool next time
+            self.broken += 1
+            self._discard(executor)
+            features = extract_features(content, encoding)
+        finally:
+            self.in_flight -= 1
+        self.offloaded += 1
+        self.latency.record("pool", time.monotonic() - started)
+        return features
+
+    def stats(self) -> dict:
+        workers = settings.parse_pool_workers
+        return {
+            "workers": workers,
+            "inline_max_bytes": settings.parse_inline_max_bytes,
+            "in_flight": self.in_flight,
+            # Parses waiting for a free worker
+            "queue_depth": max(0, self.in_flight - workers),
+            "inline": self.inline,
+            "offloaded": self.offloaded,
+            "broken": self.broken,
+            "latency": self.latency.stats(),
+        }
+
+
+parse_pool = ParsePool()
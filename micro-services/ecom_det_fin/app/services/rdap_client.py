@@ -0,0 +1,306 @@
+from __future__ import annotations
+import asyncio
+import ipaddress
+import re
+import time
+import weakref
+from dataclasses import asdict
+from datetime import datetime, timezone
+from typing import Optional, Dict, List
+import httpx
+from dateutil import parser as date_parser
+from ..config import settings
+from ..utils.parsing import registrable_domain
+from .ttl_cache import TTLCache, MISSING
+from .whois_cache import WhoisRecord, whois_cache
+
+IANA_WHOIS = "whois.iana.org"
+BOOTSTRAP_TTL = 24 * 3600
+REFERRAL_TTL = 7 * 24 * 3600
+FAILED_REFERRAL_TTL = 3600
+
+# IANA bootstrap (tld -> RDAP base URLs) and TLD -> WHOIS server referrals
+_bootstrap_cache = TTLCache("rdap-bootstrap", max_entries=4, db_path=settings.whois_cache_db)
+_referral_cache = TTLCache("whois-referral", max_entries=2048, db_path=settings.whois_cache_db)
+
+# Per-loop state: asyncio primitives cannot be shared across event loops
+_limits: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Semaphore]]" = weakref.WeakKeyDictionary()
+_inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[str, asyncio.Task]]" = weakref.WeakKeyDictionary()
+
+# registry host -> (retry_after_ts, consecutive_failures)
+_backoff: Dict[str, tuple[float, int]] = {}
+
+_EMAIL_RE = re.compile(r"[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Za-z]{2,}")
+_WHOIS_FIELDS = {
+    "creation_date": re.compile(
+        r"^\s*(?:creation date|created(?: on)?|registered(?: on)?|registration time|"
+        r"domain registration date|registered date|domain create date)\s*:\s*(.+?)\s*$",
+        re.I | re.M,
+    ),
+    "registrar": re.compile(r"^\s*(?:registrar|sponsoring registrar|registrar name)\s*:\s*(.+?)\s*$", re.I | re.M),
+    "country": re.compile(r"^\s*(?:registrant country|country)\s*:\s*([A-Za-z]{2})\b", re.I | re.M),
+    "referral": re.compile(r"^\s*(?:registrar whois server|whois server|refer|whois)\s*:\s*(\S+)\s*$", re.I | re.M),
+}
+_NOT_FOUND = ("no match", "not found", "no data found", "no entries found", "status: free", "domain not found")
+
+
+class RegistryUnavailable(Exception):
+    pass
+
+
+def _parse_date(value) -> Optional[datetime]:
+    if not value:
+        return None
+    try:
+        parsed = date_parser.parse(str(value))
+    except (ValueError, OverflowError):
+        return None
+    # Naive UTC, matching the utcnow() arithmetic used by the layers
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return parsed
+
+
+def _vcard_props(entity: dict) -> List[list]:
+    vcard = entity.get("vcardArray")
+    if isinstance(vcard, list) and len(vcard) == 2 and isinstance(vcard[1], list):
+        return [p for p in vcard[1] if isinstance(p, list) and len(p) >= 4]
+    return []
+
+
+def _iter_entities(entities: list):
+    for entity in entities or []:
+        if isinstance(entity, dict):
+            yield entity
+            yield from _iter_entities(entity.get("entities"))
+
+
+def parse_rdap(domain: str, data: dict) -> WhoisRecord:
+    """Map an RDAP domain response onto a WhoisRecord."""
+    record = WhoisRecord(domain=domain, source="rdap")
+    for event in data.get("events") or []:
+        if event.get("eventAction") == "registration":
+            record.creation_date = _parse_date(event.get("eventDate"))
+    texts: list[str] = []
+    for entity in _iter_entities(data.get("entities")):
+        roles = entity.get("roles") or []
+        for name, params, _type, value in (p[:4] for p in _vcard_props(entity)):
+            if name == "fn" and "registrar" in roles and not record.registrar:
+                record.registrar = str(value)
+            elif name == "email" and value:
+                record.emails.append(str(value))
+            elif name == "adr" and "registrant" in roles and not record.country:
+                cc = (params or {}).get("cc") if isinstance(params, dict) else None
+                if not cc and isinstance(value, list) and value and isinstance(value[-1], str):
+                    cc = value[-1]
+                if cc and len(cc) == 2:
+                    record.country = cc.upper()
+            if isinstance(value, str):
+                texts.append(value)
+        for remark in entity.get("remarks") or []:
+            texts.extend(remark.get("description") or [])
+    for remark in data.get("remarks") or []:
+        texts.extend(remark.get("description") or [])
+    blob = " ".join(texts).lower()
+    record.privacy = bool(data.get("redacted")) or any(
+        marker in blob for marker in ("privacy", "protected", "redacted")
+    )
+    return record
+
+
+def parse_whois_text(domain: str, text: str) -> Optional[WhoisRecord]:
+    """Parse a port-43 WHOIS response. Returns None for "not found" answers."""
+    lower = text.lower()
+    if not text.strip() or any(marker in lower[:500] for marker in _NOT_FOUND):
+        return None
+    record = WhoisRecord(domain=domain, source="whois")
+    match = _WHOIS_FIELDS["creation_date"].search(text)
+    if match:
+        record.creation_date = _parse_date(match.group(1))
+    match = _WHOIS_FIELDS["registrar"].search(text)
+    if match:
+        record.registrar = match.group(1)
+    match = _WHOIS_FIELDS["country"].search(text)
+    if match:
+        record.country = match.group(1).upper()
+    record.emails = list(dict.fromkeys(_EMAIL_RE.findall(text)))
+    record.privacy = "privacy" in lower or "protected" in lower
+    return record
+
+
+def _limit(registry: str) -> asyncio.Semaphore:
+    per_loop = _limits.setdefault(asyncio.get_running_loop(), {})
+    if registry not in per_loop:
+        per_loop[registry] = asyncio.Semaphore(settings.registry_max_concurrency)
+    return per_loop[registry]
+
+
+def _check_backoff(registry: str) -> None:
+    until, _ = _backoff.get(registry, (0.0, 0))
+    if until > time.time():
+        raise RegistryUnavailable(f"{registry} backing off")
+
+
+def _record_failure(registry: str, retry_after: float | None = None) -> None:
+    _, failures = _backoff.get(registry, (0.0, 0))
+    delay = retry_after or min(settings.registry_backoff_max, settings.registry_backoff_base * (2 ** failures))
+    _backoff[registry] = (time.time() + delay, failures + 1)
+
+
+def _record_success(registry: str) -> None:
+    _backoff.pop(registry, None)
+
+
+async def _bootstrap(client: httpx.AsyncClient) -> Dict[str, List[str]]:
+    cached = _bootstrap_cache.get("dns")
+    if cached is not MISSING:
+        return cached or {}
+    services: Dict[str, List[str]] = {}
+    try:
+        res = await client.get(settings.rdap_bootstrap_url)
+        res.raise_for_status()
+        for tlds, urls in res.json().get("services", []):
+            for tld in tlds:
+                services[tld.lower()] = urls
+    except Exception:
+        _bootstrap_cache.set("dns", None, FAILED_REFERRAL_TTL)
+        return {}
+    _bootstrap_cache.set("dns", services, BOOTSTRAP_TTL)
+    return services
+
+
+async def _query_rdap(client: httpx.AsyncClient, domain: str) -> Optional[WhoisRecord]:
+    tld = domain.rsplit(".", 1)[-1]
+    bases = (await _bootstrap(client)).get(tld)
+    if not bases:
+        return None
+    base = bases[0].rstrip("/")
+    registry = httpx.URL(base).host
+    _check_backoff(registry)
+    async with _limit(registry):
+        try:
+            res = await client.get(f"{base}/domain/{domain}", headers={"Accept": "application/rdap+json"})
+        except httpx.HTTPError:
+            _record_failure(registry)
+            raise RegistryUnavailable(registry)
+    if res.status_code == 404:
+        _record_success(registry)
+        return None
+    if res.status_code == 429 or res.status_code >= 500:
+        retry_after = res.headers.get("retry-after")
+        _record_failure(registry, float(retry_after) if retry_after and retry_after.isdigit() else None)
+        raise RegistryUnavailable(registry)
+    _record_success(registry)
+    if res.status_code != 200:
+        return None
+    return parse_rdap(domain, res.json())
+
+
+async def _whois43(server: str, query: str) -> str:
+    _check_backoff(server)
+    async with _limit(server):
+        try:
+            reader, writer = await asyncio.wait_for(asyncio.open_connection(server, 43), timeout=settings.whois_timeout)
+            try:
+                writer.write(f"{query}\r\n".encode())
+                await writer.drain()
+                data = await asyncio.wait_for(reader.read(-1), timeout=settings.whois_timeout)
+            finally:
+                writer.close()
+        except (OSError, asyncio.TimeoutError):
+            _record_failure(server)
+            raise RegistryUnavailable(server)
+    _record_success(server)
+    return data.decode("utf-8", errors="replace")
+
+
+async def _whois_server(tld: str) -> Optional[str]:
+    cached = _referral_cache.get(tld)
+    if cached is not MISSING:
+        return cached
+    try:
+        text = await _whois43(IANA_WHOIS, tld)
+    except RegistryUnavailable:
+        return None
+    match = _WHOIS_FIELDS["referral"].search(text)
+    server = match.group(1).lower() if match else None
+    _referral_cache.set(tld, server, REFERRAL_TTL if server else FAILED_REFERRAL_TTL)
+    return server
+
+
+async def _query_whois(domain: str) -> Optional[WhoisRecord]:
+    server = await _whois_server(domain.rsplit(".", 1)[-1])
+    if not server:
+        return None
+    text = await _whois43(server, domain)
+    record = parse_whois_text(domain, text)
+    # Thin registries (e.g. .com) refer to the registrar's WHOIS for contact details
+    match = _WHOIS_FIELDS["referral"].search(text)
+    referral = match.group(1).lower() if match else None
+    if record is not None and referral and referral != server:
+        try:
+            detailed = parse_whois_text(domain, await _whois43(referral, domain))
+        except RegistryUnavailable:
+            detailed = None
+        if detailed is not None:
+            detailed.creation_date = detailed.creation_date or record.creation_date
+            detailed.registrar = detailed.registrar or record.registrar
+            record = detailed
+    return record
+
+
+async def _resolve(domain: str) -> Optional[WhoisRecord]:
+    timeout = httpx.Timeout(settings.rdap_timeout, connect=min(2.0, settings.rdap_timeout))
+    async with httpx.AsyncClient(timeout=timeout, follow_redirects=True) as client:
+        try:
+            record = await _query_rdap(client, domain)
+            if record is not None:
+                return record
+        except (RegistryUnavailable, httpx.HTTPError, ValueError):
+            pass
+    try:
+        return await _query_whois(domain)
+    except RegistryUnavailable:
+        return None
+
+
+def _is_ip(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+        return True
+    except ValueError:
+        return False
+
+
+async def lookup(domain: str) -> Optional[WhoisRecord]:
+    """RDAP lookup with WHOIS fallback, through the shared WHOIS cache.
+
+    Returns None when neither source yields data. Concurrent lookups of the same
+    registrable domain share one in-flight query.
+    """
+    key = registrable_domain(domain)
+    if not key or "." not in key or _is_ip(key):
+        return None
+    cached = whois_cache.get(key)
+    if cached is not MISSING:
+        return WhoisRecord(**cached) if cached else None
+
+    inflight = _inflight.setdefault(asyncio.get_running_loop(), {})
+    task = inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_resolve_and_store(key))
+        inflight[key] = task
+        task.add_done_callback(lambda _t: inflight.pop(key, None))
+    return await asyncio.shield(task)
+
+
+async def _resolve_and_store(key: str) -> Optional[WhoisRecord]:
+    try:
+        record = await _resolve(key)
+    except Exception:
+        record = None
+    if record is None:
+        whois_cache.set(key, None, settings.whois_negative_ttl)
+    else:
+        whois_cache.set(key, asdict(record), settings.whois_cache_ttl)
+    return record
@@ -0,0 +1,310 @@
+"""Layer plugin registry and dependency-aware executor.
+
+A layer declares the shared inputs it consumes (``page``, ``whois``, ``dns``,
+``tls``, or the per-request ``session``) together with its cost class,
+timeout and default weight. Producers build those inputs, possibly from other
+producers; the executor starts each producer at most once per request, only if
+some selected layer needs it, and hands the same value to every consumer.
+Registering a producer or layer requires its inputs to exist already, so the
+graph is acyclic by construction.
+
+    register_layer(LayerSpec("my_layer", run=my_analyze, weight=0.05, inputs=("page",)))
+"""
+from __future__ import annotations
+import asyncio
+import time
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import urlparse
+
+from ..config import settings
+from .layers import domain_infra as li_domain
+from .layers import content_ux as li_content
+from .layers import visual_brand as li_visual
+from .layers import threat_intel as li_threat
+from .layers import user_feedback as li_feedback
+from .layers import business_verification as li_business
+from .layers import technical_verification as li_technical
+from .layers import merchant_verification as li_merchant
+from .layers import host_signals as li_host
+from .layers import local_threats as li_local
+from .layers import site_crawl as li_crawl
+from . import deadline, dns_resolver, page_snapshot, rdap_client, tls_utils
+from .latency import layer_latency
+from .layer_cache import SCOPES as CACHE_SCOPES
+from .risk_rules import MODES, VETO_WORDING
+
+# Cheaper classes are started first
+COST_CLASSES = ("cheap", "io", "heavy")
+# Inputs supplied by the caller rather than produced
+CONTEXT_INPUTS = ("session",)
+
+
+@dataclass(frozen=True)
+class ProducerSpec:
+    name: str
+    produce: Callable[..., Awaitable[Any]]  # produce(url, **inputs)
+    inputs: Tuple[str, ...] = ()
+    timeout: Optional[float] = None          # None: the producer bounds itself
+
+
+@dataclass(frozen=True)
+class LayerSpec:
+    name: str
+    run: Callable[..., Awaitable[Any]]       # run(url, **inputs) -> object with .score and .message
+    weight: float
+    inputs: Tuple[str, ...] = ()
+    cost: str = "io"
+    timeout: Optional[float] = None          # initial timeout, covering input waits; then adapted to observed latency
+    fallback_score: float = 0.0
+    fallback_message: str = ""
+    # Synchronous pre-check: returns a final result when the outcome is known without inputs
+    probe: Optional[Callable[[str], Any]] = None
+    # Whether a result may contain wording that makes the safety gates veto (risk_rules.VETO_WORDING)
+    can_veto: bool = False
+    # Result cache (see layer_cache): lifetime in seconds (None: not cached), key scope
+    # ("host": scheme://host, "url": normalized URL), and a version to bump when the layer changes
+    ttl: Optional[float] = None
+    cache_scope: str = "url"
+    version: int = 1
+    # Scan modes (risk_rules.MODES) the layer runs in
+    modes: Tuple[str, ...] = ("standard", "deep")
+
+
+_producers: Dict[str, ProducerSpec] = {}
+_layers: Dict[str, LayerSpec] = {}
+
+
+def _check_inputs(name: str, inputs: Iterable[str]) -> None:
+    for dep in inputs:
+        if dep not in _producers and dep not in CONTEXT_INPUTS:
+            raise ValueError(f"{name}: unknown input '{dep}'")
+
+
+def register_producer(spec: ProducerSpec) -> ProducerSpec:
+    _check_inputs(spec.name, spec.inputs)
+    if spec.name in _producers or spec.name in CONTEXT_INPUTS:
+        raise ValueError(f"producer '{spec.name}' already registered")
+    _producers[spec.name] = spec
+    return spec
+
+
+def register_layer(spec: LayerSpec) -> LayerSpec:
+    _check_inputs(spec.name, spec.inputs)
+    if spec.cost not in COST_CLASSES:
+        raise ValueError(f"{spec.name}: unknown cost class '{spec.cost}'")
+    if not spec.modes or any(mode not in MODES for mode in spec.modes):
+        raise ValueError(f"{spec.name}: unknown scan modes {spec.modes}")
+    if spec.cache_scope not in CACHE_SCOPES:
+        raise ValueError(f"{spec.name}: unknown cache scope '{spec.cache_scope}'")
+    if spec.ttl and any(dep in CONTEXT_INPUTS for dep in spec.inputs):
+        raise ValueError(f"{spec.name}: layers reading per-request context cannot be cached")
+    _layers[spec.name] = spec
+    return spec
+
+
+def unregister_layer(name: str) -> None:
+    _layers.pop(name, None)
+
+
+def layers(mode: Optional[str] = "standard") -> List[LayerSpec]:
+    """Layers of scan `mode` (every layer when None) in registration order, the order reasons are reported in."""
+    return [spec for spec in _layers.values() if mode is None or mode in spec.modes]
+
+
+def by_cost(specs: Iterable[LayerSpec]) -> List[LayerSpec]:
+    return sorted(specs, key=lambda spec: COST_CLASSES.index(spec.cost))
+
+
+# Result status: "ok", "timeout" (no answer in time) or "error" (the layer raised)
+OK, TIMEOUT, ERROR = "ok", "timeout", "error"
+
+
+def fallback(spec: LayerSpec, message: str, status: str = ERROR):
+    return type("LayerResult", (), {"score": spec.fallback_score, "message": message, "status": status})()
+
+
+class Executor:
+    """Runs a set of layers for one URL, sharing every producer between its consumers."""
+
+    def __init__(self, url: str, context: Optional[Dict[str, Any]] = None):
+        self.url = url
+        self.context = dict(context or {})
+        self._inputs: Dict[str, asyncio.Task] = {}
+        self._tasks: List[asyncio.Task] = []
+
+    def _input(self, name: str) -> asyncio.Future:
+        if name in CONTEXT_INPUTS:
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(self.context.get(name))
+            return future
+        task = self._inputs.get(name)
+        if task is None:
+            task = self._inputs[name] = asyncio.create_task(self._produce(_producers[name]))
+        return task
+
+    async def _gather_inputs(self, names: Tuple[str, ...]) -> Dict[str, Any]:
+        # Shield shared producers so one consumer timing out does not cancel them for the others
+        values = await asyncio.gather(*(asyncio.shield(self._input(name)) for name in names))
+        return dict(zip(names, values))
+
+    async def _produce(self, spec: ProducerSpec) -> Any:
+        try:
+            inputs = await self._gather_inputs(spec.inputs)
+            return await asyncio.wait_for(spec.produce(self.url, **inputs), timeout=deadline.clamp(spec.timeout))
+        except Exception:
+            # Consumers fall back to fetching (or going without) the input themselves
+            return None
+
+    async def _run(self, spec: LayerSpec):
+        async def run():
+            inputs = await self._gather_inputs(spec.inputs)
+            return await spec.run(self.url, **inputs)
+
+        own_timeout = layer_latency.timeout(spec.name, spec.timeout)
+        timeout = deadline.clamp(own_timeout)
+        started = time.monotonic()
+        cut_short = False
+        try:
+            result = await asyncio.wait_for(run(), timeout=timeout)
+        except asyncio.TimeoutError:
+            result = fallback(spec, f"{spec.name} timed out", TIMEOUT)
+            cut_short = timeout != own_timeout
+        except Exception:
+            result = fallback(spec, spec.fallback_message)
+        # Timed-out runs count at the timeout (a lower bound), so a slow spell widens it again;
+        # cancelled runs (early exit) and runs cut short by the scan's stop time are not recorded
+        if not cut_short:
+            layer_latency.record(spec.name, time.monotonic() - started)
+        return result
+
+    async def run(self, specs: Iterable[LayerSpec]) -> AsyncIterator[Tuple[LayerSpec, Any]]:
+        """Start `specs` (cheapest first) and yield (spec, result) as each one finishes."""
+        started = {asyncio.create_task(self._run(spec)): spec for spec in by_cost(specs)}
+        self._tasks.extend(started)
+        waiting = set(started)
+        while waiting:
+            done, waiting = await asyncio.wait(waiting, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                yield started[task], task.result()
+
+    def cancel(self) -> None:
+        for task in self._tasks:
+            task.cancel()
+        for task in self._inputs.values():
+            task.cancel()
+
+
+# -- Built-in producers ------------------------------------------------------
+
+def _host(url: str) -> str:
+    return urlparse(url).hostname or ""
+
+
+async def _page(url: str):
+    return await page_snapshot.fetch_snapshot(url)
+
+
+async def _whois(url: str):
+    # A slow registry only costs the age/registrar signals
+    timeout = settings.rdap_timeout + settings.whois_timeout
+    return await asyncio.wait_for(rdap_client.lookup(_host(url)), timeout=timeout)
+
+
+async def _dns(url: str):
+    return await dns_resolver.lookup(_host(url))
+
+
+async def _tls(url: str, dns=None):
+    # Handshake with the address already resolved by the dns producer
+    address = dns.addresses[0] if dns is not None and dns.addresses else None
+    return await tls_utils.fetch_tls_info(_host(url), 443, 10.0, address)
+
+
+register_producer(ProducerSpec("page", _page))
+register_producer(ProducerSpec("whois", _whois))
+register_producer(ProducerSpec("dns", _dns))
+register_producer(ProducerSpec("tls", _tls, inputs=("dns",), timeout=12.0))
+
+
+# -- Built-in layers ---------------------------------------------------------
+
+def _domain_probe(url: str):
+    # The typosquatting/homograph checks do not need registration data; a hit settles the layer
+    result = li_domain.analyze(url)
+    if any(word in result.message.lower() for word in VETO_WORDING):
+        return result
+    return None
+
+
+async def _domain(url: str, whois=None):
+    return li_domain.analyze(url, registration=whois)
+
+
+async def _feedback(url: str, session=None):
+    if session is None:
+        return li_feedback.LayerResult(score=10.0, message="No session provided")
+    return li_feedback.summarize_feedback(session, url)
+
+
+register_layer(LayerSpec(
+    "domain_infra", _domain, weight=0.25, inputs=("whois",), cost="io",
+    fallback_score=20.0, fallback_message="Domain analysis failed",
+    # can_veto stays False: the veto checks are exactly what the probe already ran
+    probe=_domain_probe,
+    # Registration age and registrar change over days
+    ttl=24 * 3600, cache_scope="host",
+))
+register_layer(LayerSpec(
+    "content_ux", lambda url, page: li_content.analyze(url, snapshot=page), weight=0.10, inputs=("page",),
+    cost="heavy", timeout=8.0, fallback_score=15.0, fallback_message="Content/UX analysis failed",
+    ttl=3600,
+))
+register_layer(LayerSpec(
+    "business_verification", lambda url, page: li_business.analyze(url, snapshot=page), weight=0.15, inputs=("page",),
+    cost="heavy", timeout=10.0, fallback_score=25.0, fallback_message="Business verification failed",
+    ttl=3600,
+))
+register_layer(LayerSpec(
+    "technical_verification", lambda url, whois, dns, tls: li_technical.analyze(url, registration=whois, dns=dns, tls=tls),
+    weight=0.08, inputs=("whois", "dns", "tls"),
+    cost="io", timeout=8.0, fallback_score=15.0, fallback_message="Technical verification failed",
+    # Certificates and DNS change over hours
+    ttl=6 * 3600, cache_scope="host",
+))
+register_layer(LayerSpec(
+    "merchant_verification", lambda url, page: li_merchant.analyze(url, snapshot=page), weight=0.30, inputs=("page",),
+    cost="heavy", timeout=10.0, fallback_score=30.0, fallback_message="Merchant verification failed",
+    ttl=3600,
+))
+register_layer(LayerSpec(
+    "visual_brand", lambda url: li_visual.analyze(url), weight=0.05,
+    cost="cheap", timeout=5.0, fallback_score=5.0, fallback_message="Visual/brand analysis failed",
+))
+register_layer(LayerSpec(
+    "threat_intel", lambda url: li_threat.analyze(url), weight=0.12,
+    cost="io", timeout=8.0, fallback_score=0.0, fallback_message="Threat intel check failed",
+    # Blocklists update within minutes
+    ttl=600,
+))
+register_layer(LayerSpec(
+    "user_feedback", _feedback, weight=0.05, inputs=("session",),
+    cost="cheap", fallback_score=10.0, fallback_message="User feedback unavailable",
+))
+
+# Instant scans: local computation only, no inputs and no network
+register_layer(LayerSpec(
+    "host_signals", lambda url: li_host.analyze(url), weight=0.8, modes=("instant",),
+    cost="cheap", fallback_score=20.0, fallback_message="Host checks failed", can_veto=True,
+))
+register_layer(LayerSpec(
+    "local_threats", lambda url: li_local.analyze(url), weight=0.2, modes=("instant",),
+    cost="cheap", fallback_score=0.0, fallback_message="Local threat list check failed", can_veto=True,
+))
+
+# Deep scans add a crawl of the linked policy pages
+register_layer(LayerSpec(
+    "site_crawl", lambda url, page: li_crawl.analyze(url, snapshot=page), weight=0.15, inputs=("page",), modes=("deep",),
+    cost="heavy", timeout=15.0, fallback_score=20.0, fallback_message="Site crawl failed",
+    ttl=3600,
+))
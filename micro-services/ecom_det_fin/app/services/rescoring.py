@@ -0,0 +1,227 @@
+"""Offline rescoring of stored scans under candidate weights and gate thresholds.
+
+Stored SiteScan reasons are flattened once into a NumPy matrix (scans x
+layers) plus the score-independent gate inputs (failure/timeout counts,
+phishing host, veto wording, verified platform) and the verified-feedback label
+of each URL. Rescoring is then a matrix-vector product and a handful of
+vectorized gate operations, so trying a weight vector over millions of scans
+takes well under a second.
+
+    python -m app.services.rescoring build data/scans.npz
+    python -m app.services.rescoring compare data/scans.npz '{"merchant_verification": 0.2, ...}'
+"""
+from __future__ import annotations
+import json
+import sys
+from dataclasses import dataclass, replace
+from pathlib import Path
+from typing import Dict, Iterable, List, Mapping, Optional, Tuple
+
+import numpy as np
+from sqlalchemy import or_
+from sqlalchemy.engine import Engine
+from sqlmodel import Session, select
+
+from ..config import settings
+from ..models.tables import FeedbackStatus, SiteScan, VerifiedFeedback
+from ..utils.parsing import normalize_url
+from . import registry
+from .risk_rules import BADGE_ORDER, Thresholds, gate_inputs
+
+# Feedback labels
+UNKNOWN, LEGIT, FRAUD = -1, 0, 1
+
+
+@dataclass
+class ScanMatrix:
+    layers: List[str]
+    scores: np.ndarray      # float32 (n, len(layers)); layers missing from a scan score 0
+    failures: np.ndarray    # int16 (n,)
+    timeouts: np.ndarray    # int16 (n,)
+    phishing: np.ndarray    # bool (n,)
+    veto: np.ndarray        # bool (n,)
+    verified: np.ndarray    # bool (n,)
+    stored_badge: np.ndarray  # int8 (n,) index into BADGE_ORDER, -1 if unrecognised
+    label: np.ndarray       # int8 (n,) UNKNOWN / LEGIT / FRAUD from verified feedback
+
+    def __len__(self) -> int:
+        return len(self.failures)
+
+    def save(self, path: str | Path) -> None:
+        np.savez_compressed(path, layers=np.array(self.layers), **{
+            name: getattr(self, name)
+            for name in ("scores", "failures", "timeouts", "phishing", "veto", "verified", "stored_badge", "label")
+        })
+
+    @classmethod
+    def load(cls, path: str | Path) -> "ScanMatrix":
+        with np.load(path, allow_pickle=False) as data:
+            return cls(layers=[str(x) for x in data["layers"]], **{
+                name: data[name]
+                for name in ("scores", "failures", "timeouts", "phishing", "veto", "verified", "stored_badge", "label")
+            })
+
+
+@dataclass(frozen=True)
+class GateConfig(Thresholds):
+    """Standard-mode thresholds of risk_rules.apply_safety_gates; override fields to try alternatives."""
+    # The site router gates the already gated score from evaluate_all once more
+    passes: int = 2
+
+
+def _feedback_labels(session: Session) -> Dict[str, int]:
+    labels: Dict[str, int] = {}
+    rows = session.exec(select(VerifiedFeedback.url, VerifiedFeedback.status).where(
+        VerifiedFeedback.status.in_([FeedbackStatus.VERIFIED_SCAM, FeedbackStatus.VERIFIED_DELIVERED])))
+    for url, status in rows:
+        key = normalize_url(url)
+        # Any verified scam report outweighs deliveries
+        if status == FeedbackStatus.VERIFIED_SCAM:
+            labels[key] = FRAUD
+        else:
+            labels.setdefault(key, LEGIT)
+    return labels
+
+
+def extract(engine: Engine, layers: Optional[List[str]] = None, batch_size: int = 10000) -> ScanMatrix:
+    """Flatten every standard-mode SiteScan into a ScanMatrix (one JSON parse per row, done once).
+
+    Instant and deep scans use other layers, weights and thresholds, so they are left out.
+    """
+    layers = layers or [spec.name for spec in registry.layers()]
+    column = {name: j for j, name in enumerate(layers)}
+    badge_index = {name: i for i, name in enumerate(BADGE_ORDER)}
+    scores: List[np.ndarray] = []
+    flags: List[Tuple[int, int, bool, bool, bool, int, int]] = []
+
+    with Session(engine) as session:
+        labels = _feedback_labels(session)
+        query = select(SiteScan.url, SiteScan.normalized_url, SiteScan.badge, SiteScan.reasons_json).where(
+            or_(SiteScan.mode == "standard", SiteScan.mode.is_(None)))
+        rows = session.exec(query.execution_options(yield_per=batch_size))
+        for url, normalized, badge, reasons_json in rows:
+            reasons = json.loads(reasons_json or "[]")
+            row = np.zeros(len(layers), dtype=np.float32)
+            for r in reasons:
+                j = column.get(r.get("layer"))
+                if j is not None:
+                    row[j] = float(r.get("score", 0.0))
+            scores.append(row)
+            g = gate_inputs(url, reasons)
+            label = labels.get(normalized or normalize_url(url), UNKNOWN)
+            flags.append((g.failures, g.timeouts, g.phishing, g.veto, g.verified, badge_index.get(badge, -1), label))
+
+    cols = list(zip(*flags)) if flags else [()] * 7
+    return ScanMatrix(
+        layers=list(layers),
+        scores=np.vstack(scores) if scores else np.zeros((0, len(layers)), dtype=np.float32),
+        failures=np.array(cols[0], dtype=np.int16),
+        timeouts=np.array(cols[1], dtype=np.int16),
+        phishing=np.array(cols[2], dtype=bool),
+        veto=np.array(cols[3], dtype=bool),
+        verified=np.array(cols[4], dtype=bool),
+        stored_badge=np.array(cols[5], dtype=np.int8),
+        label=np.array(cols[6], dtype=np.int8),
+    )
+
+
+def weight_vector(layers: List[str], weights: Mapping[str, float]) -> np.ndarray:
+    """Weights in column order; layers not mentioned keep their current weight."""
+    current = settings.weights
+    defaults = {spec.name: spec.weight for spec in registry.layers()}
+    return np.array([weights.get(name, current.get(name, defaults.get(name, 0.0))) for name in layers], dtype=np.float32)
+
+
+def rescore(m: ScanMatrix, weights: np.ndarray, gates: GateConfig = GateConfig()) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized apply_safety_gates over weighted layer scores -> (scores, badge indices)."""
+    f = m.failures
+    caution = (f >= 1) & ~(m.verified & (f == 1))
+    caution |= f >= gates.failure_penalty_at
+    caution |= m.phishing
+    min_badge = np.where(m.veto, BADGE_ORDER.index("High Risk"), np.where(caution, BADGE_ORDER.index("Caution"), 0))
+    penalty = np.where(f >= gates.failure_penalty_at, gates.failure_penalty, 0.0) + np.where(m.phishing, gates.phishing_penalty, 0.0)
+    safe_eligible = (f == 0) & (m.timeouts == 0)
+
+    score = np.clip(m.scores @ weights, 0.0, 100.0)
+    for _ in range(max(1, gates.passes)):
+        score = score + penalty
+        score = np.where(m.veto, np.maximum(score, gates.veto_floor), score)
+        score = np.clip(score, 0.0, 100.0)
+    # Low Risk .. Critical from the bands, raised to the minimum, Verified Safe when eligible
+    badge = np.searchsorted(np.asarray(gates.badge_bands), score, side="right") + 1
+    badge = np.maximum(badge, min_badge)
+    badge = np.where(safe_eligible & (score < gates.verified_safe_below), 0, badge)
+    return score.astype(np.float32), badge.astype(np.int8)
+
+
+def badge_counts(badges: np.ndarray) -> Dict[str, int]:
+    counts = np.bincount(badges[badges >= 0], minlength=len(BADGE_ORDER))
+    return {name: int(counts[i]) for i, name in enumerate(BADGE_ORDER)}
+
+
+def transitions(before: np.ndarray, after: np.ndarray) -> np.ndarray:
+    """(badges x badges) count matrix: rows `before`, columns `after`."""
+    k = len(BADGE_ORDER)
+    ok = before >= 0
+    return np.bincount(before[ok].astype(np.int64) * k + after[ok], minlength=k * k).reshape(k, k)
+
+
+def confusion(m: ScanMatrix, badges: np.ndarray, flag_at: str = "High Risk") -> Dict[str, object]:
+    """Labelled scans per badge, and precision/recall of flagging `flag_at` or worse as fraud."""
+    labelled = m.label != UNKNOWN
+    fraud = m.label[labelled] == FRAUD
+    flagged = badges[labelled] >= BADGE_ORDER.index(flag_at)
+    tp = int(np.sum(flagged & fraud))
+    fp = int(np.sum(flagged & ~fraud))
+    fn = int(np.sum(~flagged & fraud))
+    return {
+        "labelled": int(labelled.sum()),
+        "fraud_by_badge": badge_counts(badges[labelled][fraud]),
+        "legit_by_badge": badge_counts(badges[labelled][~fraud]),
+        "precision": tp / (tp + fp) if tp + fp else None,
+        "recall": tp / (tp + fn) if tp + fn else None,
+    }
+
+
+def compare(m: ScanMatrix, weights: Mapping[str, float], gates: GateConfig = GateConfig()) -> Dict[str, object]:
+    """Badge distribution shift and feedback confusion: current settings vs the candidate."""
+    _, baseline = rescore(m, weight_vector(m.layers, {}), GateConfig())
+    _, candidate = rescore(m, weight_vector(m.layers, weights), gates)
+    return {
+        "scans": len(m),
+        "baseline": badge_counts(baseline),
+        "candidate": badge_counts(candidate),
+        "changed": int(np.sum(baseline != candidate)),
+        "transitions": {
+            BADGE_ORDER[i]: {BADGE_ORDER[j]: int(n) for j, n in enumerate(row) if n}
+            for i, row in enumerate(transitions(baseline, candidate)) if row.any()
+        },
+        "confusion": {"baseline": confusion(m, baseline), "candidate": confusion(m, candidate)},
+    }
+
+
+def main(argv: Optional[Iterable[str]] = None) -> int:
+    args = list(sys.argv[1:] if argv is None else argv)
+    if len(args) == 2 and args[0] == "build":
+        from ..db import engine
+        m = extract(engine)
+        m.save(args[1])
+        print(f"{len(m)} scans x {len(m.layers)} layers -> {args[1]}")
+        return 0
+    if len(args) in (3, 4) and args[0] == "compare":
+        gates = GateConfig()
+        if len(args) == 4:
+            overrides = json.loads(args[3])
+            if "badge_bands" in overrides:
+                overrides["badge_bands"] = tuple(overrides["badge_bands"])
+            gates = replace(gates, **overrides)
+        report = compare(ScanMatrix.load(args[1]), json.loads(args[2]), gates)
+        print(json.dumps(report, indent=2))
+        return 0
+    print("usage: python -m app.services.rescoring build OUT.npz\n"
+          "       python -m app.services.rescoring compare SCANS.npz WEIGHTS_JSON [GATES_JSON]", file=sys.stderr)
+    return 2
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
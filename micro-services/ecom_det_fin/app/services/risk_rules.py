@@ -1,6 +1,8 @@
 from __future__ import annotations
+from dataclasses import dataclass
 from urllib.parse import urlparse
 from ..config import settings
+from ..utils.host_parser import parse_host
 
 def _is_verified_host(host: str) -> bool:
     h = (host or "").lower()
@@ -18,11 +20,14 @@ PHISHING_TOKENS = {
 
 BADGE_ORDER = ["Verified Safe", "Low Risk", "Caution", "High Risk", "Critical"]
 
+# Any of these in a layer message floors the result to High Risk
+VETO_WORDING = ("typosquatting", "critical threat", "homograph")
+
 
 def _host_tokens(host: str) -> set[str]:
-    parts = host.split(".")
-    if len(parts) >= 2:
-        parts = parts[:-1]
+    # Every label left of the public suffix (subdomains + registrable label)
+    hp = parse_host(host)
+    parts = (hp.subdomain.split(".") if hp.subdomain else []) + [hp.sld]
     tokens: set[str] = set()
     for p in parts:
         for t in p.replace("-", " ").split():
@@ -31,65 +36,124 @@ def _host_tokens(host: str) -> set[str]:
     return tokens
 
 
-def apply_safety_gates(url: str, reasons: list[dict], raw_score: float) -> tuple[float, str]:
-    """
-    Post-process raw score with conservative gates:
-    - Phishing tokens in subdomain -> +25 and at least Caution
-    - Any core layer failure/timeout -> at least Caution; if >=3 failures, +20
-    - Typosquatting/critical wording -> floor to High Risk
-    - Verified Safe allowed only when no failures and score < 15
-    """
+# Scan modes, shallowest first: instant (offline checks only), standard, deep (adds a site crawl)
+MODES = ("instant", "standard", "deep")
+
+# Gate thresholds of standard scans (shared with the vectorized rescoring tool)
+VERIFIED_SAFE_BELOW = 18.0
+BADGE_BANDS = (25.0, 45.0, 70.0)   # upper bounds of Low Risk, Caution, High Risk
+FAILURE_PENALTY_AT = 3
+FAILURE_PENALTY = 20.0
+PHISHING_PENALTY = 25.0
+VETO_FLOOR = 70.0
+
+
+@dataclass(frozen=True)
+class Thresholds:
+    verified_safe_below: float = VERIFIED_SAFE_BELOW
+    badge_bands: tuple[float, float, float] = BADGE_BANDS
+    failure_penalty_at: int = FAILURE_PENALTY_AT
+    failure_penalty: float = FAILURE_PENALTY
+    phishing_penalty: float = PHISHING_PENALTY
+    veto_floor: float = VETO_FLOOR
+
+
+THRESHOLDS = {
+    # Offline checks can flag a site but never vouch for one: no Verified Safe
+    "instant": Thresholds(verified_safe_below=0.0),
+    "standard": Thresholds(),
+    # The crawl adds a fifth page-dependent layer: one more failure before the penalty, and
+    # the extra evidence widens Verified Safe slightly
+    "deep": Thresholds(verified_safe_below=20.0, failure_penalty_at=4),
+}
+FAILURE_MARKERS = (
+    "timed out", "could not fetch", "failed", "not html", "no ssl", "certificate verification failed",
+)
+
+
+@dataclass
+class GateInputs:
+    failures: int
+    timeouts: int    # timed-out or still-pending layers
+    phishing: bool   # phishing token in the host of an unverified site
+    veto: bool       # typosquatting/critical wording in some reason
+    verified: bool   # verified major platform host
+
+
+def gate_inputs(url: str, reasons: list[dict]) -> GateInputs:
+    """The score-independent facts the safety gates act on."""
     parsed = urlparse(url)
     host = (parsed.hostname or "").lower()
-    tokens = _host_tokens(host)
-
-    min_badge = "Verified Safe"
-    score = float(raw_score)
+    verified = _is_verified_host(host)
     failures = 0
+    timeouts = 0
     text = " ".join([str(r.get("message", "")) for r in reasons]).lower()
 
-    failure_markers = (
-        "timed out", "could not fetch", "failed", "not html", "no ssl", "certificate verification failed",
-    )
     for r in reasons:
         msg = str(r.get("message", "")).lower()
         layer = r.get("layer", "")
         # Skip counting merchant_verification failures for verified major platforms (host or www.host)
-        if _is_verified_host(host) and layer == "merchant_verification":
+        if verified and layer == "merchant_verification":
+            continue
+        status = r.get("status")
+        # A layer still running when a provisional result was taken is as unknown as one that timed out
+        if status in ("timeout", "pending"):
+            timeouts += 1
+            continue
+        if status == "skipped":
             continue
-        if any(m in msg for m in failure_markers):
+        # Reasons without a status (older scans) are classified by wording alone
+        if status == "error" or any(m in msg for m in FAILURE_MARKERS):
             failures += 1
 
+    # Do NOT penalize if it's a verified major platform main domain (host or www.host)
+    phishing = not verified and any(tok in _host_tokens(host) for tok in PHISHING_TOKENS)
+    veto = any(word in text for word in VETO_WORDING)
+    return GateInputs(failures=failures, timeouts=timeouts, phishing=phishing, veto=veto, verified=verified)
+
+
+def apply_safety_gates(url: str, reasons: list[dict], raw_score: float, mode: str = "standard") -> tuple[float, str]:
+    """
+    Post-process raw score with conservative gates (standard thresholds shown; see THRESHOLDS):
+    - Phishing tokens in subdomain -> +25 and at least Caution
+    - Any core layer failure -> at least Caution; if >=3 failures, +20
+    - Timeouts (status "timeout", or "pending" in provisional results) are not failures, but rule out Verified Safe
+    - Typosquatting/critical wording -> floor to High Risk
+    - Verified Safe allowed only when no failures and score < 18
+    """
+    t = THRESHOLDS[mode]
+    g = gate_inputs(url, reasons)
+    min_badge = "Verified Safe"
+    score = float(raw_score)
+
     # Major platform trust: allow one benign failure without forcing Caution
-    if failures >= 1:
-        if _is_verified_host(host) and failures == 1:
+    if g.failures >= 1:
+        if g.verified and g.failures == 1:
             pass
         else:
             min_badge = "Caution"
-    if failures >= 3:
-        score += 20
+    if g.failures >= t.failure_penalty_at:
+        score += t.failure_penalty
         min_badge = "Caution"
 
-    if any(tok in tokens for tok in PHISHING_TOKENS):
-        # Do NOT penalize if it's a verified major platform main domain (host or www.host)
-        if not _is_verified_host(host):
-            score += 25
-            min_badge = "Caution"
+    if g.phishing:
+        score += t.phishing_penalty
+        min_badge = "Caution"
 
-    if ("typosquatting" in text) or ("critical threat" in text) or ("homograph" in text):
-        score = max(score, 70.0)
+    if g.veto:
+        score = max(score, t.veto_floor)
         min_badge = "High Risk"
 
     score = max(0.0, min(100.0, score))
 
-    if failures == 0 and score < 18:
+    if g.failures == 0 and g.timeouts == 0 and score < t.verified_safe_below:
         final_badge = "Verified Safe"
     else:
-        if score < 25:
+        if score < t.badge_bands[0]:
             badge = "Low Risk"
-        elif score < 45:
+        elif score < t.badge_bands[1]:
             badge = "Caution"
-        elif score < 70:
+        elif score < t.badge_bands[2]:
             badge = "High Risk"
         else:
             badge = "Critical"
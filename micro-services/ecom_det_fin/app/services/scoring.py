@@ -1,19 +1,15 @@
 from __future__ import annotations
-from dataclasses import dataclass
-from typing import List, Tuple
 import asyncio
-from datetime import datetime
+import time
+from dataclasses import dataclass, field
+from typing import AsyncIterator, Dict, Hashable, Iterable, List, Optional, Tuple
 
 from ..config import settings
-from .layers import domain_infra as li_domain
-from .layers import content_ux as li_content
-from .layers import visual_brand as li_visual
-from .layers import threat_intel as li_threat
-from .layers import user_feedback as li_feedback
-from .layers import business_verification as li_business
-from .layers import technical_verification as li_technical
-from .layers import merchant_verification as li_merchant
+from ..utils.parsing import normalize_url
+from . import layer_cache, registry
+from .deadline import set_stop
 from .risk_rules import apply_safety_gates
+from .singleflight import SingleFlight
 
 @dataclass
 class Reason:
@@ -21,6 +17,9 @@ class Reason:
     message: str
     weight: float
     score: float
+    skipped: bool = False
+    status: str = "ok"  # "ok", "timeout", "error", "skipped" or "pending"
+    cache_age_seconds: Optional[float] = None  # set when the result came from the layer cache
 
 BADGE_THRESHOLDS = {
     # Aligned with unit tests: <40 Trusted, <70 Caution, >=70 High Risk
@@ -81,80 +80,242 @@ def advice_for(score: float) -> tuple[str, list[str]]:
         ])
 
 
-async def _with_timeout(coro, layer_name: str, timeout_sec: float, fallback_score: float, fallback_message: str):
-    try:
-        return await asyncio.wait_for(coro, timeout=timeout_sec)
-    except asyncio.TimeoutError:
-        return type("LayerResult", (), {"score": fallback_score, "message": f"{layer_name} timed out"})()
-    except Exception:
-        return type("LayerResult", (), {"score": fallback_score, "message": fallback_message})()
-
-
-async def evaluate_all(url: str, session=None) -> tuple[float, List[Reason]]:
-    w = settings.weights
-
-    # CRITICAL VETO CHECK: Domain analysis first for typosquatting detection
-    d = li_domain.analyze(url)
-    
-    # TEMPORARILY DISABLED: If domain analysis detects critical typosquatting, immediately return high risk
-    # if d.score >= 80 and ("typosquatting" in d.message.lower() or "mimics" in d.message.lower()):
-    #     return 95.0, [Reason(
-    #         layer="domain_infra", 
-    #         message=f"CRITICAL SECURITY THREAT: {d.message}",
-    #         weight=1.0,
-    #         score=95.0
-    #     )]
-
-    # Run async layers concurrently with timeouts (increased timeouts)
-    c_task = _with_timeout(li_content.analyze(url), "content_ux", 8.0, 15.0, "Content/UX analysis failed")
-    v_task = _with_timeout(li_visual.analyze(url), "visual_brand", 5.0, 5.0, "Visual/brand analysis failed")
-    t_task = _with_timeout(li_threat.analyze(url), "threat_intel", 8.0, 0.0, "Threat intel check failed")
-    b_task = _with_timeout(li_business.analyze(url), "business_verification", 10.0, 25.0, "Business verification failed")
-    tech_task = _with_timeout(li_technical.analyze(url), "technical_verification", 8.0, 15.0, "Technical verification failed")
-    merchant_task = _with_timeout(li_merchant.analyze(url), "merchant_verification", 10.0, 30.0, "Merchant verification failed")
-    
-    c, v, t, b, tech, merchant = await asyncio.gather(c_task, v_task, t_task, b_task, tech_task, merchant_task)
-
-    feedback_score = 10.0
-    feedback_msg = "No session provided"
-    if session is not None:
-        fr = li_feedback.summarize_feedback(session, url)
-        feedback_score = fr.score
-        feedback_msg = fr.message
-
-    # SUSPICIOUS DOMAIN PENALTY: If multiple systems can't analyze the domain, high risk
-    analysis_failures = sum(1 for score, msg in [
-        (c.score, c.message), (b.score, b.message), (tech.score, tech.message), (merchant.score, merchant.message)
-    ] if score >= 25 and any(keyword in msg.lower() for keyword in ["failed", "could not", "timed out", "not found"]))
-    
+_CORE_LAYERS = ("content_ux", "business_verification", "technical_verification", "merchant_verification")
+SKIPPED_MESSAGE = "Skipped: risk badge already determined by other layers"
+PENDING_MESSAGE = "Pending: still running when the deadline passed"
+
+
+@dataclass
+class Evaluation:
+    score: float
+    badge: str
+    reasons: List[Reason]
+    skipped_layers: List[str] = field(default_factory=list)
+    mode: str = "standard"
+    # Answered at the caller's deadline from the layers finished by then
+    provisional: bool = False
+    pending_layers: List[str] = field(default_factory=list)
+    # Provisional results only: resolves to the complete Evaluation once the pending layers finish
+    completion: Optional[asyncio.Future] = field(default=None, repr=False, compare=False)
+
+
+# layer -> (score, message, status)
+Results = Dict[str, Tuple[float, str, str]]
+
+
+def _reason_dicts(reasons: List[Reason]) -> list[dict]:
+    return [{"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score, "status": r.status} for r in reasons]
+
+
+def _combine(url: str, results: Results, mode: str = "standard") -> Tuple[float, str, List[Reason]]:
+    """Weighted total plus safety gates for a complete set of layer results of scan `mode`."""
+    w = settings.weights_for(mode)
+    scores = {layer: float(s) for layer, (s, _, _) in results.items()}
+    messages = {layer: m for layer, (_, m, _) in results.items()}
+    statuses = {layer: st for layer, (_, _, st) in results.items()}
+
+    # SUSPICIOUS DOMAIN PENALTY: If multiple systems can't analyze the domain, high risk.
+    # A layer that merely ran out of time says nothing about the site, so timeouts don't count.
+    analysis_failures = sum(1 for layer in _CORE_LAYERS
+                            if layer in scores and scores[layer] >= 25 and statuses[layer] != registry.TIMEOUT
+                            and any(keyword in messages[layer].lower() for keyword in ["failed", "could not", "timed out", "not found"]))
+
     # If 3+ core systems can't analyze, assume suspicious
-    if analysis_failures >= 3:
+    if analysis_failures >= 3 and "domain_infra" in scores:
         suspicion_bonus = 35.0
-        d.score = min(100.0, d.score + suspicion_bonus)
-        d.message += f"; SUSPICIOUS: {analysis_failures} verification systems failed to analyze domain"
-
-    parts = [
-        ("domain_infra", d.score, d.message, w.get("domain_infra", 0.25)),  # Updated weight
-        ("content_ux", c.score, c.message, w.get("content_ux", 0.10)),
-        ("business_verification", b.score, b.message, w.get("business_verification", 0.15)),
-        ("technical_verification", tech.score, tech.message, w.get("technical_verification", 0.08)),
-        ("merchant_verification", merchant.score, merchant.message, w.get("merchant_verification", 0.30)),  # Updated weight
-        ("visual_brand", v.score, v.message, w.get("visual_brand", 0.05)),
-        ("threat_intel", t.score, t.message, w.get("threat_intel", 0.12)),
-        ("user_feedback", feedback_score, feedback_msg, w.get("user_feedback", 0.05)),
-    ]
+        scores["domain_infra"] = min(100.0, scores["domain_infra"] + suspicion_bonus)
+        messages["domain_infra"] += f"; SUSPICIOUS: {analysis_failures} verification systems failed to analyze domain"
 
     total = 0.0
     reasons: List[Reason] = []
-    for layer, s, msg, weight in parts:
-        total += s * weight
-        reasons.append(Reason(layer=layer, message=msg, weight=weight, score=s))
+    for spec in registry.layers(mode):
+        weight = w.get(spec.name, spec.weight)
+        total += scores[spec.name] * weight
+        reasons.append(Reason(layer=spec.name, message=messages[spec.name], weight=weight, score=scores[spec.name],
+                              status=statuses[spec.name]))
 
     total = max(0.0, min(100.0, total))
+    adjusted_score, gated_badge = apply_safety_gates(url, _reason_dicts(reasons), total, mode)
+    return adjusted_score, gated_badge, reasons
+
+
+def _settled(url: str, results: Results, pending: List[registry.LayerSpec], mode: str = "standard") -> bool:
+    """True when no outcome of the pending layers can change the badge.
+
+    Every step after the layers (weighted sum, suspicion bonus, safety gates) is
+    monotone in layer scores and failures, so the best case (pending layers score
+    0 cleanly) and the worst case (they fail at 100, with veto wording where the
+    layer can produce it) bound the final badge.
+    """
+    outcomes = []
+    for worst in (False, True):
+        filled = dict(results)
+        for spec in pending:
+            if worst:
+                filled[spec.name] = (100.0, f"{spec.name} failed" + ("; critical threat" if spec.can_veto else ""), registry.ERROR)
+            else:
+                filled[spec.name] = (0.0, "", registry.OK)
+        score, badge, reasons = _combine(url, filled, mode)
+        # Callers gate the returned score once more; the badge has to hold for both
+        outcomes.append((badge, apply_safety_gates(url, _reason_dicts(reasons), score, mode)[1]))
+    return outcomes[0] == outcomes[1]
+
+
+@dataclass
+class LayerUpdate:
+    reason: Reason
+    score: float        # provisional: gated weighted mean over the layers finished so far
+    badge: str
+    pending: List[str]
+
+
+def _provisional(url: str, results: Results, pending: Iterable[str] = (), mode: str = "standard") -> Tuple[float, str]:
+    w = settings.weights_for(mode)
+    done = [(spec.name, w.get(spec.name, spec.weight)) for spec in registry.layers(mode) if spec.name in results]
+    total_weight = sum(weight for _, weight in done)
+    raw = sum(results[name][0] * weight for name, weight in done) / total_weight if total_weight else 0.0
+    reason_dicts = [{"layer": name, "message": results[name][1], "weight": weight, "score": results[name][0], "status": results[name][2]}
+                    for name, weight in done]
+    # Listing the pending layers keeps a result with unknowns from being Verified Safe
+    reason_dicts += [{"layer": name, "message": PENDING_MESSAGE, "score": 0.0, "status": "pending"} for name in pending]
+    return apply_safety_gates(url, reason_dicts, max(0.0, min(100.0, raw)), mode)
+
+
+def _provisional_evaluation(url: str, finished: Dict[str, Reason], mode: str = "standard") -> Evaluation:
+    specs = registry.layers(mode)
+    weights = settings.weights_for(mode)
+    pending = [spec.name for spec in specs if spec.name not in finished]
+    score, badge = _provisional(url, {name: (r.score, r.message, r.status) for name, r in finished.items()}, pending, mode)
+    reasons = [
+        finished.get(spec.name) or Reason(layer=spec.name, message=PENDING_MESSAGE, weight=weights.get(spec.name, spec.weight),
+                                          score=0.0, status="pending")
+        for spec in specs
+    ]
+    return Evaluation(score=score, badge=badge, reasons=reasons, mode=mode, provisional=True, pending_layers=pending)
+
+
+async def evaluate_stream(url: str, session=None, mode: str = "standard") -> AsyncIterator[LayerUpdate | Evaluation]:
+    """Yield a LayerUpdate as each layer finishes, then the final Evaluation.
+
+    `mode` (risk_rules.MODES) selects the layers, weights and gate thresholds:
+    instant runs only the offline checks, deep adds the site crawl.
+    Layers with a fresh result in the layer cache are not run. Stops as soon as
+    the remaining layers can no longer change the badge; those are cancelled
+    and reported in `skipped_layers` with a score of 0 (the best case the badge
+    was settled on).
+    """
+    specs = registry.layers(mode)
+    weights = settings.weights_for(mode)
+    results: Results = {}
+    cache_ages: Dict[str, float] = {}
+
+    def update(spec: registry.LayerSpec, r, pending: List[registry.LayerSpec], cache_age: Optional[float] = None) -> LayerUpdate:
+        status = getattr(r, "status", registry.OK)
+        results[spec.name] = (r.score, r.message, status)
+        if cache_age is not None:
+            cache_ages[spec.name] = round(cache_age, 1)
+        score, badge = _provisional(url, results, mode=mode)
+        reason = Reason(layer=spec.name, message=r.message, weight=weights.get(spec.name, spec.weight), score=float(r.score),
+                        status=status, cache_age_seconds=cache_ages.get(spec.name))
+        return LayerUpdate(reason=reason, score=score, badge=badge, pending=[p.name for p in pending if p.name not in results])
+
+    # CRITICAL VETO CHECK: probes (domain typosquatting/homograph) settle a layer without any I/O
+    probed = []
+    for spec in specs:
+        if spec.probe is None:
+            continue
+        try:
+            r = spec.probe(url)
+        except Exception:
+            r = None
+        if r is not None:
+            probed.append((spec, r))
+    for spec, r in probed:
+        yield update(spec, r, specs)
+
+    # Fresh cached results stand in for running their layers
+    cached = []
+    for spec in specs:
+        if spec.name not in results:
+            hit = layer_cache.get(spec, url)
+            if hit is not None:
+                cached.append((spec, hit))
+    for spec, (r, age) in cached:
+        yield update(spec, r, specs, cache_age=age)
+
+    pending = [spec for spec in specs if spec.name not in results]
+    if pending and not _settled(url, results, pending, mode):
+        executor = registry.Executor(url, context={"session": session})
+        try:
+            async for spec, r in executor.run(pending):
+                layer_cache.put(spec, url, r)
+                yield update(spec, r, pending)
+                pending = [p for p in pending if p.name not in results]
+                if pending and _settled(url, results, pending, mode):
+                    break
+        finally:
+            executor.cancel()
+
+    skipped = [spec.name for spec in specs if spec.name not in results]
+    for name in skipped:
+        results[name] = (0.0, SKIPPED_MESSAGE, "skipped")
+    score, badge, reasons = _combine(url, results, mode)
+    for r in reasons:
+        r.skipped = r.layer in skipped
+        r.cache_age_seconds = cache_ages.get(r.layer)
+    yield Evaluation(score=score, badge=badge, reasons=reasons, skipped_layers=skipped, mode=mode)
+
+
+# Concurrent scans of the same normalized URL share one pipeline run
+scan_flight = SingleFlight("scan")
+# Layers finished so far by each in-flight scan, for provisional results
+_progress: Dict[Hashable, Dict[str, Reason]] = {}
+
+
+async def _evaluate(url: str, session=None, key: Hashable = None, stop_at: Optional[float] = None,
+                    mode: str = "standard") -> Evaluation:
+    set_stop(stop_at)
+    finished: Dict[str, Reason] = {}
+    _progress[key] = finished
+    try:
+        async for item in evaluate_stream(url, session=session, mode=mode):
+            if isinstance(item, Evaluation):
+                return item
+            finished[item.reason.layer] = item.reason
+        raise RuntimeError("evaluate_stream ended without a result")
+    finally:
+        if _progress.get(key) is finished:
+            del _progress[key]
+
+
+async def evaluate(url: str, session=None, deadline: Optional[float] = None, mode: str = "standard") -> Evaluation:
+    """Run the registered layers and return the final Evaluation (see `evaluate_stream`).
+
+    Calls for a URL that is already being scanned await that scan instead of
+    starting another. Without a session the feedback layer is not scored, so
+    session and session-less calls are kept apart.
+
+    With a `deadline` (seconds), a scan still running when it passes is
+    answered with a provisional Evaluation from the layers finished so far.
+    The scan carries on for up to SCAN_BACKGROUND_BUDGET more seconds and the
+    result's `completion` resolves to the final Evaluation.
+    """
+    key = (normalize_url(url), session is not None, mode)
+    stop_at = None if deadline is None else time.monotonic() + deadline + settings.scan_background_budget
+    try:
+        return await scan_flight.do(key, lambda: _evaluate(url, session=session, key=key, stop_at=stop_at, mode=mode),
+                                    timeout=deadline)
+    except asyncio.TimeoutError:
+        completion = scan_flight.task(key)
+        if completion is None:
+            # The scan itself raised TimeoutError
+            raise
+        result = _provisional_evaluation(url, dict(_progress.get(key, {})), mode)
+        result.completion = completion
+        return result
 
-    # Convert reasons for safety gates (list of dicts)
-    reason_dicts = [{"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score} for r in reasons]
-    adjusted_score, gated_badge = apply_safety_gates(url, reason_dicts, total)
 
+async def evaluate_all(url: str, session=None, mode: str = "standard") -> tuple[float, List[Reason]]:
     # Return adjusted score with reasons; router will compute advice based on score/badge
-    return adjusted_score, reasons
+    result = await evaluate(url, session=session, mode=mode)
+    return result.score, result.reasons
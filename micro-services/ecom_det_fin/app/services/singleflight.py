@@ -0,0 +1,77 @@
+from __future__ import annotations
+import asyncio
+import weakref
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class _Call:
+    __slots__ = ("task", "waiters", "detached")
+
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+        # Some caller stopped waiting at its deadline but still wants the result
+        self.detached = False
+
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key onto one in-flight task.
+
+    The shared task is shielded from any single caller: it is cancelled only
+    when every caller waiting on it has been cancelled. A caller whose
+    `timeout` runs out gets asyncio.TimeoutError instead, and the task then
+    runs to completion regardless (fetch it with `task`).
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.calls = 0
+        self.coalesced = 0
+        self.detached = 0
+        # Per-loop state: asyncio primitives cannot be shared across event loops
+        self._inflight: "weakref.WeakKeyDictionary[asyncio.AbstractEventLoop, Dict[Hashable, _Call]]" = weakref.WeakKeyDictionary()
+
+    async def do(self, key: Hashable, fn: Callable[[], Awaitable[T]], timeout: Optional[float] = None) -> T:
+        inflight = self._inflight.setdefault(asyncio.get_running_loop(), {})
+        self.calls += 1
+        call = inflight.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(fn()))
+            inflight[key] = call
+            call.task.add_done_callback(lambda _t: inflight.pop(key, None) if inflight.get(key) is call else None)
+        else:
+            self.coalesced += 1
+        call.waiters += 1
+        try:
+            if timeout is None:
+                return await asyncio.shield(call.task)
+            # asyncio.wait leaves the task alone on both timeout and cancellation
+            done, _ = await asyncio.wait({call.task}, timeout=timeout)
+            if not done:
+                call.detached = True
+                self.detached += 1
+                raise asyncio.TimeoutError
+            return call.task.result()
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.detached and not call.task.done():
+                # Every caller went away: stop the shared work and let the next call start afresh
+                call.task.cancel()
+                if inflight.get(key) is call:
+                    del inflight[key]
+
+    def task(self, key: Hashable) -> Optional[asyncio.Future]:
+        """The in-flight task for `key` on the running loop, if any."""
+        call = self._inflight.get(asyncio.get_running_loop(), {}).get(key)
+        return call.task if call is not None else None
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "calls": self.calls,
+            "coalesced": self.coalesced,
+            "detached": self.detached,
+            "in_flight": sum(len(calls) for calls in self._inflight.values()),
+        }
@@ -1,8 +1,29 @@
+"""Asyncio TLS prober shared by the tls producer, the technical layer and the gateway checks.
+
+Results are cached per (host, port) until the sooner of TLS_CACHE_TTL and the
+certificate's expiry; concurrent probes of the same endpoint share one in-flight
+handshake. Certificates that fail verification are cached for TLS_NEGATIVE_TTL,
+while timeouts and connection errors are retried on the next probe.
+
+The chain is verified against the system trust store, but the hostname is
+matched here rather than by ssl, so a certificate issued for another name still
+yields its details along with `san_mismatch`. Key type and signature hash come
+from a short walk of the DER certificate; the verified chain length needs
+Python 3.13+ (None before).
+"""
 from __future__ import annotations
-import ssl, socket, datetime, hashlib
-from dataclasses import dataclass
+import asyncio
+import ipaddress
+import ssl
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 from typing import Optional
 
+from ..config import settings
+from .singleflight import SingleFlight
+from .ttl_cache import MISSING, TTLCache
+
+
 @dataclass
 class TLSInfo:
     days_remaining: Optional[int]
@@ -10,65 +31,194 @@ class TLSInfo:
     san_mismatch: bool
     sig_hash: str | None
     errors: list[str]
+    issuer_org: str | None = None
+    is_wildcard: bool = False
+    subject_cn: str | None = None
+    sans: list[str] = field(default_factory=list)
+    not_before: datetime | None = None
+    not_after: datetime | None = None
+    chain_length: int | None = None
+    key_type: str | None = None  # e.g. "RSA-2048", "EC-P-256", "Ed25519"
+
+
+# "host:port" -> asdict(TLSInfo)
+tls_cache = TTLCache("tls", max_entries=settings.tls_cache_size)
+tls_flight = SingleFlight("tls")
+
+_RSA = "1.2.840.113549.1.1.1"
+_EC = "1.2.840.10045.2.1"
+_KEY_TYPES = {"1.3.101.112": "Ed25519", "1.3.101.113": "Ed448", "1.2.840.10040.4.1": "DSA"}
+_CURVES = {"1.2.840.10045.3.1.7": "P-256", "1.3.132.0.34": "P-384", "1.3.132.0.35": "P-521"}
+_SIG_HASHES = {
+    "1.2.840.113549.1.1.5": "sha1", "1.2.840.113549.1.1.11": "sha256",
+    "1.2.840.113549.1.1.12": "sha384", "1.2.840.113549.1.1.13": "sha512",
+    "1.2.840.10045.4.1": "sha1", "1.2.840.10045.4.3.2": "sha256",
+    "1.2.840.10045.4.3.3": "sha384", "1.2.840.10045.4.3.4": "sha512",
+}
+
 
-def fetch_tls_info(host: str, port: int = 443, timeout: float = 3.5) -> TLSInfo:
-    errors: list[str] = []
-    issuer = None
-    days_remaining: Optional[int] = None
-    san_mismatch = False
-    sig_hash = None
+def _tlv(data: bytes, pos: int = 0) -> tuple[int, bytes, int]:
+    """(tag, value, end) of the DER element at `pos`."""
+    tag, length = data[pos], data[pos + 1]
+    pos += 2
+    if length & 0x80:
+        n = length & 0x7F
+        length = int.from_bytes(data[pos:pos + n], "big")
+        pos += n
+    return tag, data[pos:pos + length], pos + length
+
+
+def _children(data: bytes) -> list[tuple[int, bytes]]:
+    items, pos = [], 0
+    while pos < len(data):
+        tag, value, pos = _tlv(data, pos)
+        items.append((tag, value))
+    return items
+
+
+def _oid(value: bytes) -> str:
+    parts = [value[0] // 40, value[0] % 40]
+    n = 0
+    for b in value[1:]:
+        n = (n << 7) | (b & 0x7F)
+        if not b & 0x80:
+            parts.append(n)
+            n = 0
+    return ".".join(map(str, parts))
+
+
+def _der_details(der: bytes) -> tuple[str | None, str | None]:
+    """(key type, signature hash) of a DER certificate; (None, None) when it cannot be read."""
     try:
-        ctx = ssl.create_default_context()
-        with socket.create_connection((host, port), timeout=timeout) as sock:
-            with ctx.wrap_socket(sock, server_hostname=host) as ssock:
-                cert = ssock.getpeercert()
-                # Expiry
-                try:
-                    not_after = cert.get('notAfter')
-                    if not_after:
-                        dt = datetime.datetime.strptime(not_after, '%b %d %H:%M:%S %Y %Z')
-                        days_remaining = (dt - datetime.datetime.utcnow()).days
-                except Exception as e:  # pragma: no cover
-                    errors.append(f"expiry-parse:{e}")
-                # Issuer
-                try:
-                    issuer = "/".join("=".join(x) for x in cert.get('issuer', [])[0]) if cert.get('issuer') else None
-                except Exception:
-                    pass
-                # SAN match
-                try:
-                    sans = []
-                    ext = cert.get('subjectAltName', [])
-                    for typ, val in ext:
-                        if typ == 'DNS':
-                            sans.append(val.lower())
-                    if sans and host.lower() not in sans and not any(_wildcard_matches(host.lower(), s) for s in sans if s.startswith('*')):
-                        san_mismatch = True
-                except Exception:
-                    pass
-                # Signature hash from cipher (approx – deeper parsing would need cryptography)
-                try:
-                    # Without external deps we approximate using cipher suite name
-                    cipher = ssock.cipher()
-                    if cipher and cipher[0]:
-                        name = cipher[0].lower()
-                        if 'sha256' in name:
-                            sig_hash = 'sha256'
-                        elif 'sha384' in name:
-                            sig_hash = 'sha384'
-                        elif 'sha1' in name:
-                            sig_hash = 'sha1'
-                        else:
-                            sig_hash = None
-                except Exception:
-                    pass
-    except Exception as e:
-        errors.append(str(e))
-    return TLSInfo(days_remaining=days_remaining, issuer=issuer, san_mismatch=san_mismatch, sig_hash=sig_hash, errors=errors)
+        cert = _children(_tlv(der)[1])
+        tbs = _children(cert[0][1])
+        if tbs[0][0] == 0xA0:  # explicit version
+            tbs = tbs[1:]
+        # serialNumber, signature, issuer, validity, subject, subjectPublicKeyInfo
+        spki = _children(tbs[5][1])
+        algorithm = _children(spki[0][1])
+        key_oid = _oid(algorithm[0][1])
+        if key_oid == _RSA:
+            # BIT STRING: unused-bits byte, then RSAPublicKey { modulus, exponent }
+            modulus = _children(_tlv(spki[1][1][1:])[1])[0][1].lstrip(b"\0")
+            key_type = f"RSA-{len(modulus) * 8}"
+        elif key_oid == _EC:
+            curve = _oid(algorithm[1][1]) if len(algorithm) > 1 and algorithm[1][0] == 0x06 else None
+            key_type = f"EC-{_CURVES.get(curve, curve)}"
+        else:
+            key_type = _KEY_TYPES.get(key_oid, key_oid)
+        return key_type, _SIG_HASHES.get(_oid(_children(cert[1][1])[0][1]))
+    except (IndexError, ValueError):
+        return None, None
+
 
 def _wildcard_matches(host: str, pattern: str) -> bool:
-    # pattern like *.example.com
-    if not pattern.startswith('*.'):
+    # "*.example.com" covers exactly one label: a.example.com, not a.b.example.com
+    if not pattern.startswith("*."):
         return False
-    suffix = pattern[1:]  # .example.com
-    return host.endswith(suffix)
+    suffix = pattern[1:]
+    return host.endswith(suffix) and "." not in host[:-len(suffix)] and len(host) > len(suffix)
+
+
+def _matches_host(host: str, cert: dict) -> bool:
+    host = host.lower().rstrip(".")
+    try:
+        ip = ipaddress.ip_address(host)
+    except ValueError:
+        ip = None
+    sans = cert.get("subjectAltName", ())
+    if ip is not None:
+        return any(typ == "IP Address" and ipaddress.ip_address(val.strip()) == ip for typ, val in sans)
+    names = [val.lower() for typ, val in sans if typ == "DNS"]
+    if not names:
+        # No SAN extension: fall back to the subject CN
+        cn = dict(x[0] for x in cert.get("subject", ())).get("commonName")
+        names = [cn.lower()] if cn else []
+    return any(host == name or _wildcard_matches(host, name) for name in names)
+
+
+def _cert_time(value: str | None) -> datetime | None:
+    return datetime.utcfromtimestamp(ssl.cert_time_to_seconds(value)) if value else None
+
+
+def _info(host: str, cert: dict, der: bytes | None, chain_length: int | None) -> TLSInfo:
+    issuer = dict(x[0] for x in cert.get("issuer", ()))
+    subject = dict(x[0] for x in cert.get("subject", ()))
+    not_after = _cert_time(cert.get("notAfter"))
+    key_type, sig_hash = _der_details(der) if der else (None, None)
+    mismatch = not _matches_host(host, cert)
+    return TLSInfo(
+        days_remaining=(not_after - datetime.utcnow()).days if not_after else None,
+        issuer="/".join("=".join(x) for x in cert["issuer"][0]) if cert.get("issuer") else None,
+        san_mismatch=mismatch,
+        sig_hash=sig_hash,
+        errors=[f"certificate is not valid for {host}"] if mismatch else [],
+        issuer_org=issuer.get("organizationName"),
+        is_wildcard=subject.get("commonName", "").startswith("*."),
+        subject_cn=subject.get("commonName"),
+        sans=[val for typ, val in cert.get("subjectAltName", ()) if typ in ("DNS", "IP Address")],
+        not_before=_cert_time(cert.get("notBefore")),
+        not_after=not_after,
+        chain_length=chain_length,
+        key_type=key_type,
+    )
+
+
+def _context() -> ssl.SSLContext:
+    ctx = ssl.create_default_context()
+    # The chain is still verified; the hostname is matched in _info so mismatches keep their details
+    ctx.check_hostname = False
+    return ctx
+
+
+async def _handshake(host: str, port: int, timeout: float, address: str | None) -> tuple[TLSInfo, bool]:
+    """(result, cacheable): verification failures are cacheable, network failures are not."""
+    try:
+        _, writer = await asyncio.wait_for(
+            asyncio.open_connection(address or host, port, ssl=_context(), server_hostname=host), timeout=timeout
+        )
+    except ssl.SSLCertVerificationError as e:
+        return TLSInfo(days_remaining=None, issuer=None, san_mismatch=False, sig_hash=None, errors=[str(e)]), True
+    except (OSError, asyncio.TimeoutError) as e:
+        # Includes the other SSLErrors (EOF, reset mid-handshake, ...): the next probe may well succeed
+        return TLSInfo(days_remaining=None, issuer=None, san_mismatch=False, sig_hash=None,
+                       errors=[str(e) or type(e).__name__]), False
+    try:
+        ssl_object = writer.get_extra_info("ssl_object")
+        get_chain = getattr(ssl_object, "get_verified_chain", None)
+        chain_length = len(get_chain()) if get_chain is not None else None
+        info = _info(host, ssl_object.getpeercert(), ssl_object.getpeercert(binary_form=True), chain_length)
+        return info, True
+    finally:
+        writer.close()
+        try:
+            await asyncio.wait_for(writer.wait_closed(), timeout=1.0)
+        except Exception:
+            pass
+
+
+async def _probe_and_store(key: str, host: str, port: int, timeout: float, address: str | None) -> TLSInfo:
+    info, cacheable = await _handshake(host, port, timeout, address)
+    if info.errors:
+        if cacheable:
+            tls_cache.set(key, asdict(info), settings.tls_negative_ttl)
+    elif info.not_after is not None:
+        # Never serve a certificate past its expiry
+        ttl = min(settings.tls_cache_ttl, (info.not_after - datetime.utcnow()).total_seconds())
+        if ttl > 0:
+            tls_cache.set(key, asdict(info), ttl)
+    return info
+
+
+async def fetch_tls_info(host: str, port: int = 443, timeout: float = 10.0, address: str | None = None) -> TLSInfo:
+    """Probe `host` (SNI) through the certificate cache, connecting to `address` when given so an
+    already resolved name is not looked up again. Never raises; failures are listed in `errors`."""
+    host = (host or "").lower().rstrip(".")
+    key = f"{host}:{port}"
+    cached = tls_cache.get(key)
+    if cached is not MISSING:
+        info = TLSInfo(**cached)
+        if info.not_after is not None:
+            info.days_remaining = (info.not_after - datetime.utcnow()).days
+        return info
+    return await tls_flight.do(key, lambda: _probe_and_store(key, host, port, timeout, address))
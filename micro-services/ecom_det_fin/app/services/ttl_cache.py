@@ -0,0 +1,142 @@
+from __future__ import annotations
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, date
+from pathlib import Path
+from typing import Any
+
+MISSING = object()
+
+
+def _encode(obj: Any) -> Any:
+    if isinstance(obj, datetime):
+        return {"$dt": obj.isoformat()}
+    if isinstance(obj, date):
+        return {"$date": obj.isoformat()}
+    raise TypeError(f"Not JSON serializable: {type(obj).__name__}")
+
+
+def _decode(obj: dict) -> Any:
+    if "$dt" in obj and len(obj) == 1:
+        return datetime.fromisoformat(obj["$dt"])
+    if "$date" in obj and len(obj) == 1:
+        return date.fromisoformat(obj["$date"])
+    return obj
+
+
+class TTLCache:
+    """Thread-safe LRU cache with per-entry TTL and optional SQLite write-through.
+
+    Values must be JSON-serializable (datetimes are supported). `None` is a valid
+    cached value, so callers can store negative results; use `MISSING` to detect a miss.
+    """
+
+    def __init__(self, namespace: str, max_entries: int = 4096, db_path: str | None = None):
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, tuple[float, float, Any]] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: sqlite3.Connection | None = None
+        self.hits = 0
+        self.misses = 0
+        self.negative_hits = 0
+        if db_path:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            self._db = sqlite3.connect(db_path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS ttl_cache ("
+                "namespace TEXT NOT NULL, key TEXT NOT NULL, stored_at REAL NOT NULL, "
+                "expires_at REAL NOT NULL, value TEXT NOT NULL, PRIMARY KEY (namespace, key))"
+            )
+            self._db.commit()
+
+    def _load(self, key: str, now: float) -> tuple[float, float, Any] | None:
+        if self._db is None:
+            return None
+        row = self._db.execute(
+            "SELECT stored_at, expires_at, value FROM ttl_cache WHERE namespace = ? AND key = ?",
+            (self.namespace, key),
+        ).fetchone()
+        if row is None or row[1] <= now:
+            return None
+        return row[0], row[1], json.loads(row[2], object_hook=_decode)
+
+    def _lookup(self, key: str) -> tuple[float, float, Any] | None:
+        now = time.time()
+        entry = self._entries.get(key)
+        if entry is not None and entry[1] <= now:
+            del self._entries[key]
+            entry = None
+        if entry is None:
+            entry = self._load(key, now)
+            if entry is not None:
+                self._remember(key, entry)
+        else:
+            self._entries.move_to_end(key)
+        return entry
+
+    def _remember(self, key: str, entry: tuple[float, float, Any]) -> None:
+        self._entries[key] = entry
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def get(self, key: str, default: Any = MISSING, count: bool = True) -> Any:
+        with self._lock:
+            entry = self._lookup(key)
+            if count:
+                if entry is None:
+                    self.misses += 1
+                else:
+                    self.hits += 1
+                    if entry[2] is None:
+                        self.negative_hits += 1
+        return default if entry is None else entry[2]
+
+    def get_with_age(self, key: str) -> tuple[Any, float] | None:
+        """(value, seconds since it was stored) for a live entry, or None; counted like `get`."""
+        with self._lock:
+            entry = self._lookup(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            return entry[2], max(0.0, time.time() - entry[0])
+
+    def set(self, key: str, value: Any, ttl: float) -> None:
+        now = time.time()
+        entry = (now, now + ttl, value)
+        with self._lock:
+            self._remember(key, entry)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO ttl_cache (namespace, key, stored_at, expires_at, value) VALUES (?, ?, ?, ?, ?)",
+                    (self.namespace, key, entry[0], entry[1], json.dumps(value, default=_encode)),
+                )
+                self._db.commit()
+
+    def delete(self, key: str) -> None:
+        with self._lock:
+            self._entries.pop(key, None)
+            if self._db is not None:
+                self._db.execute("DELETE FROM ttl_cache WHERE namespace = ? AND key = ?", (self.namespace, key))
+                self._db.commit()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM ttl_cache WHERE namespace = ?", (self.namespace,))
+                self._db.commit()
+
+    def stats(self) -> dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "negative_hits": self.negative_hits,
+                "size": len(self._entries),
+            }
@@ -0,0 +1,181 @@
+"""Precomputed typo permutations of canonical brand labels (dnstwist-style).
+
+Every common attack permutation of each brand label is generated once and
+stored in a dict mapping the variant to a packed int ``brand_id << 4 | attack``,
+so checking a domain label is a single hash lookup that also reports the
+attack class. The table replaces the hand-maintained typosquat lists.
+
+    python -m app.services.typo_permutations   # dump variant<TAB>brand<TAB>attack
+"""
+from __future__ import annotations
+import sys
+import threading
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+from ..config import settings
+
+# Order matters: when two attacks produce the same variant the earlier one is reported
+ATTACKS = (
+    "tld-swap",
+    "omission",
+    "transposition",
+    "repetition",
+    "replacement",
+    "insertion",
+    "addition",
+    "vowel-swap",
+    "homoglyph",
+    "hyphenation",
+    "bitsquatting",
+)
+_ATTACK_BITS = 4
+
+_QWERTY = {
+    "1": "2q", "2": "3wq1", "3": "4ew2", "4": "5re3", "5": "6tr4", "6": "7yt5", "7": "8uy6", "8": "9iu7", "9": "0oi8", "0": "po9",
+    "q": "12wa", "w": "3esaq2", "e": "4rdsw3", "r": "5tfde4", "t": "6ygfr5", "y": "7uhgt6", "u": "8ijhy7", "i": "9okju8", "o": "0plki9", "p": "lo0",
+    "a": "qwsz", "s": "edxzaw", "d": "rfcxse", "f": "tgvcdr", "g": "yhbvft", "h": "ujnbgy", "j": "ikmnhu", "k": "olmji", "l": "kop",
+    "z": "asx", "x": "zsdc", "c": "xdfv", "v": "cfgb", "b": "vghn", "n": "bhjm", "m": "njk",
+}
+_VOWELS = "aeiouy"
+# ASCII look-alikes (and a few common phonetic swaps); Unicode confusables are handled separately
+_HOMOGLYPHS = {
+    "a": ["4"], "b": ["d", "6"], "c": ["k"], "d": ["b", "cl"], "e": ["3"], "g": ["q", "9"], "i": ["1", "l"],
+    "k": ["c", "lc"], "l": ["1", "i"], "m": ["rn", "nn"], "n": ["m"], "o": ["0"], "q": ["g"], "s": ["5", "z"],
+    "t": ["7"], "u": ["v"], "v": ["u"], "w": ["vv"], "z": ["2", "s"], "rn": ["m"], "vv": ["w"], "cl": ["d"],
+}
+_LABEL_CHARS = set("abcdefghijklmnopqrstuvwxyz0123456789-")
+
+
+@dataclass(frozen=True)
+class Permutation:
+    brand: str
+    attack: str
+
+
+def _omission(label: str) -> Iterator[str]:
+    for i in range(len(label)):
+        yield label[:i] + label[i + 1:]
+
+
+def _transposition(label: str) -> Iterator[str]:
+    for i in range(len(label) - 1):
+        yield label[:i] + label[i + 1] + label[i] + label[i + 2:]
+
+
+def _repetition(label: str) -> Iterator[str]:
+    for i, ch in enumerate(label):
+        yield label[:i] + ch + label[i:]
+
+
+def _replacement(label: str) -> Iterator[str]:
+    for i, ch in enumerate(label):
+        for near in _QWERTY.get(ch, ""):
+            yield label[:i] + near + label[i + 1:]
+
+
+def _insertion(label: str) -> Iterator[str]:
+    for i, ch in enumerate(label):
+        for near in _QWERTY.get(ch, ""):
+            yield label[:i] + near + label[i:]
+            yield label[:i + 1] + near + label[i + 1:]
+
+
+def _addition(label: str) -> Iterator[str]:
+    for ch in "abcdefghijklmnopqrstuvwxyz0123456789":
+        yield label + ch
+
+
+def _vowel_swap(label: str) -> Iterator[str]:
+    for i, ch in enumerate(label):
+        if ch in _VOWELS:
+            for vowel in _VOWELS:
+                yield label[:i] + vowel + label[i + 1:]
+
+
+def _homoglyph(label: str) -> Iterator[str]:
+    for glyph, swaps in _HOMOGLYPHS.items():
+        start = label.find(glyph)
+        while start != -1:
+            for swap in swaps:
+                yield label[:start] + swap + label[start + len(glyph):]
+            start = label.find(glyph, start + 1)
+
+
+def _hyphenation(label: str) -> Iterator[str]:
+    for i in range(1, len(label)):
+        yield label[:i] + "-" + label[i:]
+
+
+def _bitsquatting(label: str) -> Iterator[str]:
+    for i, ch in enumerate(label):
+        for bit in range(8):
+            flipped = chr(ord(ch) ^ (1 << bit)).lower()
+            if flipped in _LABEL_CHARS:
+                yield label[:i] + flipped + label[i + 1:]
+
+
+_GENERATORS = {
+    "tld-swap": lambda label: iter((label,)),  # the brand label itself under a non-canonical suffix
+    "omission": _omission,
+    "transposition": _transposition,
+    "repetition": _repetition,
+    "replacement": _replacement,
+    "insertion": _insertion,
+    "addition": _addition,
+    "vowel-swap": _vowel_swap,
+    "homoglyph": _homoglyph,
+    "hyphenation": _hyphenation,
+    "bitsquatting": _bitsquatting,
+}
+
+
+class PermutationTable:
+    def __init__(self, brands: Iterable[str]):
+        self.brands: List[str] = sorted({b.lower() for b in brands if b})
+        self._table: Dict[str, int] = {}
+        for brand_id, brand in enumerate(self.brands):
+            for attack_id, attack in enumerate(ATTACKS):
+                for variant in _GENERATORS[attack](brand):
+                    if len(variant) < 2 or variant.startswith("-") or variant.endswith("-"):
+                        continue
+                    if attack != "tld-swap" and variant in self.brands:
+                        continue  # another real brand, not an attack on this one
+                    self._table.setdefault(variant, brand_id << _ATTACK_BITS | attack_id)
+
+    def __len__(self) -> int:
+        return len(self._table)
+
+    def lookup(self, label: str) -> Optional[Permutation]:
+        packed = self._table.get((label or "").lower())
+        if packed is None:
+            return None
+        return Permutation(brand=self.brands[packed >> _ATTACK_BITS], attack=ATTACKS[packed & ((1 << _ATTACK_BITS) - 1)])
+
+    def items(self) -> Iterator[Tuple[str, Permutation]]:
+        for variant in sorted(self._table):
+            yield variant, self.lookup(variant)
+
+
+_table: PermutationTable | None = None
+_table_lock = threading.Lock()
+
+
+def get_permutations() -> PermutationTable:
+    """Process-wide table for settings.canonical_brands, generated on first use."""
+    global _table
+    if _table is None:
+        with _table_lock:
+            if _table is None:
+                _table = PermutationTable(settings.canonical_brands)
+    return _table
+
+
+def main() -> int:
+    out = sys.stdout
+    for variant, perm in get_permutations().items():
+        out.write(f"{variant}\t{perm.brand}\t{perm.attack}\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
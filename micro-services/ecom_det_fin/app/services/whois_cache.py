@@ -0,0 +1,27 @@
+from __future__ import annotations
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Optional, List
+from ..config import settings
+from .ttl_cache import TTLCache
+
+
+@dataclass
+class WhoisRecord:
+    """Registration data for a registrable domain, from RDAP or port-43 WHOIS."""
+    domain: str
+    creation_date: Optional[datetime] = None
+    registrar: Optional[str] = None
+    country: Optional[str] = None
+    emails: List[str] = field(default_factory=list)
+    privacy: bool = False
+    source: str = "whois"
+
+
+# Keyed by registrable domain; failures are cached as None with a short TTL.
+# Populated by rdap_client.lookup().
+whois_cache = TTLCache(
+    "whois",
+    max_entries=settings.whois_cache_size,
+    db_path=settings.whois_cache_db,
+)
@@ -0,0 +1,157 @@
+from __future__ import annotations
+import ipaddress
+import threading
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Dict, Optional
+from ..config import settings
+
+DEFAULT_PSL_PATH = Path(__file__).resolve().parent.parent / "data" / "public_suffix_list.dat"
+
+STOREFRONT = "storefront"   # hosted shop on a platform domain, e.g. *.myshopify.com
+PLATFORM = "platform"       # the platform's own site, e.g. shopify.com
+
+
+@dataclass(frozen=True)
+class HostParts:
+    host: str
+    subdomain: str          # labels left of the registrable domain ("" if none)
+    registrable: str        # ICANN registrable domain (eTLD+1), or the host itself for IPs/bare suffixes
+    suffix: str             # ICANN public suffix
+    sld: str                # the registrable label, e.g. "amazon" for www.amazon.co.uk
+    is_ip: bool = False
+    platform_class: Optional[str] = None   # STOREFRONT, PLATFORM or None
+    platform: Optional[str] = None         # matched entry, e.g. "myshopify.com"
+
+    @property
+    def tld(self) -> str:
+        return self.suffix.rsplit(".", 1)[-1] if self.suffix else ""
+
+
+class _Node:
+    __slots__ = ("children", "rule", "exception", "tag", "tag_domain")
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        self.rule = False        # an ICANN suffix rule ends here (private rules are not used for eTLD+1)
+        self.exception = False   # "!label" rule
+        self.tag: Optional[str] = None
+        self.tag_domain: Optional[str] = None
+
+    def child(self, label: str) -> "_Node":
+        node = self.children.get(label)
+        if node is None:
+            node = self.children[label] = _Node()
+        return node
+
+
+def _insert(root: _Node, name: str) -> _Node:
+    node = root
+    for label in reversed(name.strip(".").lower().split(".")):
+        node = node.child(label)
+    return node
+
+
+def build_trie(psl_path: str | Path) -> _Node:
+    """Compile ICANN suffix rules plus the configured platform/storefront domains into one reversed-label trie."""
+    root = _Node()
+    icann = True
+    with open(psl_path, encoding="utf-8") as fh:
+        for line in fh:
+            line = line.strip()
+            if line.startswith("// ===BEGIN PRIVATE DOMAINS==="):
+                icann = False
+            if not line or line.startswith("//") or not icann:
+                continue
+            rule = line.split()[0]
+            if rule.startswith("!"):
+                _insert(root, rule[1:]).exception = True
+            else:
+                _insert(root, rule).rule = True
+    for domain in settings.platform_domains:
+        node = _insert(root, domain)
+        node.tag, node.tag_domain = PLATFORM, domain.strip(".").lower()
+    for suffix in settings.hosted_storefront_suffixes:
+        node = _insert(root, suffix)
+        node.tag, node.tag_domain = STOREFRONT, suffix.strip(".").lower()
+    return root
+
+
+_trie: _Node | None = None
+_trie_key: tuple | None = None
+_lock = threading.Lock()
+
+
+def _get_trie() -> _Node:
+    global _trie, _trie_key
+    key = (
+        settings.public_suffix_list_path or str(DEFAULT_PSL_PATH),
+        tuple(settings.platform_domains),
+        tuple(settings.hosted_storefront_suffixes),
+    )
+    if _trie is None or _trie_key != key:
+        with _lock:
+            if _trie is None or _trie_key != key:
+                _trie = build_trie(key[0])
+                _trie_key = key
+                parse_host.cache_clear()
+    return _trie
+
+
+def _walk(root: _Node, labels: list[str]) -> tuple[int, Optional[str], Optional[str]]:
+    """One pass over reversed labels: (suffix label count, platform class, platform domain)."""
+    suffix_len = 1  # implicit "*" rule
+    exception = False
+    tag = tag_domain = None
+    node = root
+    n = len(labels)
+    for depth, label in enumerate(reversed(labels), 1):
+        wildcard = node.children.get("*")
+        child = node.children.get(label)
+        if child is not None and child.exception:
+            suffix_len, exception = depth - 1, True
+        elif not exception and wildcard is not None and wildcard.rule:
+            suffix_len = max(suffix_len, depth)
+        if child is None:
+            break
+        if child.rule and not exception:
+            suffix_len = max(suffix_len, depth)
+        # Storefront suffixes only apply strictly below the platform domain (shop.myshopify.com)
+        if child.tag == PLATFORM or (child.tag == STOREFRONT and depth < n):
+            tag, tag_domain = child.tag, child.tag_domain
+        node = child
+    return suffix_len, tag, tag_domain
+
+
+@lru_cache(maxsize=65536)
+def parse_host(host: str) -> HostParts:
+    """Split a hostname into subdomain / registrable domain / public suffix and classify platform hosting."""
+    h = (host or "").strip().strip(".").lower()
+    if h.startswith("[") and h.endswith("]"):
+        h = h[1:-1]
+    try:
+        ipaddress.ip_address(h)
+        return HostParts(host=h, subdomain="", registrable=h, suffix="", sld=h, is_ip=True)
+    except ValueError:
+        pass
+    labels = h.split(".") if h else []
+    if not labels:
+        return HostParts(host=h, subdomain="", registrable="", suffix="", sld="")
+    suffix_len, tag, tag_domain = _walk(_get_trie(), labels)
+    suffix_len = min(suffix_len, len(labels))
+    suffix = ".".join(labels[-suffix_len:])
+    if suffix_len >= len(labels):
+        # The host is itself a public suffix
+        return HostParts(host=h, subdomain="", registrable=h, suffix=suffix, sld=labels[0],
+                         platform_class=tag, platform=tag_domain)
+    reg_labels = labels[-(suffix_len + 1):]
+    return HostParts(
+        host=h,
+        subdomain=".".join(labels[:-(suffix_len + 1)]),
+        registrable=".".join(reg_labels),
+        suffix=suffix,
+        sld=reg_labels[0],
+        platform_class=tag,
+        platform=tag_domain,
+    )
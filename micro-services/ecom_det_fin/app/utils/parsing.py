@@ -1,8 +1,25 @@
-from urllib.parse import urlparse
+from urllib.parse import urlparse, parse_qsl, urlencode
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+_TRACKING_PARAMS = ("utm_", "fbclid", "gclid", "igshid", "mc_eid")
 
 def normalize_url(url: str) -> str:
-    p = urlparse(url)
-    scheme = p.scheme or "https"
-    netloc = p.netloc.lower()
+    # Cache/dedupe key: lower-cased scheme and host, default port, trailing slash,
+    # fragment and tracking parameters dropped, remaining query sorted
+    p = urlparse(url.strip())
+    scheme = (p.scheme or "https").lower()
+    netloc = (p.hostname or "").strip(".")
+    if p.port and p.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{p.port}"
     path = p.path.rstrip("/")
-    return f"{scheme}://{netloc}{path}"
+    params = sorted(
+        (k, v) for k, v in parse_qsl(p.query, keep_blank_values=True)
+        if not k.lower().startswith(_TRACKING_PARAMS)
+    )
+    query = f"?{urlencode(params)}" if params else ""
+    return f"{scheme}://{netloc}{path}{query}"
+
+def registrable_domain(host: str) -> str:
+    # eTLD+1 from the public suffix list (IP literals are returned unchanged)
+    from .host_parser import parse_host
+    return parse_host(host).registrable
@@ -0,0 +1,164 @@
+"""Compiled multi-pattern matcher for keyword heuristics.
+
+A PatternSet compiles a list of phrases (plus, optionally, a few regexes) into
+one regex. Phrases go into a character trie that is emitted as nested
+alternations, so the regex engine walks the trie at each text position and
+the cost per position is bounded by the longest phrase, not by the number of
+phrases. A space in a phrase matches any run of whitespace.
+
+`finditer` reports every occurrence with offsets, overlaps included: after a
+hit the search resumes one character later, and the shorter phrases sharing
+the hit's start are read off the trie. Python loops only over hits, never over
+the text itself.
+
+    URGENCY = PatternSet(["act now", "today only"], regexes=[r"only\\s*\\d+\\s*left"])
+    URGENCY.found(page_text)     # {"act now", r"only\\s*\\d+\\s*left"}
+"""
+from __future__ import annotations
+import re
+from typing import Dict, Iterable, Iterator, List, NamedTuple, Optional, Set, Tuple
+
+_END = ""  # trie key marking the end of a phrase
+
+
+class Match(NamedTuple):
+    pattern: str   # the phrase or regex as given
+    start: int
+    end: int
+
+
+def _normalize(phrase: str, ignore_case: bool) -> str:
+    phrase = " ".join(phrase.split())
+    return phrase.lower() if ignore_case else phrase
+
+
+def _trie_regex(node: dict) -> str:
+    branches = [(r"\s+" if ch == " " else re.escape(ch)) + _trie_regex(child)
+                for ch, child in sorted(node.items()) if ch != _END]
+    if not branches:
+        return ""
+    alternation = branches[0] if len(branches) == 1 else "(?:" + "|".join(branches) + ")"
+    # Greedy optional tail: the longest phrase wins, backtracking to shorter ones
+    return f"(?:{alternation})?" if _END in node else alternation
+
+
+class PatternSet:
+    """Phrases and regexes matched together in one pass over the text.
+
+    `word_boundary` requires matches not to be flanked by word characters
+    (unlike \\b this also works for phrases starting or ending in punctuation);
+    `ignore_case` folds case for phrases and regexes alike.
+    """
+
+    def __init__(self, phrases: Iterable[str] = (), regexes: Iterable[str] = (),
+                 word_boundary: bool = True, ignore_case: bool = True):
+        self.word_boundary = word_boundary
+        self.ignore_case = ignore_case
+        self._trie: dict = {}
+        # normalized phrase -> (length, phrase) of itself and every phrase that is a prefix of it
+        self._prefixes: Dict[str, List[Tuple[int, str]]] = {}
+        for phrase in phrases:
+            key = _normalize(phrase, ignore_case)
+            if not key:
+                continue
+            node = self._trie
+            for ch in key:
+                node = node.setdefault(ch, {})
+            node.setdefault(_END, phrase)
+        for key in self._walk(self._trie, ""):
+            self._prefixes[key] = [(i, self._lookup(key[:i])) for i in range(1, len(key) + 1) if self._lookup(key[:i])]
+        self.regexes = list(regexes)
+
+        flags = re.IGNORECASE if ignore_case else 0
+        left, right = (r"(?<!\w)", r"(?!\w)") if word_boundary else ("", "")
+        self._literal = re.compile(f"{left}{_trie_regex(self._trie)}{right}", flags) if self._trie else None
+        self._regexes = [re.compile(f"{left}(?:{r}){right}", flags) for r in self.regexes]
+        parts = ([self._literal.pattern] if self._literal else []) + [p.pattern for p in self._regexes]
+        self._any = re.compile("|".join(f"(?:{p})" for p in parts), flags) if parts else None
+
+    def __len__(self) -> int:
+        return len(self._prefixes) + len(self.regexes)
+
+    def _walk(self, node: dict, prefix: str) -> Iterator[str]:
+        for ch, child in node.items():
+            if ch == _END:
+                yield prefix
+            else:
+                yield from self._walk(child, prefix + ch)
+
+    def _lookup(self, key: str) -> Optional[str]:
+        node = self._trie
+        for ch in key:
+            node = node.get(ch)
+            if node is None:
+                return None
+        return node.get(_END)
+
+    def _boundary_at(self, text: str, i: int) -> bool:
+        return not self.word_boundary or i == len(text) or not (text[i].isalnum() or text[i] == "_")
+
+    def _phrases_at(self, text: str, start: int, end: int) -> Iterator[Match]:
+        """Phrases starting at `start` and ending by `end` (the longest literal match there)."""
+        matched = text[start:end]
+        key = _normalize(matched, self.ignore_case)
+        prefixes = self._prefixes.get(key) if len(key) == len(matched) else None
+        if prefixes is not None:
+            # Single spaces only: offsets in the key are offsets in the text
+            for length, phrase in prefixes:
+                if self._boundary_at(text, start + length):
+                    yield Match(phrase, start, start + length)
+            return
+        node, i = self._trie, start
+        while i < end:
+            ch = text[i]
+            if ch.isspace():
+                while i < end and text[i].isspace():
+                    i += 1
+                ch = " "
+            else:
+                i += 1
+                if self.ignore_case:
+                    ch = ch.lower()
+            node = node.get(ch)
+            if node is None:
+                return
+            if _END in node and self._boundary_at(text, i):
+                yield Match(node[_END], start, i)
+
+    def finditer(self, text: str) -> Iterator[Match]:
+        """Every phrase and regex occurrence in `text`, by start offset (overlapping matches included)."""
+        if self._any is None or not text:
+            return
+        pos = 0
+        while True:
+            hit = self._any.search(text, pos)
+            if hit is None:
+                return
+            start = hit.start()
+            if self._literal is not None:
+                # Without regexes the hit is the longest literal match itself
+                longest = self._literal.match(text, start) if self._regexes else hit
+                if longest is not None:
+                    yield from self._phrases_at(text, start, longest.end())
+            for pattern, compiled in zip(self.regexes, self._regexes):
+                m = compiled.match(text, start)
+                if m is not None:
+                    yield Match(pattern, start, m.end())
+            pos = start + 1
+
+    def findall(self, text: str) -> List[Match]:
+        return list(self.finditer(text))
+
+    def search(self, text: str) -> Optional[Match]:
+        """The first occurrence, without scanning past it."""
+        return next(self.finditer(text), None)
+
+    def found(self, text: str) -> Set[str]:
+        """Distinct phrases and regexes occurring in `text`."""
+        return {m.pattern for m in self.finditer(text)}
+
+    def counts(self, text: str) -> Dict[str, int]:
+        counts: Dict[str, int] = {}
+        for m in self.finditer(text):
+            counts[m.pattern] = counts.get(m.pattern, 0) + 1
+        return counts
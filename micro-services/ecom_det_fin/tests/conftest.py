@@ -0,0 +1,70 @@
+import asyncio
+from types import SimpleNamespace
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.pool import StaticPool
+from sqlmodel import SQLModel, Session, create_engine
+from app.db import get_session
+from app.main import app
+from app.routers import site
+from app.services import layer_cache, registry
+from app.services.latency import LatencyTracker
+from app.services.layers.content_ux import LayerResult
+from app.services.scoring import Reason
+from app.services.ttl_cache import TTLCache
+
+
+@pytest.fixture
+def client(monkeypatch):
+    engine = create_engine("sqlite://", connect_args={"check_same_thread": False}, poolclass=StaticPool)
+    SQLModel.metadata.create_all(engine)
+    calls = []
+
+    async def fake_evaluate_all(url, session=None, mode="standard"):
+        calls.append(url)
+        return 20.0, [Reason(layer="domain_infra", message="ok", weight=0.25, score=20.0)]
+
+    def session_override():
+        with Session(engine) as session:
+            yield session
+
+    monkeypatch.setattr(site, "evaluate_all", fake_evaluate_all)
+    monkeypatch.setattr(site, "engine", engine)
+    app.dependency_overrides[get_session] = session_override
+    # No context manager: startup would run init_db() against the real database
+    test_client = TestClient(app)
+    test_client.engine, test_client.calls = engine, calls
+    yield test_client
+    app.dependency_overrides.clear()
+
+
+@pytest.fixture
+def layers(monkeypatch):
+    """Replace every layer with a stub; `ran` collects the layers that actually started."""
+    ran = set()
+
+    def stub(name, score, message, delay=0.0):
+        async def analyze(url, **inputs):
+            ran.add(name)
+            await asyncio.sleep(delay)
+            return LayerResult(score=score, message=message)
+        return analyze
+
+    async def no_input(*args):
+        return None
+
+    # Fresh latency history so stub timings never shrink the timeouts other tests rely on
+    monkeypatch.setattr(registry, "layer_latency", LatencyTracker())
+    monkeypatch.setattr(layer_cache, "layer_results", TTLCache("layer"))
+    monkeypatch.setattr(registry.page_snapshot, "fetch_snapshot", no_input)
+    monkeypatch.setattr(registry.rdap_client, "lookup", no_input)
+    monkeypatch.setattr(registry.dns_resolver, "lookup", no_input)
+    monkeypatch.setattr(registry.tls_utils, "fetch_tls_info", no_input)
+    monkeypatch.setattr(registry.li_content, "analyze", stub("content_ux", 0.0, "ok"))
+    monkeypatch.setattr(registry.li_business, "analyze", stub("business_verification", 0.0, "ok"))
+    monkeypatch.setattr(registry.li_technical, "analyze", stub("technical_verification", 0.0, "ok"))
+    monkeypatch.setattr(registry.li_merchant, "analyze", stub("merchant_verification", 0.0, "ok"))
+    monkeypatch.setattr(registry.li_visual, "analyze", stub("visual_brand", 5.0, "stub"))
+    monkeypatch.setattr(registry.li_threat, "analyze", stub("threat_intel", 0.0, "clean"))
+    monkeypatch.setattr(registry.li_crawl, "analyze", stub("site_crawl", 0.0, "ok"))
+    return SimpleNamespace(ran=ran, stub=stub)
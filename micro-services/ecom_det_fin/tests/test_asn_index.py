@@ -0,0 +1,63 @@
+import ipaddress
+import random
+from app.services.asn_index import AsnIndex, build_index
+
+SOURCE = """# prefix<TAB>asn
+104.16.0.0/13\t13335\tCLOUDFLARENET
+104.16.0.0/16\t64500
+52.0.0.0/10\t16509\tAMAZON-02
+10.0.0.0/8\t64501
+2606:4700::/32\t13335
+2a05:d000::/25\t16509
+"""
+
+IP2ASN = "1.0.0.0\t1.0.0.255\t13335\tUS\tCLOUDFLARENET\n1.0.1.0\t1.0.3.255\t0\tNone\tNot routed\n"
+
+
+def test_longest_prefix_match(tmp_path):
+    path = tmp_path / "asn.idx"
+    assert build_index(SOURCE.splitlines(), path) == 6
+    index = AsnIndex(path)
+    try:
+        assert index.lookup("104.17.2.3").asn == 13335
+        assert index.lookup("104.17.2.3").name == "CLOUDFLARENET"
+        assert index.lookup("104.16.9.9").asn == 64500  # more specific wins
+        assert index.lookup("52.1.2.3").prefix == "52.0.0.0/10"
+        assert index.lookup("52.64.0.1") is None
+        assert index.lookup("2606:4700:10::6816:1").asn == 13335
+        assert index.lookup("::ffff:10.1.2.3").asn == 64501
+        assert index.lookup("not-an-ip") is None
+    finally:
+        index.close()
+
+
+def test_ip2asn_ranges(tmp_path):
+    path = tmp_path / "asn.idx"
+    build_index(IP2ASN.splitlines(), path)
+    index = AsnIndex(path)
+    try:
+        assert index.lookup("1.0.0.7").asn == 13335
+        assert index.lookup("1.0.2.1") is None
+    finally:
+        index.close()
+
+
+def test_matches_linear_scan(tmp_path):
+    rng = random.Random(7)
+    nets = {}
+    for _ in range(300):
+        length = rng.randint(8, 28)
+        net = ipaddress.ip_network(f"{ipaddress.IPv4Address(rng.getrandbits(32))}/{length}", strict=False)
+        nets[net] = rng.randint(1, 65000)
+    path = tmp_path / "asn.idx"
+    build_index([f"{net}\t{asn}" for net, asn in nets.items()], path)
+    index = AsnIndex(path)
+    try:
+        for _ in range(500):
+            ip = ipaddress.IPv4Address(rng.getrandbits(32))
+            covering = [n for n in nets if ip in n]
+            expected = nets[max(covering, key=lambda n: n.prefixlen)] if covering else None
+            match = index.lookup(str(ip))
+            assert (match.asn if match else None) == expected
+    finally:
+        index.close()
@@ -0,0 +1,46 @@
+import random
+import string
+from app.services.brand_index import BrandIndex, osa_distance
+from app.services.layers import domain_infra
+
+BRANDS = {"amazon": ["amazon.com"], "flipkart": ["flipkart.com"], "hdfcbank": ["hdfcbank.com"], "ebay": ["ebay.com"]}
+
+
+def test_osa_distance():
+    assert osa_distance("amazon", "amazon", 2) == 0
+    assert osa_distance("amzaon", "amazon", 2) == 1  # transposition counts once
+    assert osa_distance("amzn", "amazon", 2) == 2
+    assert osa_distance("azn", "amazon", 2) == 3  # beyond the limit
+
+
+def test_lookup_nearest_first(tmp_path):
+    index = BrandIndex.build(BRANDS, max_distance=2)
+    assert [(m.brand, m.distance) for m in index.lookup("amaz0n")] == [("amazon", 1)]
+    assert index.lookup("flipkrt")[0].brand == "flipkart"
+    assert index.lookup("hdfcbnk")[0].distance == 1
+    assert index.lookup("totallyunrelated") == []
+    assert index.lookup("ebya", max_distance=0) == []
+
+    path = tmp_path / "brands.npz"
+    index.save(path)
+    loaded = BrandIndex.load(path)
+    assert loaded.lookup("amzaon") == index.lookup("amzaon")
+    assert loaded.canonical["hdfcbank"] == ["hdfcbank.com"]
+
+
+def test_lookup_matches_brute_force():
+    rng = random.Random(3)
+    labels = {"".join(rng.choices(string.ascii_lowercase, k=rng.randint(4, 10))) for _ in range(2000)}
+    index = BrandIndex.build({label: [] for label in labels}, max_distance=2)
+    for label in rng.sample(sorted(labels), 50):
+        chars = list(label)
+        chars[rng.randrange(len(chars))] = rng.choice(string.ascii_lowercase)
+        query = "".join(chars)
+        expected = sorted(l for l in labels if osa_distance(query, l, 2) <= 2)
+        assert sorted(m.label for m in index.lookup(query)) == expected
+
+
+def test_domain_layer_uses_index():
+    result = domain_infra.analyze("https://amazom.shop/")
+    assert "'amazom' ~ 'amazon'" in result.message
+    assert domain_infra.analyze("https://amazon.com/").score == 0.0
@@ -0,0 +1,44 @@
+import json
+from sqlmodel import Session, select
+from app.models.tables import SiteScan
+from app.routers import site
+
+
+def _lines(response):
+    return [json.loads(line) for line in response.text.splitlines() if line]
+
+
+def test_bulk_json_dedupes_and_streams(client):
+    urls = [
+        "https://shop.example.com/",
+        "https://SHOP.example.com/?utm_source=feed",
+        "https://other.example.org/item?id=2",
+        "not a url",
+    ]
+    response = client.post("/api/check-sites", json={"urls": urls})
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = _lines(response)
+    assert len(lines) == 3
+    by_url = {line["url"]: line for line in lines}
+    assert by_url["not a url"]["error"] == "Invalid URL"
+    assert by_url["https://shop.example.com/"]["risk_score"] == 20.0
+    assert sorted(client.calls) == ["https://other.example.org/item?id=2", "https://shop.example.com/"]
+    with Session(client.engine) as session:
+        assert len(session.exec(select(SiteScan)).all()) == 2
+
+
+def test_bulk_csv_upload_reuses_fresh_scans(client):
+    client.post("/api/check-site", json={"url": "https://shop.example.com/"})
+    csv_body = "url,partner\nhttps://shop.example.com,a\nhttps://new.example.net,b\n"
+    response = client.post("/api/check-sites", files={"file": ("feed.csv", csv_body, "text/csv")})
+    lines = _lines(response)
+    assert {line["normalized_url"] for line in lines} == {"https://shop.example.com", "https://new.example.net"}
+    cached = next(line for line in lines if line["normalized_url"] == "https://shop.example.com")
+    assert cached["cached"] is True
+    assert client.calls == ["https://shop.example.com/", "https://new.example.net"]
+
+
+def test_bulk_rejects_oversized_batches(client, monkeypatch):
+    monkeypatch.setattr(site.settings, "bulk_max_urls", 1)
+    response = client.post("/api/check-sites", json=["https://a.example.com", "https://b.example.com"])
+    assert response.status_code == 413
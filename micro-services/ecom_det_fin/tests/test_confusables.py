@@ -0,0 +1,27 @@
+from app.services.confusables import decode_label, load_table, skeleton, DEFAULT_PATH
+from app.services.layers import domain_infra
+
+
+def test_shipped_table_parses():
+    table = load_table(DEFAULT_PATH)
+    assert table[0x0430] == "a"  # CYRILLIC SMALL LETTER A
+    assert table[0xFF47] == "g"  # FULLWIDTH LATIN SMALL LETTER G
+
+
+def test_skeleton():
+    assert skeleton("аррӏе") == "apple"
+    assert skeleton("ＰayPal") == "paypal"
+    assert skeleton("bücher") != "bucher"  # diacritics are not confusables
+
+
+def test_decode_label():
+    assert decode_label("xn--80ak6aa92e") == "аррӏе"
+    assert decode_label("xn--invalid-!") == "xn--invalid-!"
+    assert decode_label("example") == "example"
+
+
+def test_domain_layer_flags_homograph():
+    result = domain_infra.analyze("https://xn--80ak6aa92e.com/")
+    assert "homograph" in result.message and "'apple'" in result.message
+    plain_idn = domain_infra.analyze("https://xn--bcher-kva.de/")
+    assert "IDN/punycode domain" in plain_idn.message and "homograph" not in plain_idn.message
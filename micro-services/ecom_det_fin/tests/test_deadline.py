@@ -0,0 +1,61 @@
+import asyncio
+from sqlmodel import Session, select
+from app.models.tables import SiteScan
+from app.services import registry, scoring
+
+
+def test_deadline_returns_provisional_result_and_completes_later(layers, monkeypatch):
+    monkeypatch.setattr(registry.li_threat, "analyze", layers.stub("threat_intel", 80.0, "listed", delay=0.3))
+
+    async def run():
+        result = await scoring.evaluate("https://example.com/", deadline=0.1)
+        return result, await result.completion
+
+    provisional, final = asyncio.run(run())
+    assert provisional.provisional and provisional.pending_layers == ["threat_intel"]
+    pending = [r for r in provisional.reasons if r.status == "pending"]
+    assert [r.layer for r in pending] == ["threat_intel"] and pending[0].score == 0.0
+    # An unfinished layer rules out Verified Safe
+    assert provisional.badge != "Verified Safe"
+    assert not final.provisional and final.score > provisional.score
+
+
+def test_background_work_stops_at_the_budget(layers, monkeypatch):
+    monkeypatch.setattr(registry.settings, "scan_background_budget", 0.1)
+    monkeypatch.setattr(registry.li_threat, "analyze", layers.stub("threat_intel", 0.0, "clean", delay=30))
+
+    async def run():
+        result = await scoring.evaluate("https://example.com/", deadline=0.05)
+        return await asyncio.wait_for(result.completion, timeout=5)
+
+    final = asyncio.run(run())
+    threat = next(r for r in final.reasons if r.layer == "threat_intel")
+    assert threat.status == "timeout"
+    # Cut short by the scan's stop time, not slow on its own: no latency sample
+    assert "threat_intel" not in registry.layer_latency.stats()
+
+
+def test_no_deadline_waits_for_everything(layers, monkeypatch):
+    monkeypatch.setattr(registry.li_threat, "analyze", layers.stub("threat_intel", 0.0, "clean", delay=0.05))
+    result = asyncio.run(scoring.evaluate("https://example.com/"))
+    assert not result.provisional and result.completion is None
+
+
+def test_check_site_answers_by_deadline_then_updates_scan(client, layers, monkeypatch):
+    monkeypatch.setattr(registry.li_threat, "analyze", layers.stub("threat_intel", 80.0, "listed", delay=0.3))
+    resp = client.post("/api/check-site", json={"url": "https://shop.example.com/"}, headers={"X-Deadline-Ms": "100"})
+    body = resp.json()
+    assert resp.status_code == 200
+    assert body["provisional"] is True and body["pending_layers"] == ["threat_intel"]
+    # The TestClient runs background tasks before returning: the stored scan is already complete
+    with Session(client.engine) as session:
+        scan = session.exec(select(SiteScan)).one()
+        assert '"pending"' not in scan.reasons_json and scan.risk_score > body["risk_score"]
+
+    cached = client.post("/api/check-site", json={"url": "https://shop.example.com/"}).json()
+    assert cached["cached"] is True and cached["provisional"] is False
+
+
+def test_check_site_rejects_invalid_deadline(client):
+    resp = client.post("/api/check-site", json={"url": "https://shop.example.com/"}, params={"deadline_ms": 0})
+    assert resp.status_code == 422
@@ -0,0 +1,63 @@
+import asyncio
+import socket
+import threading
+import dns.message
+import dns.rcode
+import dns.rrset
+from app.config import settings
+from app.services import dns_resolver
+from app.services.ttl_cache import TTLCache
+
+ZONE = {
+    ("shop.example.com.", "A"): ["203.0.113.7"],
+    ("example.com.", "MX"): ["10 mail.example.com."],
+    ("example.com.", "NS"): ["ns1.example.com."],
+}
+
+
+def _serve(sock: socket.socket, queries: list) -> None:
+    while True:
+        try:
+            wire, addr = sock.recvfrom(4096)
+        except OSError:
+            return
+        query = dns.message.from_wire(wire)
+        question = query.question[0]
+        name, rdtype = question.name.to_text(), dns.rdatatype.to_text(question.rdtype)
+        queries.append((name, rdtype))
+        response = dns.message.make_response(query)
+        answers = ZONE.get((name, rdtype))
+        if answers:
+            response.answer.append(dns.rrset.from_text_list(name, 300, "IN", rdtype, answers))
+        elif not any(n == name for n, _ in ZONE):
+            response.set_rcode(dns.rcode.NXDOMAIN)
+        sock.sendto(response.to_wire(), addr)
+
+
+def test_lookup_against_stub_server(monkeypatch):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.bind(("127.0.0.1", 0))
+    queries: list = []
+    threading.Thread(target=_serve, args=(sock, queries), daemon=True).start()
+    monkeypatch.setattr(settings, "dns_upstream", f"127.0.0.1:{sock.getsockname()[1]}")
+    monkeypatch.setattr(dns_resolver, "dns_cache", TTLCache("dns-test"))
+    try:
+        info = asyncio.run(dns_resolver.lookup("shop.example.com"))
+        assert info.a == ["203.0.113.7"] and info.aaaa == []
+        assert info.mx == ["mail.example.com"] and info.ns == ["ns1.example.com"]
+        assert not info.failed
+
+        # Second lookup is answered from the cache
+        seen = len(queries)
+        again = asyncio.run(dns_resolver.lookup("shop.example.com"))
+        assert again.addresses == ["203.0.113.7"] and len(queries) == seen
+
+        missing = asyncio.run(dns_resolver.lookup("nope.invalid"))
+        assert missing.addresses == [] and not missing.failed
+    finally:
+        sock.close()
+
+
+def test_ip_literal_skips_dns():
+    info = asyncio.run(dns_resolver.lookup("192.0.2.1"))
+    assert info.addresses == ["192.0.2.1"] and info.mx == []
@@ -0,0 +1,34 @@
+import asyncio
+from app.services import registry, scoring
+
+
+def test_typosquat_skips_every_async_layer(layers):
+    result = asyncio.run(scoring.evaluate("https://amazom.com/"))
+    assert result.badge == "Critical"
+    assert not layers.ran
+    assert "content_ux" in result.skipped_layers and "domain_infra" not in result.skipped_layers
+    skipped = [r for r in result.reasons if r.skipped]
+    assert skipped and all(r.score == 0.0 for r in skipped)
+
+
+def test_slow_layers_cancelled_once_badge_is_settled(layers, monkeypatch):
+    # Four core layers failing trigger the suspicion bonus: Critical whatever the rest report
+    for name, module in [("content_ux", registry.li_content), ("business_verification", registry.li_business),
+                         ("technical_verification", registry.li_technical), ("merchant_verification", registry.li_merchant)]:
+        monkeypatch.setattr(module, "analyze", layers.stub(name, 100.0, "could not fetch page"))
+    monkeypatch.setattr(registry.li_threat, "analyze", layers.stub("threat_intel", 0.0, "clean", delay=30))
+
+    async def run():
+        return await asyncio.wait_for(scoring.evaluate("https://example.com/"), timeout=5)
+
+    result = asyncio.run(run())
+    assert result.badge == "Critical"
+    assert "threat_intel" in result.skipped_layers and "merchant_verification" not in result.skipped_layers
+
+
+def test_unclear_case_waits_for_all_layers(layers):
+    result = asyncio.run(scoring.evaluate("https://example.com/"))
+    assert result.skipped_layers == []
+    assert not any(r.skipped for r in result.reasons)
+    score, reasons = asyncio.run(scoring.evaluate_all("https://example.com/"))
+    assert score == result.score and len(reasons) == 8
@@ -0,0 +1,37 @@
+import pytest
+from app.utils.host_parser import PLATFORM, STOREFRONT, parse_host
+from app.utils.parsing import registrable_domain
+from app.services.risk_rules import _host_tokens
+
+
+@pytest.mark.parametrize("host,subdomain,registrable,suffix", [
+    ("www.amazon.co.uk", "www", "amazon.co.uk", "co.uk"),
+    ("shop.example.com.au", "shop", "example.com.au", "com.au"),
+    ("a.b.c.example.com", "a.b.c", "example.com", "com"),
+    ("example.unknowntld", "", "example.unknowntld", "unknowntld"),  # implicit "*" rule
+    ("x.y.ck", "", "x.y.ck", "y.ck"),                                # wildcard
+    ("www.ck", "", "www.ck", "ck"),                                  # exception
+    ("WWW.Example.COM.", "www", "example.com", "com"),
+])
+def test_registrable_domain(host, subdomain, registrable, suffix):
+    parts = parse_host(host)
+    assert (parts.subdomain, parts.registrable, parts.suffix) == (subdomain, registrable, suffix)
+    assert registrable_domain(host) == registrable
+
+
+def test_ip_literals():
+    parts = parse_host("203.0.113.9")
+    assert parts.is_ip and parts.registrable == "203.0.113.9" and parts.suffix == ""
+
+
+def test_platform_classes():
+    store = parse_host("cool-shoes.myshopify.com")
+    assert store.platform_class == STOREFRONT and store.platform == "myshopify.com"
+    assert store.registrable == "myshopify.com"  # private PSL rules don't split shops for WHOIS/DNS
+    assert parse_host("admin.shopify.com").platform_class == PLATFORM
+    assert parse_host("notshopify.com").platform_class is None
+    assert parse_host("myshopify.com").platform_class is None
+
+
+def test_host_tokens_skip_public_suffix():
+    assert _host_tokens("secure-login.paypal.co.uk") == {"secure", "login", "paypal"}
@@ -0,0 +1,49 @@
+import asyncio
+import pytest
+from app.services import registry, scoring
+from app.services.latency import LatencyHistogram, LatencyTracker
+from app.services.risk_rules import apply_safety_gates
+
+
+def test_histogram_percentiles_follow_the_window():
+    hist = LatencyHistogram(window=100)
+    for i in range(100):
+        hist.add(0.1 if i < 90 else 2.0)
+    assert 0.1 <= hist.percentile(50) < 0.12
+    assert 2.0 <= hist.percentile(95) < 2.3
+    for _ in range(100):
+        hist.add(0.5)  # the slow samples age out
+    assert len(hist) == 100 and 0.5 <= hist.percentile(99) < 0.57
+
+
+def test_timeout_uses_default_until_warm_then_clamps(monkeypatch):
+    monkeypatch.setattr(registry.settings, "layer_latency_min_samples", 10)
+    tracker = LatencyTracker()
+    for _ in range(9):
+        tracker.record("content_ux", 0.2)
+    assert tracker.timeout("content_ux", 8.0) == 8.0
+    tracker.record("content_ux", 0.2)
+    assert tracker.timeout("content_ux", 8.0) == registry.settings.layer_timeout_min
+    for _ in range(50):
+        tracker.record("content_ux", 60.0)
+    assert tracker.timeout("content_ux", 8.0) == registry.settings.layer_timeout_max
+    assert tracker.timeout("domain_infra", None) is None
+
+
+def test_timeouts_are_not_failures(layers, monkeypatch):
+    async def slow(url, **inputs):
+        await asyncio.sleep(5)
+
+    monkeypatch.setattr(registry.li_content, "analyze", slow)
+    monkeypatch.setattr(registry.layer_latency, "timeout", lambda name, default: 0.05 if name == "content_ux" else default)
+    result = asyncio.run(scoring.evaluate("https://example.com/"))
+    content = next(r for r in result.reasons if r.layer == "content_ux")
+    assert content.status == "timeout" and content.message == "content_ux timed out"
+
+
+@pytest.mark.parametrize("status,badge", [("timeout", "Low Risk"), ("error", "Caution"), (None, "Caution")])
+def test_gates_tell_timeouts_from_failures(status, badge):
+    reason = {"layer": "content_ux", "message": "content_ux timed out", "weight": 0.1, "score": 15.0}
+    if status:
+        reason["status"] = status
+    assert apply_safety_gates("https://example.com/", [reason], 10.0)[1] == badge
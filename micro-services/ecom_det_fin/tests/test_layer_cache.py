@@ -0,0 +1,69 @@
+import asyncio
+import time
+import pytest
+from app.services import layer_cache, registry, scoring
+from app.services.ttl_cache import TTLCache
+
+
+def _reason(result, layer):
+    return next(r for r in result.reasons if r.layer == layer)
+
+
+def test_second_scan_only_runs_uncached_layers(layers):
+    first = asyncio.run(scoring.evaluate("https://shop.example.com/item"))
+    assert all(r.cache_age_seconds is None for r in first.reasons)
+    layers.ran.clear()
+
+    second = asyncio.run(scoring.evaluate("https://shop.example.com/item"))
+    # visual_brand has no TTL; every other stubbed layer comes from the cache
+    assert layers.ran == {"visual_brand"}
+    assert _reason(second, "threat_intel").cache_age_seconds >= 0
+    assert _reason(second, "visual_brand").cache_age_seconds is None
+    assert second.score == first.score and second.badge == first.badge
+
+
+def test_host_scoped_layers_are_shared_across_paths(layers):
+    asyncio.run(scoring.evaluate("https://shop.example.com/a"))
+    layers.ran.clear()
+    asyncio.run(scoring.evaluate("https://shop.example.com/b"))
+    assert "technical_verification" not in layers.ran
+    assert {"content_ux", "threat_intel"} <= layers.ran
+
+
+def test_failures_and_timeouts_are_not_cached(layers, monkeypatch):
+    monkeypatch.setattr(registry.li_content, "analyze", layers.stub("content_ux", 60.0, "could not fetch page"))
+    asyncio.run(scoring.evaluate("https://example.com/"))
+    layers.ran.clear()
+    asyncio.run(scoring.evaluate("https://example.com/"))
+    assert "content_ux" in layers.ran and "merchant_verification" not in layers.ran
+
+
+def test_expired_entries_and_ttl_overrides(layers, monkeypatch):
+    monkeypatch.setattr(registry.settings, "layer_cache_ttls_json", '{"threat_intel": 0.05, "merchant_verification": 0}')
+    asyncio.run(scoring.evaluate("https://example.com/"))
+    time.sleep(0.1)
+    layers.ran.clear()
+    asyncio.run(scoring.evaluate("https://example.com/"))
+    assert layers.ran == {"visual_brand", "threat_intel", "merchant_verification"}
+
+
+def test_version_bump_invalidates(layers):
+    spec = next(s for s in registry.layers() if s.name == "content_ux")
+    assert layer_cache.cache_key(spec, "https://Example.com/?utm_source=x") == "content_ux:v1:https://example.com"
+    bumped = registry.LayerSpec(**{**spec.__dict__, "version": 2})
+    assert layer_cache.cache_key(bumped, "https://example.com/") != layer_cache.cache_key(spec, "https://example.com/")
+
+
+def test_sqlite_backend_survives_restart(tmp_path, layers, monkeypatch):
+    db = str(tmp_path / "layers.db")
+    monkeypatch.setattr(layer_cache, "layer_results", TTLCache("layer", db_path=db))
+    asyncio.run(scoring.evaluate("https://example.com/"))
+    monkeypatch.setattr(layer_cache, "layer_results", TTLCache("layer", db_path=db))
+    layers.ran.clear()
+    result = asyncio.run(scoring.evaluate("https://example.com/"))
+    assert layers.ran == {"visual_brand"} and _reason(result, "domain_infra").cache_age_seconds is not None
+
+
+def test_session_layers_cannot_be_cached():
+    with pytest.raises(ValueError):
+        registry.register_layer(registry.LayerSpec("bad", lambda url, session: None, weight=0.0, inputs=("session",), ttl=60))
@@ -0,0 +1,52 @@
+import asyncio
+from bs4 import BeautifulSoup
+from app.services.layers import business_verification, content_ux, site_crawl
+from app.services.page_features import Form, extract_features
+from app.services.page_snapshot import PageSnapshot
+
+PAGE = """<?xml version="1.0" encoding="utf-8"?><!DOCTYPE html>
+<html><head><title> Acme  Store </title>
+<meta name="description" content="Shoes"><meta property="og:see_also" content="https://instagram.com/acme">
+<script src="/app.js"></script><script>var stock = "only 2 left";</script><style>.sale{}</style>
+<script type="application/ld+json">{"@type": "Organization", "sameAs": ["https://facebook.com/acme"]}</script>
+<script type="application/ld+json">{not json</script></head>
+<body><!-- banner -->Welcome<p>Only <b>3</b> left! Call +1 (555) 123-4567 or write to sales@acme.example</p>
+<template><p>hidden template</p></template>café
+<a href="mailto:help@acme.example?subject=hi">Mail us</a> <a href="tel:+44 20 7946 0018">Call</a>
+<a href=" /pages/refund-policy ">Refund <span>policy</span></a>
+<form action="/login" method="POST"><input type="Email"><input name="p" type="password"></form></body></html>"""
+
+
+def test_one_record_for_the_whole_page():
+    f = extract_features(PAGE.encode(), "utf-8")
+    assert f.title == "Acme Store"
+    assert f.links == [("mailto:help@acme.example?subject=hi", "Mail us"), ("tel:+44 20 7946 0018", "Call"),
+                       ("/pages/refund-policy", "Refund policy")]
+    assert f.meta == [{"name": "description", "content": "Shoes"},
+                      {"property": "og:see_also", "content": "https://instagram.com/acme"}]
+    assert f.json_ld == [{"@type": "Organization", "sameAs": ["https://facebook.com/acme"]}]
+    assert f.forms == [Form(action="/login", method="post", inputs=["email", "password"])]
+    assert f.scripts == ["/app.js"] and f.inline_scripts == 1
+    assert f.emails == ["sales@acme.example", "help@acme.example"]
+    assert f.phones == ["+15551234567", "+442079460018"]
+
+
+def test_visible_text_matches_beautifulsoup():
+    f = extract_features(PAGE)
+    assert f.text == BeautifulSoup(PAGE, "lxml").get_text(" ", strip=True)
+    assert "only 2 left" not in f.text and "hidden template" not in f.text and "banner" not in f.text
+
+
+def test_empty_and_undecodable_input():
+    assert extract_features(b"").text == "" and extract_features(b"  \n").links == []
+    assert extract_features("<p>caf\xe9</p>".encode("latin-1"), "latin-1").text == "café"
+    assert extract_features(b"<p>\xff ok</p>").text == "� ok"
+
+
+def test_layers_read_the_snapshot_record():
+    snapshot = PageSnapshot(url="https://acme.example/", final_url="https://acme.example/", status_code=200,
+                            headers={"content-type": "text/html"}, content=PAGE.encode(), encoding="utf-8")
+    assert site_crawl.policy_links("https://acme.example/", snapshot, 5) == ["https://acme.example/pages/refund-policy"]
+    info = asyncio.run(business_verification._extract_business_info(snapshot.features))
+    assert info["has_email"] and not info["social_links"]
+    assert content_ux._check_fake_urgency(snapshot.features.text)[0] == 10
@@ -0,0 +1,61 @@
+import asyncio
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+import pytest
+from app.services import page_snapshot
+from app.services.latency import LatencyTracker
+
+STALL = 1.0
+
+
+class _StallFirst(BaseHTTPRequestHandler):
+    hits = 0
+
+    def do_GET(self):
+        type(self).hits += 1
+        if type(self).hits == 1:
+            time.sleep(STALL)  # overloaded host: the first request hangs before any headers
+        body = b"<html><title>ok</title></html>"
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def stalling_site(monkeypatch):
+    _StallFirst.hits = 0
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StallFirst)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    tracker = LatencyTracker()
+    for _ in range(50):
+        tracker.record("headers", 0.02)  # usual time to headers
+    monkeypatch.setattr(page_snapshot, "fetch_latency", tracker)
+    monkeypatch.setattr(page_snapshot, "hedge_budget", page_snapshot._HedgeBudget())
+    monkeypatch.setattr(page_snapshot.settings, "page_hedge_enabled", True)
+    yield f"http://127.0.0.1:{server.server_address[1]}/"
+    server.shutdown()
+
+
+def _timed_fetch(url):
+    started = time.monotonic()
+    snap = asyncio.run(page_snapshot.fetch_snapshot(url))
+    return snap, time.monotonic() - started
+
+
+def test_hedge_beats_stalled_first_attempt(stalling_site):
+    page_snapshot.hedge_budget.requests = 100
+    snap, elapsed = _timed_fetch(stalling_site)
+    assert snap.fetched and snap.is_html and elapsed < STALL / 2
+    assert page_snapshot.hedge_budget.hedges == 1 and page_snapshot.hedge_budget.wins == 1
+
+
+def test_no_hedge_without_budget(stalling_site):
+    snap, elapsed = _timed_fetch(stalling_site)  # first fetch: 1 * 5% < one hedge
+    assert snap.fetched and elapsed >= STALL
+    assert page_snapshot.hedge_budget.hedges == 0 and _StallFirst.hits == 1
@@ -0,0 +1,71 @@
+import asyncio
+from concurrent.futures.process import BrokenProcessPool
+from app.config import settings
+from app.services.page_features import extract_features
+from app.services.parse_pool import ParsePool
+
+PAGE = ("<html><head><title>Acme</title></head><body>"
+        + "".join(f'<p>Item {i}, only 3 left <a href="/p/{i}">view</a> sales@acme.example</p>' for i in range(200))
+        + "</body></html>").encode()
+
+
+def test_small_pages_parse_inline():
+    pool = ParsePool()
+    features = asyncio.run(pool.extract(PAGE, "utf-8"))
+    assert features == extract_features(PAGE, "utf-8")
+    stats = pool.stats()
+    assert stats["inline"] == 1 and stats["offloaded"] == 0 and "inline" in stats["latency"]
+    assert pool._executor is None
+
+
+def test_large_pages_parse_in_a_worker(monkeypatch):
+    monkeypatch.setattr(settings, "parse_inline_max_bytes", 1024)
+    pool = ParsePool()
+
+    async def run():
+        return await asyncio.gather(*(pool.extract(PAGE, "utf-8") for _ in range(3)))
+
+    try:
+        results = asyncio.run(run())
+    finally:
+        pool.shutdown()
+    assert all(r == extract_features(PAGE, "utf-8") for r in results)
+    stats = pool.stats()
+    assert stats["offloaded"] == 3 and stats["in_flight"] == 0 and stats["queue_depth"] == 0
+    assert stats["latency"]["pool"]["samples"] == 3
+
+
+def test_no_workers_means_inline(monkeypatch):
+    monkeypatch.setattr(settings, "parse_pool_workers", 0)
+    monkeypatch.setattr(settings, "parse_inline_max_bytes", 1)
+    pool = ParsePool()
+    asyncio.run(pool.extract(PAGE))
+    assert pool.stats()["inline"] == 1 and pool._executor is None
+
+
+class _BrokenExecutor:
+    def submit(self, *args):
+        raise BrokenProcessPool("worker died")
+
+    def shutdown(self, wait=True, cancel_futures=False):
+        self.shut = True
+
+
+def test_broken_pool_falls_back_inline_without_touching_its_replacement(monkeypatch):
+    monkeypatch.setattr(settings, "parse_inline_max_bytes", 1)
+    pool = ParsePool()
+    broken, replacement = _BrokenExecutor(), _BrokenExecutor()
+    pool._executor = broken
+
+    async def run():
+        # Another request has already swapped in a fresh pool by the time this one fails
+        pool._executor = replacement
+        return await pool.extract(PAGE, "utf-8")
+
+    monkeypatch.setattr(pool, "_pool", lambda: broken)
+    assert asyncio.run(run()) == extract_features(PAGE, "utf-8")
+    assert pool._executor is replacement and not hasattr(replacement, "shut")
+    assert pool.stats()["broken"] == 1 and pool.stats()["in_flight"] == 0
+
+    pool._discard(replacement)
+    assert pool._executor is None and replacement.shut
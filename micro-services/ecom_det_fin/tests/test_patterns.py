@@ -0,0 +1,41 @@
+import random
+import re
+import string
+from app.services.layers import content_ux
+from app.utils.patterns import Match, PatternSet
+
+
+def test_all_matches_with_offsets_including_overlaps():
+    patterns = PatternSet(["pay", "pay upfront", "upfront", "work from home"], regexes=[r"only\s*\d+\s*left"])
+    text = "PAY  upfront today, only 3 left; work from\nhome"
+    assert patterns.findall(text) == [
+        Match("pay", 0, 3),
+        Match("pay upfront", 0, 12),
+        Match("upfront", 5, 12),
+        Match(r"only\s*\d+\s*left", 20, 31),
+        Match("work from home", 33, 47),
+    ]
+
+
+def test_word_boundaries_and_case():
+    words = PatternSet(["mlm", "$0", "act now"])
+    assert words.found("HTMLMail templates for $0, ACT NOW") == {"$0", "act now"}
+    assert words.found("mlm-style") == {"mlm"}
+    substrings = PatternSet(["mlm"], word_boundary=False)
+    assert substrings.found("HTMLMail templates") == {"mlm"}
+    exact_case = PatternSet(["Stripe"], ignore_case=False)
+    assert exact_case.search("stripe") is None and exact_case.search("Stripe") == Match("Stripe", 0, 6)
+
+
+def test_matches_naive_scan_on_large_lists():
+    rng = random.Random(7)
+    vocab = ["".join(rng.choices(string.ascii_lowercase, k=rng.randint(2, 6))) for _ in range(400)]
+    phrases = sorted({" ".join(rng.sample(vocab, rng.randint(1, 3))) for _ in range(2000)})
+    text = " ".join(rng.choices(vocab, k=5000))
+    expected = {p for p in phrases if re.search(rf"(?<!\w){re.escape(p)}(?!\w)", text)}
+    assert PatternSet(phrases).found(text) == expected
+
+
+def test_content_checks_use_the_shared_matcher():
+    assert content_ux.URGENCY.search("FLASH  SALE ends tonight") is not None
+    assert content_ux.POLICY_WORDS.found("Returns and privacy policy") == {"return", "privacy"}
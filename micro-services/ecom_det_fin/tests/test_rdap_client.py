@@ -0,0 +1,64 @@
+import asyncio
+from datetime import datetime
+from app.services import rdap_client
+from app.services.ttl_cache import TTLCache
+from app.services.whois_cache import WhoisRecord
+
+RDAP_SAMPLE = {
+    "events": [{"eventAction": "registration", "eventDate": "2019-03-04T10:00:00Z"}],
+    "entities": [
+        {"roles": ["registrar"], "vcardArray": ["vcard", [["fn", {}, "text", "Example Registrar, Inc."]]]},
+        {
+            "roles": ["registrant"],
+            "vcardArray": ["vcard", [["adr", {"cc": "in"}, "text", ["", "", "", "", "", "", ""]]]],
+            "remarks": [{"description": ["REDACTED FOR PRIVACY"]}],
+        },
+    ],
+}
+
+WHOIS_SAMPLE = """Domain Name: EXAMPLE-SHOP.COM
+Registrar WHOIS Server: whois.registrar.test
+Creation Date: 2024-08-01T12:30:00Z
+Registrar: Cheap Names LLC
+Registrant Country: NG
+Registrant Email: Select Request Email Form at https://registrar.test
+Abuse: abuse@registrar.test
+"""
+
+
+def test_parse_rdap():
+    record = rdap_client.parse_rdap("example.com", RDAP_SAMPLE)
+    assert record.creation_date == datetime(2019, 3, 4, 10, 0)
+    assert record.registrar == "Example Registrar, Inc."
+    assert record.country == "IN"
+    assert record.privacy and record.source == "rdap"
+
+
+def test_parse_whois_text():
+    record = rdap_client.parse_whois_text("example-shop.com", WHOIS_SAMPLE)
+    assert record.creation_date == datetime(2024, 8, 1, 12, 30)
+    assert record.registrar == "Cheap Names LLC"
+    assert record.country == "NG"
+    assert record.emails == ["abuse@registrar.test"]
+    assert rdap_client.parse_whois_text("nope.com", "No match for domain \"NOPE.COM\".") is None
+
+
+def test_lookup_shares_one_query_and_caches(monkeypatch):
+    calls = []
+
+    async def fake_resolve(domain):
+        calls.append(domain)
+        await asyncio.sleep(0.01)
+        return WhoisRecord(domain=domain, registrar="Example Registrar")
+
+    monkeypatch.setattr(rdap_client, "_resolve", fake_resolve)
+    monkeypatch.setattr(rdap_client, "whois_cache", TTLCache("whois-test"))
+
+    async def run():
+        first = await asyncio.gather(rdap_client.lookup("www.shop.example.com"), rdap_client.lookup("example.com"))
+        return first + [await rdap_client.lookup("example.com"), await rdap_client.lookup("127.0.0.1")]
+
+    results = asyncio.run(run())
+    assert [r.registrar for r in results[:3]] == ["Example Registrar"] * 3
+    assert results[3] is None
+    assert calls == ["example.com"]
@@ -0,0 +1,45 @@
+import asyncio
+import pytest
+from app.services import registry, scoring
+from app.services.layers.content_ux import LayerResult
+
+
+def test_shared_producers_run_once(layers, monkeypatch):
+    fetched = []
+
+    async def fetch(url):
+        fetched.append(url)
+        await asyncio.sleep(0.01)
+        return "snapshot"
+
+    seen = []
+
+    def consumer(name):
+        async def analyze(url, snapshot=None):
+            seen.append(snapshot)
+            return LayerResult(score=0.0, message="ok")
+        return analyze
+
+    monkeypatch.setattr(registry.page_snapshot, "fetch_snapshot", fetch)
+    for name, module in [("content_ux", registry.li_content), ("business_verification", registry.li_business),
+                         ("merchant_verification", registry.li_merchant)]:
+        monkeypatch.setattr(module, "analyze", consumer(name))
+    asyncio.run(scoring.evaluate("https://example.com/"))
+    assert fetched == ["https://example.com/"] and seen == ["snapshot"] * 3
+
+
+def test_registered_layer_is_scored(layers, monkeypatch):
+    async def run(url, page):
+        return LayerResult(score=100.0, message="plugin ran")
+
+    registry.register_layer(registry.LayerSpec("plugin", run, weight=0.0, inputs=("page",), cost="cheap"))
+    try:
+        result = asyncio.run(scoring.evaluate("https://example.com/"))
+    finally:
+        registry.unregister_layer("plugin")
+    assert any(r.layer == "plugin" and r.message == "plugin ran" for r in result.reasons)
+
+
+def test_unknown_input_rejected():
+    with pytest.raises(ValueError):
+        registry.register_layer(registry.LayerSpec("bad", lambda url, x: None, weight=0.1, inputs=("nope",)))
@@ -0,0 +1,74 @@
+import json
+import numpy as np
+from sqlmodel import Session
+from app.models.tables import FeedbackStatus, SiteScan, VerifiedFeedback
+from app.services import registry, rescoring
+from app.services.rescoring import GateConfig, ScanMatrix
+from app.services.risk_rules import BADGE_ORDER, apply_safety_gates
+
+LAYERS = [spec.name for spec in registry.layers()]
+
+
+def _reasons(rng):
+    reasons = []
+    for name in LAYERS:
+        roll = rng.random()
+        message, status = "ok", "ok"
+        if roll < 0.15:
+            message, status = f"{name} failed", "error"
+        elif roll < 0.2:
+            message, status = f"{name} timed out", "timeout"
+        elif roll < 0.22:
+            message = "possible typosquatting of amazon"
+        reasons.append({"layer": name, "message": message, "score": float(rng.integers(0, 101)), "status": status})
+    return reasons
+
+
+def _add_scans(engine, rows):
+    with Session(engine) as session:
+        for url, reasons in rows:
+            session.add(SiteScan(url=url, normalized_url=url.rstrip("/"), risk_score=0.0, badge="Caution",
+                                 reasons_json=json.dumps(reasons)))
+        session.commit()
+
+
+def test_vectorized_rescore_matches_the_scalar_gates(client):
+    rng = np.random.default_rng(7)
+    hosts = ["https://shop-example.com/", "https://secure-login.example.net/", "https://amazon.com/", "https://www.flipkart.com/"]
+    rows = [(hosts[i % len(hosts)], _reasons(rng)) for i in range(400)]
+    _add_scans(client.engine, rows)
+
+    m = rescoring.extract(client.engine)
+    weights = {name: float(w) for name, w in zip(LAYERS, rng.dirichlet(np.ones(len(LAYERS))))}
+    scores, badges = rescoring.rescore(m, rescoring.weight_vector(m.layers, weights))
+
+    for i, (url, reasons) in enumerate(rows):
+        raw = max(0.0, min(100.0, sum(r["score"] * weights[r["layer"]] for r in reasons)))
+        score, _ = apply_safety_gates(url, reasons, raw)
+        score, badge = apply_safety_gates(url, reasons, score)  # the router gates again
+        assert abs(scores[i] - score) < 1e-3
+        assert BADGE_ORDER[badges[i]] == badge
+
+
+def test_matrix_round_trips_and_reports_confusion(client, tmp_path):
+    clean = [{"layer": name, "message": "ok", "score": 5.0, "status": "ok"} for name in LAYERS]
+    risky = [{"layer": name, "message": "ok", "score": 80.0, "status": "ok"} for name in LAYERS]
+    _add_scans(client.engine, [("https://good.example.com/", clean), ("https://bad.example.com/", risky),
+                               ("https://other.example.com/", clean)])
+    with Session(client.engine) as session:
+        session.add(VerifiedFeedback(url="https://good.example.com/", user_id="u1", status=FeedbackStatus.VERIFIED_DELIVERED))
+        session.add(VerifiedFeedback(url="https://bad.example.com/", user_id="u1", status=FeedbackStatus.VERIFIED_SCAM))
+        session.commit()
+
+    rescoring.extract(client.engine).save(tmp_path / "scans.npz")
+    m = ScanMatrix.load(tmp_path / "scans.npz")
+    assert m.layers == LAYERS and m.scores.shape == (3, len(LAYERS))
+    assert list(m.label) == [rescoring.LEGIT, rescoring.FRAUD, rescoring.UNKNOWN]
+
+    report = rescoring.compare(m, {}, GateConfig(badge_bands=(25.0, 45.0, 95.0)))
+    assert report["baseline"]["Critical"] == 1 and report["candidate"]["High Risk"] == 1
+    assert report["transitions"]["Critical"] == {"High Risk": 1}
+    assert report["confusion"]["baseline"] == {
+        "labelled": 2, "fraud_by_badge": dict.fromkeys(BADGE_ORDER, 0) | {"Critical": 1},
+        "legit_by_badge": dict.fromkeys(BADGE_ORDER, 0) | {"Verified Safe": 1}, "precision": 1.0, "recall": 1.0,
+    }
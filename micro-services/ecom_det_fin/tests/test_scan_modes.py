@@ -0,0 +1,61 @@
+import asyncio
+import pytest
+from sqlmodel import Session, select
+from app.models.tables import SiteScan
+from app.services import registry, scoring
+from app.services.risk_rules import apply_safety_gates
+
+
+def _layer_names(result):
+    return [r.layer for r in result.reasons]
+
+
+def test_instant_runs_only_offline_layers(layers):
+    result = asyncio.run(scoring.evaluate("https://shop.example.com/", mode="instant"))
+    assert _layer_names(result) == ["host_signals", "local_threats"]
+    assert layers.ran == set() and result.mode == "instant"
+    # Offline checks never vouch for a site
+    assert result.badge != "Verified Safe"
+
+
+def test_local_threat_list_hit_is_high_risk(layers, monkeypatch, tmp_path):
+    threats = tmp_path / "threats.txt"
+    threats.write_text("# reported scams\nevil-shop.com\n")
+    monkeypatch.setattr(registry.settings, "local_threat_list_path", str(threats))
+    result = asyncio.run(scoring.evaluate("https://deals.evil-shop.com/", mode="instant"))
+    assert result.badge in ("High Risk", "Critical")
+    assert any(r.layer == "local_threats" and r.score == 100.0 for r in result.reasons)
+
+
+def test_deep_adds_the_site_crawl(layers):
+    standard = asyncio.run(scoring.evaluate("https://shop.example.com/"))
+    assert "site_crawl" not in _layer_names(standard)
+    layers.ran.clear()
+    deep = asyncio.run(scoring.evaluate("https://shop.example.com/", mode="deep"))
+    assert "site_crawl" in layers.ran and "site_crawl" in _layer_names(deep)
+    assert deep.mode == "deep"
+
+
+def test_mode_thresholds():
+    reasons = [{"layer": "domain_infra", "message": "ok", "score": 19.0, "status": "ok"}]
+    assert apply_safety_gates("https://example.com/", reasons, 19.0)[1] == "Low Risk"
+    assert apply_safety_gates("https://example.com/", reasons, 19.0, "deep")[1] == "Verified Safe"
+    assert apply_safety_gates("https://example.com/", reasons, 0.0, "instant")[1] == "Low Risk"
+
+
+def test_unknown_mode_is_rejected():
+    with pytest.raises(ValueError):
+        registry.register_layer(registry.LayerSpec("bogus", lambda url: None, weight=0.0, modes=("fast",)))
+
+
+def test_shallower_scans_do_not_answer_deeper_requests(client):
+    client.post("/api/check-site", json={"url": "https://shop.example.com/", "mode": "instant"})
+    standard = client.post("/api/check-site", json={"url": "https://shop.example.com/"}).json()
+    assert standard["cached"] is False and standard["mode"] == "standard"
+
+    # The standard scan answers a later instant request, but not a deep one
+    assert client.post("/api/check-site", json={"url": "https://shop.example.com/", "mode": "instant"}).json()["cached"] is True
+    assert client.post("/api/check-site", json={"url": "https://shop.example.com/", "mode": "deep"}).json()["cached"] is False
+    assert len(client.calls) == 3
+    with Session(client.engine) as session:
+        assert sorted(s.mode for s in session.exec(select(SiteScan))) == ["deep", "instant", "standard"]
@@ -0,0 +1,112 @@
+import asyncio
+import pytest
+from app.services import registry, scoring
+from app.services.layers.content_ux import LayerResult
+from app.services.singleflight import SingleFlight
+
+
+def test_concurrent_calls_share_one_task():
+    flight = SingleFlight("test")
+    started = []
+
+    async def work():
+        started.append(1)
+        await asyncio.sleep(0.01)
+        return object()
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(run())
+    assert len(started) == 1 and all(r is results[0] for r in results)
+    assert flight.stats()["coalesced"] == 4 and flight.stats()["in_flight"] == 0
+
+
+def test_one_cancelled_caller_does_not_cancel_the_others():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.02)
+        return "done"
+
+    async def run():
+        first = asyncio.create_task(flight.do("k", work))
+        second = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_last_cancelled_caller_cancels_the_work():
+    flight = SingleFlight("test")
+    cancelled = []
+
+    async def work():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(1)
+            raise
+
+    async def run():
+        caller = asyncio.create_task(flight.do("k", work))
+        await asyncio.sleep(0)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+        return flight.stats()["in_flight"]
+
+    assert asyncio.run(run()) == 0 and cancelled == [1]
+
+
+def test_errors_reach_every_caller():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def run():
+        return await asyncio.gather(flight.do("k", work), flight.do("k", work), return_exceptions=True)
+
+    assert [type(r) for r in asyncio.run(run())] == [ValueError, ValueError]
+
+
+def test_evaluate_coalesces_equivalent_urls(layers, monkeypatch):
+    runs = []
+
+    async def visual(url):
+        runs.append(url)
+        await asyncio.sleep(0.01)
+        return LayerResult(score=5.0, message="stub")
+
+    monkeypatch.setattr(registry.li_visual, "analyze", visual)
+
+    async def run():
+        return await asyncio.gather(scoring.evaluate("https://Example.com/?utm_source=wa"),
+                                    scoring.evaluate("https://example.com/"))
+
+    first, second = asyncio.run(run())
+    assert first is second and len(runs) == 1
+
+
+def test_timed_out_caller_leaves_the_work_running():
+    flight = SingleFlight("test")
+
+    async def work():
+        await asyncio.sleep(0.05)
+        return "done"
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await flight.do("k", work, timeout=0.01)
+        task = flight.task("k")
+        return await task, flight.stats()
+
+    result, stats = asyncio.run(run())
+    assert result == "done" and stats["detached"] == 1 and stats["in_flight"] == 0
@@ -0,0 +1,43 @@
+from datetime import datetime, timedelta
+from sqlmodel import Session, select
+from app.models.tables import SiteScan
+from app.routers import site
+
+
+def _age_latest(engine, seconds):
+    with Session(engine) as session:
+        scan = session.exec(select(SiteScan)).one()
+        scan.scanned_at = datetime.utcnow() - timedelta(seconds=seconds)
+        session.add(scan)
+        session.commit()
+
+
+def test_fresh_scan_is_reused(client):
+    first = client.post("/api/check-site", json={"url": "https://shop.example.com/"}).json()
+    assert first["cached"] is False and first["cache_age_seconds"] is None
+
+    second = client.post("/api/check-site", json={"url": "https://SHOP.example.com?utm_source=wa"}).json()
+    assert second["cached"] is True and second["risk_score"] == first["risk_score"]
+    assert client.calls == ["https://shop.example.com/"]
+
+
+def test_stale_scan_served_and_revalidated(client):
+    client.post("/api/check-site", json={"url": "https://shop.example.com/"})
+    _age_latest(client.engine, site.settings.scan_fresh_ttl + 60)
+
+    stale = client.post("/api/check-site", json={"url": "https://shop.example.com/"}).json()
+    assert stale["cached"] is True and stale["cache_age_seconds"] >= site.settings.scan_fresh_ttl
+    # The background rescan ran after the response and wrote a new row
+    assert len(client.calls) == 2
+    with Session(client.engine) as session:
+        assert len(session.exec(select(SiteScan)).all()) == 2
+    assert not site._revalidating
+
+
+def test_expired_scan_is_rescanned_inline(client):
+    client.post("/api/check-site", json={"url": "https://shop.example.com/"})
+    _age_latest(client.engine, site.settings.scan_fresh_ttl + site.settings.scan_stale_grace + 1)
+
+    result = client.post("/api/check-site", json={"url": "https://shop.example.com/"}).json()
+    assert result["cached"] is False
+    assert len(client.calls) == 2
@@ -0,0 +1,49 @@
+import json
+from sqlmodel import Session, select
+from app.models.tables import SiteScan
+from app.routers import site
+from app.services.scoring import Evaluation, LayerUpdate, Reason
+
+
+def _events(body: str) -> list[tuple[str, dict]]:
+    events = []
+    for block in body.strip().split("\n\n"):
+        lines = dict(line.split(": ", 1) for line in block.splitlines())
+        events.append((lines["event"], json.loads(lines["data"])))
+    return events
+
+
+def _fake_stream(monkeypatch):
+    async def fake_evaluate_stream(url, session=None, mode="standard"):
+        domain = Reason(layer="domain_infra", message="ok", weight=0.25, score=10.0)
+        yield LayerUpdate(reason=domain, score=10.0, badge="Verified Safe", pending=["content_ux"])
+        content = Reason(layer="content_ux", message="Policies missing", weight=0.10, score=40.0)
+        yield LayerUpdate(reason=content, score=18.6, badge="Low Risk", pending=[])
+        yield Evaluation(score=11.0, badge="Verified Safe", reasons=[domain, content])
+
+    monkeypatch.setattr(site, "evaluate_stream", fake_evaluate_stream)
+
+
+def test_stream_emits_layers_then_final(client, monkeypatch):
+    _fake_stream(monkeypatch)
+    resp = client.get("/api/check-site/stream", params={"url": "https://shop.example.com/"})
+    assert resp.headers["content-type"].startswith("text/event-stream")
+    events = _events(resp.text)
+    assert [name for name, _ in events] == ["layer", "layer", "final"]
+    assert events[0][1]["reason"]["layer"] == "domain_infra" and events[0][1]["pending"] == ["content_ux"]
+    assert events[1][1]["provisional_badge"] == "Low Risk"
+    final = events[2][1]
+    assert final["cached"] is False and len(final["reasons"]) == 2
+    with Session(client.engine) as session:
+        assert session.exec(select(SiteScan)).one().badge == final["badge"]
+
+
+def test_stream_serves_fresh_scan_as_single_event(client, monkeypatch):
+    client.post("/api/check-site", json={"url": "https://shop.example.com/"})
+    _fake_stream(monkeypatch)
+    events = _events(client.get("/api/check-site/stream", params={"url": "https://shop.example.com/"}).text)
+    assert [name for name, _ in events] == ["final"] and events[0][1]["cached"] is True
+
+
+def test_stream_rejects_invalid_url(client):
+    assert client.get("/api/check-site/stream", params={"url": "not a url"}).status_code == 422
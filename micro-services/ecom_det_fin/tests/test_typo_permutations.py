@@ -0,0 +1,62 @@
+import pytest
+from app.services.typo_permutations import PermutationTable, get_permutations
+from app.services.layers import domain_infra
+
+# Variants that used to be hard-coded in domain_infra
+LEGACY = {
+    "amazon": ["amzon", "amazom", "amazone", "amazn", "amaozn", "amaxon", "amzaon"],
+    "flipkart": ["flipkrt", "flipkat", "flikart", "flpkart", "flipcart"],
+    "google": ["googel", "gogle", "googl", "goolge", "gooogle"],
+    "facebook": ["facbook", "facebok"],
+    "paypal": ["payp4l", "payapl", "paipal", "paypal1"],
+    "apple": ["aple", "appel", "aplle", "applle"],
+    "microsoft": ["mircosoft", "microsooft", "micorsoft"],
+}
+
+
+@pytest.mark.parametrize("brand,variant", [(b, v) for b, vs in LEGACY.items() for v in vs])
+def test_legacy_variants_are_generated(brand, variant):
+    assert get_permutations().lookup(variant).brand == brand
+
+
+def test_attack_classes():
+    table = PermutationTable(["paypal", "ebay"])
+    assert table.lookup("paypa1").attack == "homoglyph"
+    assert table.lookup("pay-pal").attack == "hyphenation"
+    assert table.lookup("paypla").attack == "transposition"
+    assert table.lookup("ebay").attack == "tld-swap"
+    assert table.lookup("ebya").brand == "ebay"
+    assert table.lookup("paypal-help") is None
+
+
+def test_domain_layer_reports_attack():
+    result = domain_infra.analyze("https://amaozn.com/")
+    assert "(transposition of 'amazon')" in result.message
+    assert result.score >= 85
+
+
+VETO_WORDING = ("typosquatting", "critical threat", "homograph")
+
+
+@pytest.mark.parametrize("domain", ["apple.co.uk", "apple.in", "google.de", "paypal.de", "microsoft.net", "flipkart.in", "myntra.in"])
+def test_brand_label_on_unlisted_suffix_is_not_a_veto(domain):
+    # Brands' own ccTLDs carry the bare brand label; they must not be forced to Critical
+    result = domain_infra.analyze(f"https://{domain}/")
+    assert "on unlisted suffix" in result.message
+    assert result.score < 50
+    assert not any(word in result.message.lower() for word in VETO_WORDING)
+
+
+def test_brand_label_on_abused_tld_scores_higher():
+    assert domain_infra._detect_typosquatting("apple.xyz")[0] > domain_infra._detect_typosquatting("apple.co.uk")[0]
+
+
+LOOKALIKE_WORDING = ("typosquat", "lookalike", "impersonation", "threat", "similar to known brand")
+
+
+@pytest.mark.parametrize("domain", sorted({d for ds in domain_infra.settings.canonical_brands.values() for d in ds}))
+def test_canonical_domains_are_not_lookalikes(domain):
+    # ebay.co.uk is within edit distance 2 of etsy, but it is eBay's own domain
+    assert domain_infra._detect_typosquatting(domain) == (0.0, None)
+    message = domain_infra.analyze(f"https://{domain}/").message.lower()
+    assert not any(word in message for word in LOOKALIKE_WORDING), message
@@ -0,0 +1,20 @@
+from datetime import datetime
+from app.services.ttl_cache import TTLCache, MISSING
+
+
+def test_ttl_cache_negative_entries_and_expiry():
+    cache = TTLCache("t", max_entries=2)
+    cache.set("a", None, ttl=60)
+    cache.set("b", {"x": 1}, ttl=-1)
+    assert cache.get("a") is None
+    assert cache.get("b") is MISSING
+    assert cache.stats()["negative_hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+
+def test_ttl_cache_sqlite_roundtrip(tmp_path):
+    path = str(tmp_path / "cache.db")
+    created = datetime(2020, 5, 17, 10, 30)
+    TTLCache("whois", db_path=path).set("example.com", {"creation_date": created}, ttl=60)
+    assert TTLCache("whois", db_path=path).get("example.com") == {"creation_date": created}
+
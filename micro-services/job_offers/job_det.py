@@ -6,6 +6,9 @@ from enum import Enum
 import re
 import uuid
 
+from ecom_det_fin.app.services import dns_resolver
+from ecom_det_fin.app.utils.patterns import PatternSet
+
 # ------------------------------- Pydantic Models -------------------------------
 
 class SocialMedia(BaseModel):
@@ -78,6 +81,18 @@ class ReportScamRequest(BaseModel):
 
 # ------------------------------- Detector Core -------------------------------
 
+RED_FLAG_KEYWORDS = {
+    'urgent', 'immediate', 'guaranteed', 'no experience required',
+    'work from home', 'easy money', 'pay upfront', 'processing fee',
+    'registration fee', 'training fee', 'equipment fee', 'deposit',
+    'wire transfer', 'western union', 'moneygram', 'bitcoin',
+    'cryptocurrency', 'mlm', 'pyramid', 'get rich quick', 'passive income',
+    'make money fast', 'limited time', 'act now', 'first come first serve'
+}
+# Whole words only, so 'mlm' does not fire on 'htmlmail' nor 'urgent' on 'insurgent'.
+# Compiled once here: the detector is constructed per request.
+RED_FLAG_MATCHER = PatternSet(RED_FLAG_KEYWORDS)
+
 class FakeInternshipDetectorAPI:
     def __init__(self):
         self.suspicious_domains = {
@@ -86,14 +101,7 @@ class FakeInternshipDetectorAPI:
             'protonmail.com', 'yandex.com', 'mail.ru'
         }
 
-        self.red_flag_keywords = {
-            'urgent', 'immediate', 'guaranteed', 'no experience required',
-            'work from home', 'easy money', 'pay upfront', 'processing fee',
-            'registration fee', 'training fee', 'equipment fee', 'deposit',
-            'wire transfer', 'western union', 'moneygram', 'bitcoin',
-            'cryptocurrency', 'mlm', 'pyramid', 'get rich quick', 'passive income',
-            'make money fast', 'limited time', 'act now', 'first come first serve'
-        }
+        self.red_flag_keywords = RED_FLAG_KEYWORDS
 
         self.reported_companies = set()
         self.analysis_cache = {}
@@ -147,6 +155,17 @@ class FakeInternshipDetectorAPI:
             if len(domain.split('.')[0]) < 3:
                 flags.append("Very short domain name")
                 score += 15
+            host = parsed_url.hostname or ""
+            if host:
+                dns_info = dns_resolver.lookup_blocking(host)
+                # A resolver outage is inconclusive, so only penalize definitive answers
+                if not dns_info.failed:
+                    if not dns_info.addresses:
+                        flags.append("Website domain does not resolve")
+                        score += 20
+                    elif not dns_info.mx:
+                        flags.append("Website domain has no mail server (MX)")
+                        score += 10
         return score, flags
 
     def _check_email_domain(self, email):
@@ -163,11 +182,9 @@ class FakeInternshipDetectorAPI:
         flags = []
         score = 0
         if desc:
-            lower = desc.lower()
-            for keyword in self.red_flag_keywords:
-                if keyword in lower:
-                    flags.append(f"Suspicious keyword found: {keyword}")
-                    score += 10
+            for keyword in sorted(RED_FLAG_MATCHER.found(desc)):
+                flags.append(f"Suspicious keyword found: {keyword}")
+                score += 10
         return score, flags
 
     def _verify_contact_info(self, info: CompanyInfoRequest):
@@ -1,12 +1,13 @@
-from fastapi import FastAPI, HTTPException, File, UploadFile
-from fastapi.responses import JSONResponse
+from fastapi import FastAPI, HTTPException, File, UploadFile, Header, Query
+from fastapi.responses import JSONResponse, StreamingResponse
 from pydantic import BaseModel
-from typing import Any, Dict
+from typing import Any, Dict, Optional
 from news.news_api import check_news_truth
 from job_offers.job_main import analyze_job_offer
 from fastapi.middleware.cors import CORSMiddleware
 
 import asyncio
+import json
 from urllib.parse import urlparse
 import httpx
 from fastapi import FastAPI, HTTPException
@@ -26,10 +27,12 @@ from checks import (
 )
 
 # Advanced E-commerce Detection imports (switched to ecom_det_fin implementation)
-from ecom_det_fin.app.services.scoring import evaluate_all, to_badge, advice_for
+from ecom_det_fin.app.services.scoring import Evaluation, evaluate, evaluate_stream, to_badge, advice_for
 from ecom_det_fin.app.services.risk_rules import apply_safety_gates
+from pydantic import HttpUrl, TypeAdapter, ValidationError
 from ecom_det_fin.app.models.schemas import (
     CheckSiteRequest as EcommerceAnalysisRequest,
+    ScanMode,
     RiskResult,
     FeedbackRequest as EcommerceFeedbackRequest,
 )
@@ -253,21 +256,32 @@ async def analyze_image(file: UploadFile = File(...)):
 
 # Advanced E-commerce Detection Endpoints
 @app.post("/ecommerce/analyze-advanced", response_model=dict)
-async def analyze_ecommerce_advanced(request: EcommerceAnalysisRequest):
+async def analyze_ecommerce_advanced(
+    request: EcommerceAnalysisRequest,
+    deadline_ms: Optional[float] = Query(default=None, gt=0),
+    x_deadline_ms: Optional[float] = Header(default=None, gt=0),
+):
     """
     Advanced e-commerce website analysis using 8-layer verification system.
     Provides comprehensive risk assessment with detailed explanations.
+    With a deadline (`deadline_ms` parameter or `X-Deadline-Ms` header, in milliseconds),
+    a scan still running when it passes returns a provisional result listing the pending layers.
+    `mode` in the body (`instant`, `standard` or `deep`) picks the scan depth.
     """
     try:
         # Run the comprehensive analysis
-        score, reasons = await evaluate_all(str(request.url), session=None)
+        budget = deadline_ms if deadline_ms is not None else x_deadline_ms
+        result = await evaluate(str(request.url), session=None, deadline=budget / 1000.0 if budget is not None else None,
+                                mode=request.mode)
+        score, reasons = result.score, result.reasons
 
         # Apply safety gates to align with ecom_det_fin behavior
         reason_list = [
-            {"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score}
+            {"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score, "skipped": r.skipped, "status": r.status,
+             "cache_age_seconds": r.cache_age_seconds}
             for r in reasons
         ]
-        adjusted_score, gated_badge = apply_safety_gates(str(request.url), reason_list, score)
+        adjusted_score, gated_badge = apply_safety_gates(str(request.url), reason_list, score, request.mode)
         payment, actions = advice_for(adjusted_score)
 
         return {
@@ -278,11 +292,70 @@ async def analyze_ecommerce_advanced(request: EcommerceAnalysisRequest):
             "advice": {"payment": payment, "actions": actions},
             "scanned_at": datetime.utcnow().isoformat(),
             "analysis_type": "advanced",
+            "skipped_layers": [r.layer for r in reasons if r.skipped],
+            "provisional": result.provisional,
+            "pending_layers": result.pending_layers,
+            "mode": request.mode,
         }
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Advanced e-commerce analysis failed: {str(e)}")
 
 
+def _sse(event: str, data: dict) -> str:
+    return f"event: {event}\ndata: {json.dumps(data, default=str)}\n\n"
+
+
+async def _advanced_events(url: str, mode: str = "standard"):
+    try:
+        async for item in evaluate_stream(url, session=None, mode=mode):
+            if isinstance(item, Evaluation):
+                # Same body as POST /ecommerce/analyze-advanced
+                reason_list = [
+                    {"layer": r.layer, "message": r.message, "weight": r.weight, "score": r.score, "skipped": r.skipped, "status": r.status,
+                     "cache_age_seconds": r.cache_age_seconds}
+                    for r in item.reasons
+                ]
+                adjusted_score, gated_badge = apply_safety_gates(url, reason_list, item.score, mode)
+                payment, actions = advice_for(adjusted_score)
+                yield _sse("final", {
+                    "url": url,
+                    "risk_score": adjusted_score,
+                    "badge": gated_badge,
+                    "reasons": reason_list,
+                    "advice": {"payment": payment, "actions": actions},
+                    "scanned_at": datetime.utcnow().isoformat(),
+                    "analysis_type": "advanced",
+                    "skipped_layers": item.skipped_layers,
+                    "mode": mode,
+                })
+            else:
+                yield _sse("layer", {
+                    "reason": item.reason.__dict__,
+                    "provisional_score": round(item.score, 1),
+                    "provisional_badge": item.badge,
+                    "pending": item.pending,
+                })
+    except Exception as e:
+        yield _sse("error", {"detail": f"Advanced e-commerce analysis failed: {str(e)}"})
+
+
+@app.get("/ecommerce/analyze-advanced/stream")
+async def analyze_ecommerce_advanced_stream(url: str, mode: ScanMode = "standard"):
+    """
+    Streaming variant of /ecommerce/analyze-advanced (Server-Sent Events).
+    Emits a `layer` event as each layer finishes, then a `final` event.
+    """
+    try:
+        TypeAdapter(HttpUrl).validate_python(url)
+    except ValidationError:
+        raise HTTPException(status_code=422, detail="Invalid URL")
+    return StreamingResponse(
+        _advanced_events(url, mode),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
 @app.post("/ecommerce/feedback")
 async def submit_ecommerce_feedback(request: EcommerceFeedbackRequest):
     """
@@ -313,7 +386,7 @@ async def compare_analysis_methods(url: str):
         basic_result = await analyze(UrlRequest(url=url))
 
         # Advanced analysis
-        advanced_result = await analyze_ecommerce_advanced(EcommerceAnalysisRequest(url=url))
+        advanced_result = await analyze_ecommerce_advanced(EcommerceAnalysisRequest(url=url), deadline_ms=None, x_deadline_ms=None)
 
         return {
             "url": url,
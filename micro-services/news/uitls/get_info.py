@@ -144,7 +144,10 @@ def get_info(query: str):
 
     logger.info(f"Scraping {len(url_data)} unique articles...")
     agent = WebScrapingAgent(delay=1.0)
-    scraped_results = agent.scrape_multiple_urls(url_data)
+    try:
+        scraped_results = agent.scrape_multiple_urls(url_data)
+    finally:
+        agent.close()
 
     logger.info("Scraping complete.")
     return [asdict(res) for res in scraped_results] if scraped_results else [], rephrased_queries
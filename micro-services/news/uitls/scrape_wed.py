@@ -10,6 +10,11 @@ import re
 from urllib.parse import urljoin, urlparse
 from datetime import datetime
 import hashlib
+import multiprocessing
+import threading
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from dataclasses import dataclass, asdict
 from typing import List, Dict, Optional, Any
 import logging
@@ -38,15 +43,35 @@ class ScrapedContent:
     metadata: Dict[str, Any]
     content_hash: str
 
+# Agent used by a parse worker process, created on its first page
+_worker_agent = None
+
+def _parse_in_worker(content: bytes, url: str) -> Dict[str, Any]:
+    """Parse worker entry point: returns the extracted fields as plain, picklable values"""
+    global _worker_agent
+    if _worker_agent is None:
+        _worker_agent = WebScrapingAgent(delay=0, parse_workers=0)
+    return _worker_agent._extract_fields(content, url)
+
 class WebScrapingAgent:
     """Advanced web scraping agent for news content analysis"""
     
-    def __init__(self, delay=1.0, timeout=30, max_retries=3):
+    def __init__(self, delay=1.0, timeout=30, max_retries=3, parse_workers=2, parse_inline_max_bytes=256 * 1024):
         self.delay = delay
         self.timeout = timeout
         self.max_retries = max_retries
         self.session = self._create_session()
         
+        # Pages of parse_inline_max_bytes or more are parsed in worker processes, so fetching
+        # the next URL overlaps the parse of the previous one (parse_workers=0: always inline)
+        self.parse_workers = parse_workers
+        self.parse_inline_max_bytes = parse_inline_max_bytes
+        self._parse_pool = None
+        self._parse_lock = threading.Lock()
+        self._parse_pending = 0
+        self._parse_counts = {'inline': 0, 'offloaded': 0}
+        self._parse_seconds = deque(maxlen=200)
+        
         # Common selectors for different content types
         self.content_selectors = [
             'article', '.article-content', '.post-content', 
@@ -97,8 +122,8 @@ class WebScrapingAgent:
         
         return session
 
-    def scrape_url(self, url: str, metadata: Dict = None) -> Optional[ScrapedContent]:
-        """Scrape a single URL and return structured content"""
+    def _fetch(self, url: str) -> Optional[bytes]:
+        """Fetch the raw page, or None on request errors"""
         try:
             logger.info(f"Scraping URL: {url}")
             
@@ -108,20 +133,66 @@ class WebScrapingAgent:
             # Fetch the page
             response = self.session.get(url, timeout=self.timeout)
             response.raise_for_status()
-            
-            soup = BeautifulSoup(response.content, 'html.parser')
-            
-            # Extract content
+            return response.content
+        except requests.RequestException as e:
+            logger.error(f"Request error for {url}: {str(e)}")
+            return None
+
+    def _extract_fields(self, content: bytes, url: str) -> Dict[str, Any]:
+        """Parse the page and extract the content fields (in this order: content extraction strips tags)"""
+        soup = BeautifulSoup(content, 'html.parser')
+        return {
+            'title': self._extract_title(soup),
+            'content': self._extract_content(soup),
+            'author': self._extract_author(soup),
+            'publish_date': self._extract_date(soup),
+            'description': self._extract_description(soup),
+            'keywords': self._extract_keywords(soup),
+            'images': self._extract_images(soup, url),
+            'links': self._extract_links(soup, url),
+        }
+
+    def _submit_parse(self, content: bytes, url: str) -> Future:
+        """Start extracting fields: inline for small pages, in the parse pool for large ones"""
+        started = time.monotonic()
+        
+        def done(future):
+            # Runs on the pool's management thread for offloaded parses
+            with self._parse_lock:
+                self._parse_pending -= 1
+                self._parse_seconds.append(time.monotonic() - started)
+        
+        future = None
+        if self.parse_workers > 0 and len(content) >= self.parse_inline_max_bytes:
+            if self._parse_pool is None:
+                self._parse_pool = ProcessPoolExecutor(max_workers=self.parse_workers,
+                                                       mp_context=multiprocessing.get_context("spawn"))
+            try:
+                future = self._parse_pool.submit(_parse_in_worker, content, url)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM on a huge page): drop the pool, parse this page inline
+                # and start a fresh pool for the next large one
+                logger.warning(f"Parse pool broken, parsing {url} inline")
+                self._parse_pool.shutdown(wait=False)
+                self._parse_pool = None
+        with self._parse_lock:
+            self._parse_pending += 1
+            self._parse_counts['inline' if future is None else 'offloaded'] += 1
+        if future is None:
+            future = Future()
+            try:
+                future.set_result(self._extract_fields(content, url))
+            except Exception as e:
+                future.set_exception(e)
+        future.add_done_callback(done)
+        return future
+
+    def _build(self, url: str, parse: Future, metadata: Dict = None) -> Optional[ScrapedContent]:
+        """Wait for the parse and assemble the structured content"""
+        try:
             scraped_data = ScrapedContent(
                 url=url,
-                title=self._extract_title(soup),
-                content=self._extract_content(soup),
-                author=self._extract_author(soup),
-                publish_date=self._extract_date(soup),
-                description=self._extract_description(soup),
-                keywords=self._extract_keywords(soup),
-                images=self._extract_images(soup, url),
-                links=self._extract_links(soup, url),
+                **parse.result(),
                 source_domain=urlparse(url).netloc,
                 word_count=0,  # Will be calculated
                 scrape_timestamp=datetime.now().isoformat(),
@@ -138,13 +209,35 @@ class WebScrapingAgent:
             logger.info(f"Successfully scraped: {url}")
             return scraped_data
             
-        except requests.RequestException as e:
-            logger.error(f"Request error for {url}: {str(e)}")
-            return None
         except Exception as e:
             logger.error(f"Unexpected error scraping {url}: {str(e)}")
             return None
 
+    def scrape_url(self, url: str, metadata: Dict = None) -> Optional[ScrapedContent]:
+        """Scrape a single URL and return structured content"""
+        content = self._fetch(url)
+        if content is None:
+            return None
+        return self._build(url, self._submit_parse(content, url), metadata)
+
+    def parse_stats(self) -> Dict[str, Any]:
+        """Parse queue depth and latency (seconds over the last 200 parses)"""
+        with self._parse_lock:
+            seconds = sorted(self._parse_seconds)
+            return {
+                **self._parse_counts,
+                'pending': self._parse_pending,
+                'queue_depth': max(0, self._parse_pending - self.parse_workers),
+                'p50_seconds': seconds[len(seconds) // 2] if seconds else None,
+                'max_seconds': seconds[-1] if seconds else None,
+            }
+
+    def close(self):
+        """Shut down the parse pool, if one was started"""
+        if self._parse_pool is not None:
+            self._parse_pool.shutdown()
+            self._parse_pool = None
+
     def _extract_title(self, soup: BeautifulSoup) -> str:
         """Extract title from the page"""
         # Try meta title first
@@ -304,6 +397,8 @@ class WebScrapingAgent:
     def scrape_multiple_urls(self, url_metadata_pairs: List[Dict]) -> List[ScrapedContent]:
         """Scrape multiple URLs with their metadata"""
         results = []
+        # Large pages parse in the pool while the next URL is fetched
+        parses = []
         
         for item in url_metadata_pairs:
             url = item.get('url')
@@ -313,7 +408,12 @@ class WebScrapingAgent:
                 logger.warning("Skipping item without URL")
                 continue
             
-            scraped_content = self.scrape_url(url, metadata)
+            content = self._fetch(url)
+            if content is not None:
+                parses.append((url, self._submit_parse(content, url), metadata))
+        
+        for url, parse, metadata in parses:
+            scraped_content = self._build(url, parse, metadata)
             if scraped_content:
                 results.append(scraped_content)
         
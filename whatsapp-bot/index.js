@@ -15,6 +15,8 @@ const ALLOWED = (process.env.ALLOWED_NUMBERS || '')
 const BASE_URL = process.env.BACKEND_BASE_URL || 'http://127.0.0.1:8000';
 const SESSION = process.env.WPP_SESSION_NAME || 'factstate-session';
 const PORT = parseInt(process.env.PORT || '3030', 10);
+// Advanced e-commerce scans answer provisionally by this deadline, well inside the HTTP timeout
+const ECOM_ADV_DEADLINE_MS = parseInt(process.env.ECOM_ADV_DEADLINE_MS || '20000', 10);
 
 // In-memory user states
 const startedUsers = new Set();
@@ -125,7 +127,9 @@ async function backendEcomBasic(url) {
 }
 
 async function backendEcomAdvanced(url) {
-  const { data } = await axiosClient.post(`/ecommerce/analyze-advanced`, { url });
+  const { data } = await axiosClient.post(`/ecommerce/analyze-advanced`, { url }, {
+    headers: { 'X-Deadline-Ms': String(ECOM_ADV_DEADLINE_MS) },
+  });
   return data;
 }
 
@@ -185,7 +189,10 @@ function summarizeEcomAdvanced(result) {
   const badge = result.badge || 'Unknown';
   const score = result.risk_score ?? 'n/a';
   const actions = result?.advice?.actions?.slice(0, 3)?.join('\n- ') || 'None';
-  return `Badge: ${badge}\nRisk Score: ${score}\nTop Advice:\n- ${actions}`;
+  const pending = result.provisional
+    ? `\n(Provisional: ${result.pending_layers?.length || 0} checks were still running)`
+    : '';
+  return `Badge: ${badge}\nRisk Score: ${score}${pending}\nTop Advice:\n- ${actions}`;
 }
 
 function formatNewsResult(result) {